@@ -0,0 +1,19 @@
+import os
+import shutil
+import tempfile
+
+_cache_home = None
+
+
+def pytest_configure(config):
+    # Keeps the caches of rivalcfg (profiles, plugged device,...) out of the
+    # cache folder of the user running the tests. It is set before the tests
+    # are collected, as some of them read the profiles.
+    global _cache_home
+    _cache_home = tempfile.mkdtemp(prefix="rivalcfg-test-cache-")
+    os.environ["XDG_CACHE_HOME"] = _cache_home
+
+
+def pytest_unconfigure(config):
+    if _cache_home is not None:
+        shutil.rmtree(_cache_home, ignore_errors=True)
@@ -4,6 +4,7 @@ PYTHON_FILES = [
     "rivalcfg",
     "test",
     "noxfile.py",
+    "conftest.py",
     "scripts",
 ]
 
@@ -4,10 +4,66 @@ from . import devices
 from . import mouse
 
 
-def get_first_mouse():
+def _list_plugged_devices():
+    """Lists all the plugged devices that are supported by rivalcfg, with one
+    item per physical device (see
+    :func:`rivalcfg.devices.list_all_plugged_devices`).
+
+    Always return an empty list when ``RIVALCFG_PROFILE=0000:0000`` is defined
+    in the environment.
+
+    :rtype: list(dict)
+    """
+    if (
+        "RIVALCFG_PROFILE" in os.environ
+        and os.environ["RIVALCFG_PROFILE"] == "0000:0000"
+    ):
+        return []
+    return list(devices.list_all_plugged_devices())
+
+
+def _get_first_plugged_device():
+    """Returns the first plugged device that is supported by rivalcfg (see
+    :func:`rivalcfg.devices.get_first_plugged_device`).
+
+    Always return ``None`` when ``RIVALCFG_PROFILE=0000:0000`` is defined in
+    the environment.
+
+    :rtype: dict
+    """
+    if (
+        "RIVALCFG_PROFILE" in os.environ
+        and os.environ["RIVALCFG_PROFILE"] == "0000:0000"
+    ):
+        return None
+    return devices.get_first_plugged_device()
+
+
+def _open_device(device, pool=None, lock=False):
+    """Opens a device returned by :func:`_list_plugged_devices`.
+
+    :rtype: rivalcfg.mouse.Mouse
+    """
+    return mouse.get_mouse(
+        vendor_id=device["vendor_id"],
+        product_id=device["product_id"],
+        path=device["path"],
+        pool=pool,
+        lock=lock,
+    )
+
+
+def get_first_mouse(pool=None, lock=False):
     """Get the first plugged mouse that can befound. As there is only one mouse
     plugged to a computer most of the time, it should return the right one. ;)
 
+    :param rivalcfg.usbhid.DevicePool pool: A device pool to borrow the HID
+                                            device from (optional, see
+                                            :func:`rivalcfg.mouse.get_mouse`).
+    :param bool lock: Lock the device for all the other processes until the
+                      mouse is closed (optional, see
+                      :func:`rivalcfg.mouse.get_mouse`).
+
     :rtype: rivalcfg.mouse.Mouse
     :return: The mouse if one supported device is found, else returns ``None``.
 
@@ -18,15 +74,161 @@ def get_first_mouse():
     >>> rivalcfg.get_first_mouse()  # doctest: +SKIP
     <Mouse ...>
     """
-    if (
-        "RIVALCFG_PROFILE" in os.environ
-        and os.environ["RIVALCFG_PROFILE"] == "0000:0000"
-    ):
+    device = _get_first_plugged_device()
+    if not device:
         return None
-    plugged_devices = list(devices.list_plugged_devices())
-    if not plugged_devices:
-        return None
-    return mouse.get_mouse(
-        vendor_id=plugged_devices[0]["vendor_id"],
-        product_id=plugged_devices[0]["product_id"],
-    )
+    return _open_device(device, pool=pool, lock=lock)
+
+
+def get_all_mice(pool=None, lock=False):
+    """Get all the plugged mice that are supported by rivalcfg.
+
+    :param rivalcfg.usbhid.DevicePool pool: A device pool to borrow the HID
+                                            devices from (optional, see
+                                            :func:`rivalcfg.mouse.get_mouse`).
+    :param bool lock: Lock the devices for all the other processes until the
+                      mice are closed (optional, see
+                      :func:`rivalcfg.mouse.get_mouse`).
+
+    :rtype: list(rivalcfg.mouse.Mouse)
+    :return: The mice (an empty list if no supported device is found).
+
+    Always return an empty list when ``RIVALCFG_PROFILE=0000:0000`` is defined
+    in the environment.
+
+    >>> import rivalcfg
+    >>> rivalcfg.get_all_mice()  # doctest: +SKIP
+    [<Mouse ...>, <Mouse ...>]
+    """
+    mice = []
+    try:
+        for device in _list_plugged_devices():
+            mice.append(_open_device(device, pool=pool, lock=lock))
+    except Exception:
+        for mouse_ in mice:
+            mouse_.close()
+        raise
+    return mice
+
+
+def _apply_settings(mouse_, settings, save):
+    """Applies the given settings to a mouse, in a single batch.
+
+    :rtype: list(str)
+    :return: The names of the applied settings.
+    """
+    applied = []
+    with mouse_.batch(save=save):
+        for setting_name, value in settings.items():
+            if setting_name not in mouse_.mouse_profile["settings"]:
+                continue
+            method = getattr(mouse_, "set_%s" % setting_name)
+            if value is None:
+                method()
+            else:
+                method(value)
+            applied.append(setting_name)
+    return applied
+
+
+def _apply_to_device(target, settings, save, pool, lock):
+    """Opens the device if needed and applies the given settings to it.
+
+    :param target: A :class:`rivalcfg.mouse.Mouse`, or a device returned by
+                   :func:`_list_plugged_devices` (opened and closed here).
+    :rtype: dict
+    """
+    if isinstance(target, mouse.Mouse):
+        result = {
+            "name": target.name,
+            "vendor_id": target.vendor_id,
+            "product_id": target.product_id,
+            "path": None,
+        }
+    else:
+        result = {
+            "name": target["name"],
+            "vendor_id": target["vendor_id"],
+            "product_id": target["product_id"],
+            "path": target["path"],
+        }
+    result["applied"] = []
+    result["error"] = None
+
+    mouse_ = None
+    try:
+        if isinstance(target, mouse.Mouse):
+            mouse_ = target
+        else:
+            mouse_ = _open_device(target, pool=pool, lock=lock)
+        result["applied"] = _apply_settings(mouse_, settings, save)
+    except Exception as error:
+        result["error"] = error
+    finally:
+        if mouse_ is not None and mouse_ is not target:
+            mouse_.close()
+
+    return result
+
+
+def apply_to_all(settings, save=True, mice=None, pool=None, lock=False):
+    """Applies the same settings to all the plugged mice, in parallel.
+
+    Each device is handled by its own thread: as the delay between two
+    commands only applies to a given device, configuring several mice takes
+    about the same time as configuring one. An error with a device does not
+    prevent the others to be configured.
+
+    :param dict settings: The settings to apply, as a ``{setting_name:
+                          value}`` dict (e.g. ``{"color": "red"}``). Use
+                          ``None`` as value for the settings that take no
+                          value. Settings that a mouse does not support are
+                          ignored for this mouse.
+    :param bool save: Save the settings in the internal memory of the mice
+                      (default: ``True``).
+    :param list(rivalcfg.mouse.Mouse) mice: The mice to configure (optional,
+                                            by default all the plugged mice
+                                            are opened, and closed once
+                                            configured).
+    :param rivalcfg.usbhid.DevicePool pool: A device pool to borrow the HID
+                                            devices from (optional, see
+                                            :func:`rivalcfg.mouse.get_mouse`).
+    :param bool lock: Lock each device while it is configured (optional, see
+                      :func:`rivalcfg.mouse.get_mouse`).
+
+    :rtype: list(dict)
+    :return: The result of each device, in the same order as the devices.
+
+    ::
+
+       [
+           {
+               "name": ...,
+               "vendor_id": ...,
+               "product_id": ...,
+               "path": ...,  # The path of the endpoint, or None
+               "applied": [...],  # The names of the applied settings
+               "error": ...,  # The exception raised, or None
+           },
+       ]
+
+    >>> import rivalcfg
+    >>> rivalcfg.apply_to_all({"color": "red"})  # doctest: +SKIP
+    [{'name': 'SteelSeries Rival 100', ..., 'applied': ['color'], 'error': None}]
+    """
+    targets = mice if mice is not None else _list_plugged_devices()
+    if not targets:
+        return []
+
+    # Imported here as it is slow to import (it imports logging)
+    import concurrent.futures
+
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=len(targets),
+        thread_name_prefix="rivalcfg-apply",
+    ) as executor:
+        futures = [
+            executor.submit(_apply_to_device, target, settings, save, pool, lock)
+            for target in targets
+        ]
+        return [future.result() for future in futures]
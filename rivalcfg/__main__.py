@@ -6,7 +6,9 @@ import argparse
 from . import cli
 from . import udev
 from . import devices
-from . import get_first_mouse
+from . import calibration
+from . import _open_device
+from . import _get_first_plugged_device
 
 _EPILOG = """
 Please report any bug on Github: https://github.com/flozz/rivalcfg/issues
@@ -55,6 +57,20 @@ def _render_battery_level(level=None, is_charging=None):
     return " ".join(result)
 
 
+def _handle_main_options(args):
+    """Handles the options that do not need a device (``--list``,
+    ``--version``,...). They exit once done, so the device is not even
+    looked for.
+    """
+    # Abbreviations are only resolved by the full parser, as they may match
+    # an option of the mouse too
+    cli_parser = argparse.ArgumentParser(
+        prog="rivalcfg", add_help=False, allow_abbrev=False
+    )
+    cli.add_main_cli(cli_parser)
+    cli_parser.parse_known_args(args)
+
+
 def main(args=sys.argv[1:]):
     # Display a message when no argument given
     if not args:
@@ -64,37 +80,42 @@ def main(args=sys.argv[1:]):
     # On Linux: check udev rules
     _check_linux()
 
-    # Try to open a mouse
-    mouse = None
-    if (
-        "--print-debug" not in args
-        and "--list" not in args
-        and "--version" not in args
-        and "--update-udev" not in args
-        and "--print-udev" not in args
-    ):
-        try:
-            mouse = get_first_mouse()
-        except IOError as error:
-            if "--help" not in args and "-h" not in args:
-                raise error
+    # Configure all the plugged devices
+    if args[0] == "fleet":
+        # Imported here as multiprocessing is only needed by this command
+        from . import fleet
 
-        if not mouse and "--help" not in args and "-h" not in args:
-            print("E: No supported device found.")
-            sys.exit(1)
+        sys.exit(fleet.main(args[1:]))
 
-    cli_parser = argparse.ArgumentParser(prog="rivalcfg", epilog=_EPILOG)
-    cli.add_main_cli(cli_parser)
+    _handle_main_options(args)
 
-    if mouse:
+    # Find the mouse, without opening it, to parse its options
+    device = _get_first_plugged_device()
+    mouse_profile = None
+    if device:
         mouse_profile = devices.get_profile(
-            vendor_id=mouse.vendor_id,
-            product_id=mouse.product_id,
+            vendor_id=device["vendor_id"],
+            product_id=device["product_id"],
         )
-        cli.add_mouse_cli(cli_parser, mouse_profile)
+    elif "--help" not in args and "-h" not in args:
+        print("E: No supported device found.")
+        sys.exit(1)
 
-    settings = cli_parser.parse_args(args)
+    settings = cli.get_parser(mouse_profile, epilog=_EPILOG).parse_args(args)
 
+    if not device:
+        return
+
+    # The mouse is only opened once the options are valid. It stays locked
+    # for the other processes until it is closed.
+    mouse = _open_device(device, lock=True)
+    try:
+        _run(mouse, settings)
+    finally:
+        mouse.close()
+
+
+def _run(mouse, settings):
     # Print firmware and exit
     if hasattr(settings, "FIRMWARE_VERSION") and settings.FIRMWARE_VERSION:
         print("%s (firmware v%s)" % (mouse.name, mouse.firmware_version))
@@ -111,23 +132,20 @@ def main(args=sys.argv[1:]):
         )
         sys.exit(0)
 
-    # Reset
-    if mouse and settings.RESET:
-        mouse.reset_settings()
-
-    # Apply settings
-    if mouse:
-        for setting_name, value in [(k.lower(), v) for k, v in vars(settings).items()]:
-            if value is None:
-                continue
-            method_name = "set_%s" % setting_name
-            if not hasattr(mouse, method_name):
-                continue
-            getattr(mouse, method_name)(value)
-
-        # Save settings in the internal device memory
-        if settings.SAVE:
-            mouse.save()
+    # Calibrate the command delay and exit
+    if (
+        hasattr(settings, "CALIBRATE_COMMAND_DELAY")
+        and settings.CALIBRATE_COMMAND_DELAY
+    ):
+        try:
+            delay = calibration.calibrate_command_delay(mouse)
+        except calibration.CalibrationError as error:
+            print("E: %s" % error)
+            sys.exit(1)
+        print("Command delay of the %s: %.3f s" % (mouse.name, delay))
+        sys.exit(0)
+
+    cli.apply_settings(mouse, settings)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,229 @@
+"""
+This module provides an :mod:`asyncio` API on top of
+:class:`rivalcfg.mouse.Mouse`, for applications built around an event loop.
+
+The delay between two commands is awaited with :func:`asyncio.sleep`, and the
+blocking calls to the HID device are run in a thread (see
+:func:`asyncio.to_thread`), so a single event loop can drive many devices
+concurrently. The commands of a given device are still sent one after the
+other.
+
+::
+
+    import asyncio
+    from rivalcfg import aio
+
+    async def main():
+        async with await aio.get_mouse(product_id=0x1702) as mouse:
+            await mouse.set_color("red")
+            await mouse.set_light_effect("breath")
+            print(await mouse.battery)
+            await mouse.save()
+
+    asyncio.run(main())
+"""
+
+import os
+import asyncio
+
+from . import mouse as mouse_module
+
+
+async def get_mouse(vendor_id=0x1038, product_id=None, **kwargs):
+    """Get an :class:`AsyncMouse` instance to manipulate requested device.
+
+    The device is opened (and locked, if requested) in a thread.
+
+    :param int vendor_id: The vendor id of the device (optional, by default
+                          this is set to the SteelSeries vendor id
+                          (``0x1038``)).
+    :param int product_id: The product id of one of the supported device (e.g.
+                           ``0x1702``).
+    :param kwargs: The other parameters of
+                   :func:`rivalcfg.mouse.get_mouse` (``path``, ``pool``,
+                   ``lock``,...).
+    :raise rivalcfg.devices.UnsupportedDevice: The requested device is not
+                                               supported by rivalcfg.
+    :rtype: AsyncMouse
+
+    >>> import asyncio
+    >>> from rivalcfg import aio
+    >>> asyncio.run(aio.get_mouse(vendor_id=0x1038, product_id=0x1702))
+    <AsyncMouse <Mouse SteelSeries Rival 100 (1038:1702:00)>>
+    """
+    mouse = await asyncio.to_thread(
+        mouse_module.get_mouse,
+        vendor_id=vendor_id,
+        product_id=product_id,
+        **kwargs,
+    )
+    return AsyncMouse(mouse)
+
+
+def _make_setting_method(setting_name, setting_info):
+    """Creates the ``set_<setting_name>`` coroutine method of a setting.
+
+    :param str setting_name: The name of the setting.
+    :param dict setting_info: The information dict of the setting from the
+                              device profile.
+    :rtype: function
+    """
+
+    async def set_setting(self, *args, force=False):
+        return await self.set(setting_name, *args, force=force)
+
+    set_setting.__name__ = "set_%s" % setting_name
+    set_setting.__qualname__ = "AsyncMouse.set_%s" % setting_name
+    set_setting.__doc__ = mouse_module._get_setting_method_doc(setting_info)
+
+    return set_setting
+
+
+class AsyncMouse:
+    """Wraps a :class:`rivalcfg.mouse.Mouse` to drive it from an
+    :mod:`asyncio` event loop.
+
+    The ``set_<setting_name>`` methods of the mouse are available as
+    coroutines. As for :class:`rivalcfg.mouse.Mouse`, they are defined by a
+    subclass generated for the profile of the mouse (see
+    :func:`rivalcfg.mouse.get_mouse_class`).
+
+    :param rivalcfg.mouse.Mouse mouse: The mouse. It should not be used
+                                       directly anymore, as the commands sent
+                                       by this wrapper could be mixed with
+                                       the others.
+    """
+
+    _profile_class = False
+    _make_setting_method = staticmethod(_make_setting_method)
+
+    def __new__(cls, mouse):
+        if not cls._profile_class:
+            cls = mouse_module.get_mouse_class(mouse.mouse_profile, base_class=cls)
+        return super().__new__(cls)
+
+    def __init__(self, mouse):
+        """Constructor."""
+        #: The wrapped mouse.
+        self.mouse = mouse
+        self._lock = asyncio.Lock()
+
+    @property
+    def name(self):
+        """The mouse name."""
+        return self.mouse.name
+
+    @property
+    def vendor_id(self):
+        """The mouse vendor id."""
+        return self.mouse.vendor_id
+
+    @property
+    def product_id(self):
+        """The mouse product id."""
+        return self.mouse.product_id
+
+    @property
+    def mouse_settings(self):
+        """The settings of the mouse (see
+        :class:`rivalcfg.mouse_settings.MouseSettings`).
+        """
+        return self.mouse.mouse_settings
+
+    @property
+    def firmware_version_tuple(self):
+        """Awaitable that returns the firmware version of the device as a
+        tuple (see :attr:`rivalcfg.mouse.Mouse.firmware_version_tuple`).
+        """
+        return self._call(lambda: self.mouse.firmware_version_tuple)
+
+    @property
+    def firmware_version(self):
+        """Awaitable that returns the firmware version as an human readable
+        string (see :attr:`rivalcfg.mouse.Mouse.firmware_version`).
+        """
+        return self._call(lambda: self.mouse.firmware_version)
+
+    @property
+    def battery(self):
+        """Awaitable that returns information about the device battery (see
+        :attr:`rivalcfg.mouse.Mouse.battery`).
+        """
+        return self._call(lambda: self.mouse.battery)
+
+    async def set(self, setting_name, *args, force=False):
+        """Sets the value of a setting.
+
+        :param str setting_name: The name of the setting.
+        :param args: The value(s) of the setting.
+        :param bool force: Send the setting even if the device already has it
+                           (see :attr:`rivalcfg.mouse.Mouse.skip_unchanged`).
+        :raise AttributeError: The mouse has no such setting.
+        :raise ValueError: The value is not valid.
+        :return: The response of the device if the setting requires a
+                 readback, else ``None``.
+        """
+        if setting_name not in self.mouse.mouse_profile["settings"]:
+            raise AttributeError(
+                "%s has no '%s' setting" % (self.mouse.name, setting_name)
+            )
+        return await self._call(
+            self.mouse._set_setting, setting_name, *args, force=force
+        )
+
+    async def reset_settings(self, force=False):
+        """Sets all settings to their factory default values (see
+        :meth:`rivalcfg.mouse.Mouse.reset_settings`).
+
+        :param bool force: See :meth:`rivalcfg.mouse.Mouse.reset_settings`.
+        """
+        for name, setting_info in self.mouse.mouse_profile["settings"].items():
+            if (
+                "value_type" in setting_info
+                and setting_info["value_type"]
+                and setting_info["value_type"] != "none"
+            ):
+                await self.set(name, setting_info["default"], force=force)
+            else:
+                await self.set(name, force=force)
+
+    async def save(self, force=False):
+        """Save current config to the mouse internal memory (see
+        :meth:`rivalcfg.mouse.Mouse.save`).
+
+        :param bool force: See :meth:`rivalcfg.mouse.Mouse.save`.
+        """
+        return await self._call(self.mouse.save, force=force)
+
+    async def close(self):
+        """Close the device (see :meth:`rivalcfg.mouse.Mouse.close`)."""
+        async with self._lock:
+            await asyncio.to_thread(self.mouse.close)
+
+    async def _call(self, function, *args, **kwargs):
+        """Calls a function that sends a command to the device, once the
+        previous command of the device is done and the command delay is
+        elapsed.
+
+        :param function: The function.
+        :param args: The positional arguments of the function.
+        :param kwargs: The keyword arguments of the function.
+        :return: The return value of the function.
+        """
+        async with self._lock:
+            # Avoids sending multiple commands to quickly, without blocking
+            # the event loop (the pacer of the mouse has nothing left to wait)
+            if "RIVALCFG_DEBUG_NO_COMMAND_DELAY" not in os.environ:
+                remaining = self.mouse._pacer.remaining()
+                if remaining > 0:
+                    await asyncio.sleep(remaining)
+            return await asyncio.to_thread(function, *args, **kwargs)
+
+    def __repr__(self):
+        return "<AsyncMouse %r>" % self.mouse
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, type_, value, traceback):
+        await self.close()
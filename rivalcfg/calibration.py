@@ -0,0 +1,310 @@
+"""
+This module calibrates the delay to wait between two commands sent to a device
+(see :attr:`rivalcfg.mouse.Mouse.command_delay`).
+
+The calibration sends bursts of harmless commands (firmware version or
+battery level requests) to the device with shrinking delays. The responses are
+only read once the whole burst is sent, so the commands are paced like the
+settings, that are sent without waiting for any response. The calibration
+stops as soon as a command is lost or gets an unexpected response. A safe
+delay is then computed from the smallest delay that worked, and stored for the
+device and its firmware version.
+
+Device profiles can declare the bounds of the delay::
+
+    profile = {
+
+        # ...
+
+        # (optional) Bounds of the delay between two commands (in seconds)
+        "command_delay": {
+            "min": 0.01,
+            "max": 0.1,
+        },
+
+    }
+
+.. NOTE::
+
+    Calibrated delays are stored in
+    ``$XDG_CONFIG_HOME/rivalcfg/command_delays.json``.
+"""
+
+import os
+import json
+import time
+import tempfile
+
+from .mouse_settings import get_xdg_config_home
+
+#: The default delay between two commands (in seconds).
+DEFAULT_COMMAND_DELAY = 0.05
+
+#: The lowest delay that can be used with any device (in seconds).
+MIN_COMMAND_DELAY = 0.001
+
+
+class CalibrationError(Exception):
+    """Exception raised when a device cannot be calibrated."""
+
+
+def get_calibration_path():
+    """Returns the path of the file where calibrated delays are stored.
+
+    :rtype: str
+    """
+    return os.path.join(get_xdg_config_home(), "rivalcfg", "command_delays.json")
+
+
+def get_command_delay_bounds(mouse_profile):
+    """Returns the bounds of the command delay declared in the profile.
+
+    :param dict mouse_profile: The mouse profile (``devices/*``).
+    :rtype: (float, float)
+    :return: ``(min, max)``.
+
+    >>> get_command_delay_bounds({"command_delay": {"min": 0.01}})
+    (0.01, 0.05)
+    >>> get_command_delay_bounds({})
+    (0.001, 0.05)
+    """
+    bounds = mouse_profile.get("command_delay", {})
+    min_delay = max(MIN_COMMAND_DELAY, bounds.get("min", MIN_COMMAND_DELAY))
+    max_delay = max(min_delay, bounds.get("max", DEFAULT_COMMAND_DELAY))
+    return min_delay, max_delay
+
+
+def clamp_command_delay(mouse_profile, delay):
+    """Clamps the given delay to the bounds declared in the profile.
+
+    :param dict mouse_profile: The mouse profile (``devices/*``).
+    :param float delay: The delay (in seconds).
+    :rtype: float
+
+    >>> clamp_command_delay({"command_delay": {"min": 0.1, "max": 0.2}}, 0.05)
+    0.1
+    """
+    min_delay, max_delay = get_command_delay_bounds(mouse_profile)
+    return min(max_delay, max(min_delay, delay))
+
+
+def _get_key(vendor_id, product_id, firmware_version):
+    return "%04x:%04x:%s" % (vendor_id, product_id, firmware_version)
+
+
+def _load_store():
+    path = get_calibration_path()
+    if not os.path.isfile(path):
+        return {}
+    try:
+        with open(path, "r") as file_:
+            return json.load(file_)
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def load_device_command_delay(vendor_id, product_id):
+    """Loads the calibrated delay of a device, whatever its firmware version.
+    If the device was calibrated with several firmware versions, the largest
+    delay is returned.
+
+    :param int vendor_id: The device's vendor id (e.g. ``0x1038``).
+    :param int product_id: The device's product id (e.g. ``0xbaad``).
+    :rtype: float
+    :return: The calibrated delay, or ``None`` if the device was not
+             calibrated.
+    """
+    prefix = "%04x:%04x:" % (vendor_id, product_id)
+    delays = [delay for key, delay in _load_store().items() if key.startswith(prefix)]
+    return max(delays) if delays else None
+
+
+def save_command_delay(vendor_id, product_id, firmware_version, delay):
+    """Stores the calibrated delay of a device.
+
+    :param int vendor_id: The device's vendor id (e.g. ``0x1038``).
+    :param int product_id: The device's product id (e.g. ``0xbaad``).
+    :param str firmware_version: The firmware version of the device.
+    :param float delay: The delay (in seconds).
+    """
+    store = _load_store()
+    store[_get_key(vendor_id, product_id, firmware_version)] = delay
+    path = get_calibration_path()
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    # The file is replaced at once, so other processes never read it
+    # partially written
+    temp_path = None
+    try:
+        with tempfile.NamedTemporaryFile(
+            "w", dir=os.path.dirname(path), suffix=".tmp", delete=False
+        ) as file_:
+            temp_path = file_.name
+            json.dump(store, file_, indent=2, sort_keys=True)
+        os.replace(temp_path, path)
+    except BaseException:
+        if temp_path is not None and os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _get_probe(mouse):
+    """Returns the description of the harmless command used to calibrate the
+    device (``"firmware_version"`` or ``"battery_level"`` of the profile).
+    """
+    for name in ("firmware_version", "battery_level"):
+        if name in mouse.mouse_profile:
+            return mouse.mouse_profile[name]
+    raise CalibrationError(
+        "The %s does not provide any command that can be used to calibrate it"
+        % mouse.name
+    )
+
+
+def _send_probes(mouse, probe, count):
+    """Sends a burst of probe commands, then reads their responses.
+
+    :rtype: [list(int)]
+    """
+    for _ in range(count):
+        mouse._hid_write(probe["report_type"], data=probe["command"])
+    responses = [
+        mouse._hid_device.read(
+            probe["response_length"],
+            timeout_ms=mouse.response_timeout_ms,
+        )
+        for _ in range(count)
+    ]
+    if not all(responses):
+        # The missing responses may still arrive
+        mouse._unread_responses = True
+    return responses
+
+
+def _probe_delay(mouse, probe, reference, delay, probe_count):
+    mouse.command_delay = delay
+    try:
+        responses = _send_probes(mouse, probe, probe_count)
+    except (IOError, OSError):
+        return False
+    return all(list(response) == reference for response in responses)
+
+
+def calibrate_command_delay(
+    mouse,
+    probe_count=10,
+    shrink_factor=0.5,
+    safety_factor=2,
+    save=True,
+):
+    """Finds the smallest delay the device supports between two commands, and
+    returns a safe delay computed from it.
+
+    .. WARNING::
+
+       This function sends commands very quickly to the device, which may
+       make it hang for a moment.
+
+    :param rivalcfg.mouse.Mouse mouse: The mouse to calibrate.
+    :param int probe_count: The number of commands sent for each tested delay.
+    :param float shrink_factor: The factor applied to the delay between two
+                                tests.
+    :param float safety_factor: The factor applied to the smallest working
+                                delay to compute the safe delay.
+    :param bool save: Store the computed delay (default: ``True``).
+
+    :raise CalibrationError: The device does not provide any harmless command
+                             that could be used to calibrate it, or does not
+                             respond reliably even with the highest delay.
+    :raise RuntimeError: The report reader of the mouse is running (see
+                         :meth:`rivalcfg.mouse.Mouse.start_report_reader`).
+    :rtype: float
+    :return: The safe delay (in seconds), already applied to the mouse.
+    """
+    if mouse._report_reader is not None:
+        raise RuntimeError("The report reader must be stopped during calibration")
+    min_delay, max_delay = get_command_delay_bounds(mouse.mouse_profile)
+    probe = _get_probe(mouse)
+
+    # Missing responses are expected here, they must not disable the reads
+    no_response_cooldown = mouse.no_response_cooldown
+    mouse.no_response_cooldown = 0
+    try:
+        return _calibrate_command_delay(
+            mouse,
+            probe,
+            min_delay,
+            max_delay,
+            probe_count,
+            shrink_factor,
+            safety_factor,
+            save,
+        )
+    finally:
+        mouse.no_response_cooldown = no_response_cooldown
+
+
+def _calibrate_command_delay(
+    mouse,
+    probe,
+    min_delay,
+    max_delay,
+    probe_count,
+    shrink_factor,
+    safety_factor,
+    save,
+):
+    mouse.command_delay = max_delay
+    reference = list(_send_probes(mouse, probe, 1)[0])
+    if not reference:
+        raise CalibrationError("The %s does not respond" % mouse.name)
+
+    best_delay = None
+    delay = max_delay
+    while True:
+        if not _probe_delay(mouse, probe, reference, delay, probe_count):
+            # Let the device recover from the failed test
+            time.sleep(max_delay)
+            break
+        best_delay = delay
+        if delay <= min_delay:
+            break
+        delay = max(min_delay, delay * shrink_factor)
+
+    if best_delay is None:
+        mouse.command_delay = max_delay
+        raise CalibrationError("The %s does not respond reliably" % mouse.name)
+
+    safe_delay = clamp_command_delay(mouse.mouse_profile, best_delay * safety_factor)
+    mouse.command_delay = safe_delay
+
+    if save:
+        save_command_delay(
+            mouse.vendor_id,
+            mouse.product_id,
+            mouse.firmware_version,
+            safe_delay,
+        )
+
+    return safe_delay
+
+
+def apply_calibrated_delay(mouse):
+    """Applies the stored calibrated delay (if any) to the given mouse. The
+    delay is clamped to the bounds declared in the mouse profile.
+
+    .. NOTE::
+
+       The firmware version is not requested to the device, so nothing is
+       sent to it: the delay is the largest one calibrated for the device
+       (see :func:`load_device_command_delay`). Stored delays are ignored when
+       the ``RIVALCFG_DRY`` environment variable is set.
+
+    :param rivalcfg.mouse.Mouse mouse: The mouse.
+    """
+    delay = mouse.command_delay
+    if "RIVALCFG_DRY" not in os.environ:
+        calibrated_delay = load_device_command_delay(mouse.vendor_id, mouse.product_id)
+        if calibrated_delay is not None:
+            delay = calibrated_delay
+    mouse.command_delay = clamp_command_delay(mouse.mouse_profile, delay)
@@ -4,7 +4,6 @@ This module generates rivalcfg's CLI.
 
 import os
 import sys
-import types
 import platform
 import argparse
 
@@ -14,6 +13,9 @@ from . import udev
 from . import debug
 from .version import VERSION
 
+#: The parsers built by :func:`get_parser`.
+_PARSERS = {}
+
 
 def normalize_cli_option_name(name):
     """Helper function to transform a setting name to a cli option.
@@ -31,23 +33,25 @@ class PrintSupportedDevicesAction(argparse.Action):
     """Print supported devices and exit."""
 
     def __call__(self, parser, namespace, value, option_string=None):
-        for item in [getattr(devices, name) for name in dir(devices)]:
-            if not isinstance(item, types.ModuleType):
-                continue
-            if not hasattr(item, "profile"):
-                continue
-            print("%s:" % item.profile["name"])
-            print()
-            for model in item.profile["models"]:
-                print(
-                    "  %04x:%04x | %s"
-                    % (
-                        model["vendor_id"],
-                        model["product_id"],
-                        model["name"],
-                    )
+        family = None
+        for device in sorted(
+            devices.list_supported_devices(), key=lambda device: device["module"]
+        ):
+            if device["module"] != family:
+                if family is not None:
+                    print()
+                family = device["module"]
+                print("%s:" % device["family"])
+                print()
+            print(
+                "  %04x:%04x | %s"
+                % (
+                    device["vendor_id"],
+                    device["product_id"],
+                    device["name"],
                 )
-            print()
+            )
+        print()
         sys.exit(0)
 
 
@@ -109,6 +113,14 @@ def add_main_cli(cli_parser):
         default=True,
     )
 
+    cli_parser.add_argument(
+        "--skip-unchanged",
+        help="Do not resend the settings the device already has",
+        dest="SKIP_UNCHANGED",
+        action="store_true",
+        default=False,
+    )
+
     cli_parser.add_argument(
         "--update-udev",
         help="Updates udev rules (Linux only, requires to be run as root)",
@@ -141,7 +153,7 @@ def add_mouse_cli(cli_parser, mouse_profile):
     cli_group = cli_parser.add_argument_group("%s Options" % mouse_profile["name"])
 
     for setting_name, setting_info in mouse_profile["settings"].items():
-        handler = getattr(handlers, setting_info["value_type"])
+        handler = handlers.get_handler(setting_info["value_type"])
         handler.add_cli_option(cli_group, setting_name, setting_info)
 
     cli_group.add_argument(
@@ -167,3 +179,65 @@ def add_mouse_cli(cli_parser, mouse_profile):
             dest="BATTERY_LEVEL",
             action="store_true",
         )
+
+    if "firmware_version" in mouse_profile or "battery_level" in mouse_profile:
+        cli_group.add_argument(
+            "--calibrate-command-delay",
+            help="Measure and store a safe delay between two commands for this mouse and exit",
+            dest="CALIBRATE_COMMAND_DELAY",
+            action="store_true",
+        )
+
+
+def get_parser(mouse_profile=None, prog="rivalcfg", epilog=None):
+    """Returns a parser with the main CLI options and, if a mouse profile is
+    given, the options of this mouse (see :func:`add_main_cli` and
+    :func:`add_mouse_cli`).
+
+    Parsers are built once for each profile and then reused, so the returned
+    parser must not be modified.
+
+    :param mouse_profile: One of the rivalcfg mouse profile (provided by
+                            :func:`rivalcfg.devices.get_profile`, optional).
+    :param str prog: The name of the program, displayed in the help.
+    :param str epilog: The text displayed at the end of the help (optional).
+    :rtype: ArgumentParser
+    """
+    # The profile is kept with its parser, so its id cannot be reused
+    key = (id(mouse_profile), prog, epilog)
+    if key not in _PARSERS:
+        cli_parser = argparse.ArgumentParser(prog=prog, epilog=epilog)
+        add_main_cli(cli_parser)
+        if mouse_profile:
+            add_mouse_cli(cli_parser, mouse_profile)
+        _PARSERS[key] = (mouse_profile, cli_parser)
+    return _PARSERS[key][1]
+
+
+def apply_settings(mouse, settings):
+    """Applies the settings parsed from the CLI options to the mouse.
+
+    The reset (``--reset``) and the settings are sent in a single batch (see
+    :meth:`rivalcfg.mouse.Mouse.batch`): settings changed by both are only
+    sent once.
+
+    :param rivalcfg.mouse.Mouse mouse: The mouse.
+    :param argparse.Namespace settings: The parsed options (see
+                                        :func:`add_main_cli` and
+                                        :func:`add_mouse_cli`).
+    """
+    mouse.skip_unchanged = settings.SKIP_UNCHANGED
+
+    with mouse.batch(save=settings.SAVE):
+        # Reset
+        if settings.RESET:
+            mouse.reset_settings()
+
+        # Apply settings
+        for setting_name, value in [(k.lower(), v) for k, v in vars(settings).items()]:
+            if value is None:
+                continue
+            method_name = "set_%s" % setting_name
+            if not hasattr(mouse, method_name):
+                continue
+            getattr(mouse, method_name)(value)
@@ -0,0 +1,359 @@
+"""
+This module provides a queued mode for :class:`rivalcfg.mouse.Mouse`, for GUI
+and daemon integrations that must not be blocked by the device.
+
+A worker thread owns the device: it sends the commands one after the other,
+paced as usual, while the callers immediately get a
+:class:`concurrent.futures.Future` back. Commands have a priority, so
+interactive changes (colors, sensitivity) are sent before bulk changes
+(buttons mapping). A pending change of a setting is superseded by the next
+change of the same setting: only the last value is sent, and both futures get
+its result.
+
+Saving and resetting the settings are barriers: they are sent after all the
+commands queued before them, whatever their priority, and before all the
+commands queued after them.
+
+::
+
+    from rivalcfg import get_first_mouse
+    from rivalcfg.command_queue import QueuedMouse
+
+    with QueuedMouse(get_first_mouse()) as mouse:
+        mouse.set_color("red")
+        mouse.set_buttons("buttons(button2=button3; button3=button2)")
+        mouse.set_color("blue")  # Sent first, "red" is never sent
+        mouse.save().result()  # Waits until everything is saved
+"""
+
+import heapq
+import functools
+import itertools
+import threading
+import concurrent.futures
+
+from . import encoders
+
+#: Priority of the interactive commands (colors, sensitivity,...).
+PRIORITY_HIGH = 0
+
+#: Default priority of the commands.
+PRIORITY_NORMAL = 50
+
+#: Priority of the bulk commands (buttons mapping, save,...).
+PRIORITY_LOW = 100
+
+_PRIORITY_CLOSE = float("inf")
+
+_PRIORITY_BARRIER = float("inf")
+
+_HIGH_PRIORITY_HANDLERS = (
+    "rgbcolor",
+    "reactive_rgbcolor",
+    "rgbgradient",
+    "rgbgradientv2",
+    "range",
+    "range_choice",
+    "multidpi_range",
+    "multidpi_range_choice",
+    "multidpi_range_choice_xy",
+)
+
+_LOW_PRIORITY_HANDLERS = ("buttons",)
+
+
+def get_default_priority(setting_info):
+    """Returns the default priority of the commands of a setting, from its
+    handler.
+
+    :param dict setting_info: The information dict of the setting from the
+                              device profile.
+    :rtype: int
+
+    >>> get_default_priority({"value_type": "rgbcolor"}) == PRIORITY_HIGH
+    True
+    >>> get_default_priority({"value_type": "buttons"}) == PRIORITY_LOW
+    True
+    """
+    value_type = setting_info.get("value_type")
+    if value_type in _HIGH_PRIORITY_HANDLERS:
+        return PRIORITY_HIGH
+    if value_type in _LOW_PRIORITY_HANDLERS:
+        return PRIORITY_LOW
+    return PRIORITY_NORMAL
+
+
+def _copy_future_state(source, target):
+    """Copies the outcome of a done future to another one."""
+    if target.done() or not target.set_running_or_notify_cancel():
+        return
+    if source.cancelled():
+        target.set_exception(concurrent.futures.CancelledError())
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+
+class _Superseded:
+    """Marks the superseded commands."""
+
+
+class _Command:
+    __slots__ = ("priority", "key", "function", "args", "kwargs", "future")
+
+    def __init__(self, priority, key, function, args, kwargs):
+        self.priority = priority
+        self.key = key
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.future = concurrent.futures.Future()
+
+
+class CommandQueue:
+    """Runs functions in a worker thread, by priority.
+
+    :param str name: The name of the worker thread (optional).
+
+    >>> from rivalcfg.command_queue import CommandQueue
+    >>> queue = CommandQueue()
+    >>> queue.submit(sum, [1, 2, 3]).result()
+    6
+    >>> queue.close()
+    """
+
+    def __init__(self, name="rivalcfg-command-queue"):
+        """Constructor."""
+        self._heap = []
+        self._pending = {}
+        self._sequence = itertools.count()
+        self._epoch = 0
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(
+        self,
+        function,
+        *args,
+        priority=PRIORITY_NORMAL,
+        key=None,
+        barrier=False,
+        **kwargs,
+    ):
+        """Queues a function call.
+
+        :param function: The function to call in the worker thread.
+        :param args: The positional arguments of the function.
+        :param int priority: The priority of the call (the lowest first).
+        :param key: Calls with the same key supersede each other (optional):
+                    a pending call is dropped when a new one is submitted.
+                    Its future gets the result of the new call, which keeps
+                    the highest of the two priorities.
+        :param bool barrier: The call is run after all the calls submitted
+                             before it and before all the calls submitted
+                             after it, whatever their priority (the
+                             ``priority`` and ``key`` parameters are ignored).
+        :param kwargs: The keyword arguments of the function.
+        :raise RuntimeError: The queue is closed.
+        :rtype: concurrent.futures.Future
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("The command queue is closed")
+            if barrier:
+                command = _Command(_PRIORITY_BARRIER, None, function, args, kwargs)
+                self._push(command)
+                # Later calls neither run before nor supersede earlier ones
+                self._epoch += 1
+                self._pending.clear()
+                self._condition.notify()
+                return command.future
+            command = _Command(priority, key, function, args, kwargs)
+            if key is not None and key in self._pending:
+                previous = self._pending.pop(key)
+                # Dropped when popped from the heap
+                previous.key = _Superseded
+                command.priority = min(previous.priority, priority)
+                command.future.add_done_callback(
+                    lambda future: _copy_future_state(future, previous.future)
+                )
+            if key is not None:
+                self._pending[key] = command
+            self._push(command)
+            self._condition.notify()
+        return command.future
+
+    def _push(self, command, priority=None):
+        if priority is None:
+            priority = command.priority
+        heapq.heappush(
+            self._heap, (self._epoch, priority, next(self._sequence), command)
+        )
+
+    def close(self, wait=True):
+        """Stops accepting new calls. The pending ones are still run.
+
+        :param bool wait: Wait until all the pending calls are done.
+        """
+        with self._condition:
+            if not self._closed:
+                self._push(None, priority=_PRIORITY_CLOSE)
+                self._closed = True
+                self._condition.notify()
+        if wait and threading.current_thread() is not self._thread:
+            self._thread.join()
+
+    def __len__(self):
+        """The number of pending calls."""
+        with self._condition:
+            return len([c for *_, c in self._heap if c and c.key is not _Superseded])
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._heap:
+                    self._condition.wait()
+                *_, command = heapq.heappop(self._heap)
+                if command is None:
+                    return
+                if command.key is _Superseded:
+                    continue
+                if self._pending.get(command.key) is command:
+                    del self._pending[command.key]
+            if not command.future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = command.function(*command.args, **command.kwargs)
+            except BaseException as error:
+                command.future.set_exception(error)
+            else:
+                command.future.set_result(result)
+
+
+class QueuedMouse:
+    """Wraps a :class:`rivalcfg.mouse.Mouse` to send its commands from a
+    worker thread (see :class:`CommandQueue`).
+
+    The ``set_<setting_name>`` methods of the mouse are available, with an
+    additional ``priority`` keyword argument. They check the value and return
+    a :class:`concurrent.futures.Future` right away.
+
+    :param rivalcfg.mouse.Mouse mouse: The mouse. It must not be used directly
+                                       anymore: the worker thread owns it, and
+                                       closes it when the queue is closed.
+
+    >>> from rivalcfg.mouse import get_mouse
+    >>> from rivalcfg.command_queue import QueuedMouse
+    >>> with QueuedMouse(get_mouse(vendor_id=0x1038, product_id=0x1702)) as mouse:
+    ...     future = mouse.set_color("red")
+    >>> future.done()
+    True
+    """
+
+    def __init__(self, mouse):
+        """Constructor."""
+        #: The wrapped mouse.
+        self.mouse = mouse
+        self._queue = CommandQueue()
+
+    def set(self, setting_name, *args, priority=None, force=False):
+        """Queues the change of a setting.
+
+        :param str setting_name: The name of the setting.
+        :param args: The value(s) of the setting.
+        :param int priority: The priority of the command (optional, by default
+                             it depends on the setting, see
+                             :func:`get_default_priority`).
+        :param bool force: Send the setting even if the device already has it
+                           (see :attr:`rivalcfg.mouse.Mouse.skip_unchanged`).
+        :raise AttributeError: The mouse has no such setting.
+        :raise ValueError: The value is not valid.
+        :rtype: concurrent.futures.Future
+        """
+        if setting_name not in self.mouse.mouse_profile["settings"]:
+            raise AttributeError(
+                "%s has no '%s' setting" % (self.mouse.name, setting_name)
+            )
+        # Invalid values are reported to the caller right away
+        encoders.get_encoder(self.mouse.mouse_profile, setting_name).encode(*args)
+        if priority is None:
+            priority = get_default_priority(
+                self.mouse.mouse_profile["settings"][setting_name]
+            )
+        return self._queue.submit(
+            getattr(self.mouse, "set_%s" % setting_name),
+            *args,
+            priority=priority,
+            key=("set", setting_name),
+            force=force,
+        )
+
+    def save(self, force=False):
+        """Queues the saving of the settings in the internal memory of the
+        mouse (see :meth:`rivalcfg.mouse.Mouse.save`).
+
+        The saving is a barrier: it is sent after all the commands queued
+        before it, and before all the commands queued after it.
+
+        :param bool force: See :meth:`rivalcfg.mouse.Mouse.save`.
+        :rtype: concurrent.futures.Future
+        """
+        return self._queue.submit(self.mouse.save, barrier=True, force=force)
+
+    def reset_settings(self, force=False):
+        """Queues the reset of all the settings to their factory values (see
+        :meth:`rivalcfg.mouse.Mouse.reset_settings`).
+
+        The reset is a barrier: it is sent after all the commands queued
+        before it, and before all the commands queued after it.
+
+        :param bool force: See :meth:`rivalcfg.mouse.Mouse.reset_settings`.
+        :rtype: concurrent.futures.Future
+        """
+        return self._queue.submit(self.mouse.reset_settings, barrier=True, force=force)
+
+    def call(self, function, *args, priority=PRIORITY_NORMAL):
+        """Queues a call to any function that uses the mouse (e.g. to read its
+        battery level).
+
+        :param function: The function. It is called with the mouse as first
+                         argument, followed by ``args``.
+        :param int priority: The priority of the command.
+        :rtype: concurrent.futures.Future
+
+        >>> mouse.call(lambda mouse: mouse.battery)  # doctest: +SKIP
+        """
+        return self._queue.submit(function, self.mouse, *args, priority=priority)
+
+    def close(self, wait=True):
+        """Sends the pending commands and closes the mouse.
+
+        :param bool wait: Wait until the mouse is closed.
+        """
+        try:
+            self._queue.submit(self.mouse.close, priority=_PRIORITY_CLOSE)
+        except RuntimeError:
+            return  # Already closed
+        self._queue.close(wait=wait)
+
+    def __getattr__(self, name):
+        if name.startswith("set_") and name[4:] in self.mouse.mouse_profile.get(
+            "settings", {}
+        ):
+            # Cached on the instance: __getattr__ is not called again
+            setter = functools.partial(self.set, name[4:])
+            setattr(self, name, setter)
+            return setter
+        raise AttributeError("QueuedMouse instance has no attribute '%s'" % name)
+
+    def __repr__(self):
+        return "<QueuedMouse %r>" % self.mouse
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type_, value, traceback):
+        self.close()
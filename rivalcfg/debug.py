@@ -2,9 +2,9 @@ import sys
 import os.path
 import platform
 
-import hid
 from .version import VERSION
 from . import udev
+from . import usbhid
 from .mouse import get_mouse
 
 
@@ -47,18 +47,27 @@ def _get_rivalcfg_info():
     return result
 
 
+def _get_hidapi_version():
+    try:
+        import hid
+    except ImportError:
+        return "not installed"
+    return getattr(hid, "__version__") if hasattr(hid, "__version__") else "???"
+
+
 def _get_python_info():
     result = _make_title("Python")
     result += "Python version: %d.%d.%d\n" % sys.version_info[:3]
-    result += "HIDAPI version: %s\n" % (
-        getattr(hid, "__version__") if hasattr(hid, "__version__") else "???"
+    result += "HIDAPI version: %s\n" % _get_hidapi_version()
+    result += "HID discovery: %s\n" % (
+        "sysfs" if usbhid.is_sysfs_available() else "hidapi"
     )
     return result
 
 
 def _get_plugged_device_list():
     result = _make_title("Plugged SteelSeries devices endpoints")
-    for device in hid.enumerate(0x1038):
+    for device in usbhid.enumerate_interfaces(0x1038):
         firmware_version = "0"
         try:
             with get_mouse(device["vendor_id"], device["product_id"]) as mouse:
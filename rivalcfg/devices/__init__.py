@@ -104,6 +104,27 @@ Here is what a profile file looks like::
             "response_length": 2,
         },
 
+        # (optional) How long to wait for the response of the device (in
+        # milliseconds, default: 200)
+        "response_timeout_ms": 200,
+
+        # (optional) Describes the response that acknowledges a command
+        # (only for commands with a "readback_length"). When a valid
+        # acknowledgement is received, the next command is sent without
+        # waiting for the command delay.
+        "ack": {
+            # The number of bytes of the command that the device echoes at
+            # the beginning of its response
+            "command_echo_length": 1,
+        },
+
+        # (optional) Bounds of the delay between two commands (in seconds).
+        # See the `rivalcfg.calibration` documentation for more information.
+        "command_delay": {
+            "min": 0.001,
+            "max": 0.05,
+        },
+
     }
 
 At runtime, a separated profile will be generated for each device of a mouse
@@ -127,6 +148,17 @@ familly. The profiles will then look like this::
     }
 
 
+Device index
+------------
+
+The supported devices are listed in ``rivalcfg/devices/_index.py``, so that
+the device modules are only imported when the profile of one of their devices
+is needed. This index must be regenerated each time a device module is added
+or a model is changed::
+
+    python scripts/generate_devices_index.py
+
+
 Module API
 ----------
 
@@ -139,13 +171,47 @@ Module API
                # profile data ...
            },
        }
+
+    This is a read-only mapping: the profiles of a device module are only
+    generated when one of them is accessed.
+
+
+Profile cache
+-------------
+
+Once generated, the profiles of a device module are stored in a cache (see
+:func:`get_profiles_cache_dir`), so the next runs load them without executing
+the device module. Only the device modules built from other modules (DPI
+lookup tables, other devices,...) are cached: the other ones are faster to
+run than to load from the cache. Any issue with the cache (missing, corrupted, not
+writable,...) is silently ignored and the profiles are generated from the
+device modules. The cache can be disabled by defining the
+``RIVALCFG_NO_PROFILES_CACHE`` environment variable.
+
+The cache is a JSON file: it holds data only, and loading it never runs
+code. For this reason, profiles can only reference module-level functions of
+the device modules (no lambdas), like the ones of
+:mod:`rivalcfg.devices.battery`. They are stored by name.
 """
 
 import os
+import sys
+import json
+import types
+import shutil
+import tempfile
+import importlib
+import threading
+import collections.abc
 
 from .. import usbhid
+from ..version import VERSION
+from . import _index
+
+_PROFILES_CACHE_DIR = None
 
-PROFILES = None
+# Version of the format of the profiles cache
+_PROFILES_CACHE_FORMAT = 2
 
 
 class UnsupportedDevice(Exception):
@@ -155,35 +221,202 @@ class UnsupportedDevice(Exception):
 def list_plugged_devices():
     """List all plugged devices that are supported by rivalcfg.
 
+    The bus is scanned only once per vendor id and the result is matched
+    against the device index (the device modules are not imported).
+
     :rtype: generator
 
     ::
 
        [
-           {"vendor_id": ..., "product_id": ..., "name": ...},
+           {
+               "vendor_id": ...,
+               "product_id": ...,
+               "name": ...,
+               "endpoint": ...,
+               "path": ...,  # The path of the endpoint, or None
+           },
        ]
 
+    The ``path`` item can be passed to :func:`rivalcfg.mouse.get_mouse` to
+    open the device without scanning the bus again.
+
     If the ``RIVALCFG_PROFILE=vendor_id:product_id`` environment varialbe is
     defined, only the corresponding profile will be listed.
     """
     if "RIVALCFG_PROFILE" in os.environ:
-        debug_vendor_id = int(os.environ["RIVALCFG_PROFILE"].split(":")[0], 16)
-        debug_product_id = int(os.environ["RIVALCFG_PROFILE"].split(":")[1], 16)
-        profile = PROFILES[(debug_vendor_id, debug_product_id)]
-        yield {
-            "vendor_id": profile["vendor_id"],
-            "product_id": profile["product_id"],
-            "name": profile["name"],
-        }
-    for profile in PROFILES.values():
-        if usbhid.is_device_plugged(profile["vendor_id"], profile["product_id"]):
+        yield _get_debug_device()
+    vendor_ids = sorted({vendor_id for vendor_id, _ in _index.MODELS.keys()})
+    for vendor_id in vendor_ids:
+        index = usbhid.enumerate_devices(vendor_id)
+        seen = set()
+        for _, product_id, _ in index.keys():
+            if product_id in seen or (vendor_id, product_id) not in _index.MODELS:
+                continue
+            seen.add(product_id)
+            _, name, endpoint = _index.MODELS[(vendor_id, product_id)]
             yield {
-                "vendor_id": profile["vendor_id"],
-                "product_id": profile["product_id"],
-                "name": profile["name"],
+                "vendor_id": vendor_id,
+                "product_id": product_id,
+                "name": name,
+                "endpoint": endpoint,
+                "path": index.get((vendor_id, product_id, endpoint)),
             }
 
 
+def _get_debug_device():
+    """Returns the device defined by the ``RIVALCFG_PROFILE=vendor_id:product_id``
+    environment variable.
+
+    :rtype: dict
+    """
+    debug_vendor_id = int(os.environ["RIVALCFG_PROFILE"].split(":")[0], 16)
+    debug_product_id = int(os.environ["RIVALCFG_PROFILE"].split(":")[1], 16)
+    _, name, endpoint = _index.MODELS[(debug_vendor_id, debug_product_id)]
+    return {
+        "vendor_id": debug_vendor_id,
+        "product_id": debug_product_id,
+        "name": name,
+        "endpoint": endpoint,
+        "path": None,
+    }
+
+
+def list_all_plugged_devices():
+    """List all plugged devices that are supported by rivalcfg, like
+    :func:`list_plugged_devices`, but with one item per physical device: the
+    devices of a same model are all listed, each one with its own path.
+
+    :rtype: generator
+
+    If the ``RIVALCFG_PROFILE=vendor_id:product_id`` environment varialbe is
+    defined, the corresponding profile will be listed first, without path.
+    """
+    if "RIVALCFG_PROFILE" in os.environ:
+        yield _get_debug_device()
+    vendor_ids = sorted({vendor_id for vendor_id, _ in _index.MODELS.keys()})
+    for vendor_id in vendor_ids:
+        seen_paths = set()
+        for interface in usbhid.enumerate_interfaces(vendor_id):
+            profile_name = (interface["vendor_id"], interface["product_id"])
+            if profile_name not in _index.MODELS:
+                continue
+            _, name, endpoint = _index.MODELS[profile_name]
+            # Keep the endpoint of each device once (hidapi may report an
+            # interface once per usage page)
+            if interface["interface_number"] != endpoint:
+                continue
+            if interface["path"] in seen_paths:
+                continue
+            seen_paths.add(interface["path"])
+            yield {
+                "vendor_id": profile_name[0],
+                "product_id": profile_name[1],
+                "name": name,
+                "endpoint": endpoint,
+                "path": interface["path"],
+            }
+
+
+def get_discovery_cache_path():
+    """Returns the path of the file where the last plugged device found by
+    :func:`get_first_plugged_device` is cached
+    (``$XDG_CACHE_HOME/rivalcfg/plugged_device.json``).
+
+    :rtype: str
+    """
+    return os.path.join(get_xdg_cache_home(), "rivalcfg", "plugged_device.json")
+
+
+def _load_cached_plugged_device():
+    """Loads the device cached by :func:`get_first_plugged_device`, and checks
+    that it is still plugged.
+
+    :rtype: dict
+    :return: The device, or ``None`` if there is no cached device or if it is
+             not plugged anymore.
+    """
+    try:
+        with open(get_discovery_cache_path(), "r") as cache_file:
+            cached_device = json.load(cache_file)
+        profile_name = (cached_device["vendor_id"], cached_device["product_id"])
+        path = cached_device["path"].encode()
+    except Exception:
+        return None  # Missing or corrupted cache
+    if profile_name not in _index.MODELS:
+        return None
+    _, name, endpoint = _index.MODELS[profile_name]
+    # Only the sysfs entry of the device is read, the bus is not scanned
+    interface = usbhid.get_sysfs_interface(path)
+    if (
+        interface is None
+        or (interface["vendor_id"], interface["product_id"]) != profile_name
+        or interface["interface_number"] != endpoint
+    ):
+        return None
+    return {
+        "vendor_id": profile_name[0],
+        "product_id": profile_name[1],
+        "name": name,
+        "endpoint": endpoint,
+        "path": path,
+    }
+
+
+def _save_cached_plugged_device(device):
+    """Stores the given device in the discovery cache. Only devices discovered
+    through sysfs are cached, as they can be checked without scanning the bus.
+    Errors are ignored.
+
+    :param dict device: The device (see :func:`list_plugged_devices`).
+    """
+    if not device["path"] or usbhid.get_sysfs_interface(device["path"]) is None:
+        return
+    cache_path = get_discovery_cache_path()
+    temp_path = None
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", dir=os.path.dirname(cache_path), suffix=".tmp", delete=False
+        ) as cache_file:
+            temp_path = cache_file.name
+            json.dump(
+                {
+                    "vendor_id": device["vendor_id"],
+                    "product_id": device["product_id"],
+                    "path": device["path"].decode(),
+                },
+                cache_file,
+            )
+        os.replace(temp_path, cache_path)
+    except Exception:
+        if temp_path is not None and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def get_first_plugged_device():
+    """Returns the first plugged device that is supported by rivalcfg (see
+    :func:`list_plugged_devices`).
+
+    The device found is cached (see :func:`get_discovery_cache_path`). While
+    it stays plugged, it is returned without scanning the bus: checking it
+    only reads its sysfs entry. This cache is only available on Linux, and is
+    not used when the ``RIVALCFG_PROFILE`` environment variable is defined.
+
+    :rtype: dict
+    :return: The device, or ``None`` if no supported device is plugged.
+    """
+    if "RIVALCFG_PROFILE" in os.environ:
+        return next(list_plugged_devices(), None)
+    device = _load_cached_plugged_device()
+    if device is not None:
+        return device
+    device = next(list_plugged_devices(), None)
+    if device is not None:
+        _save_cached_plugged_device(device)
+    return device
+
+
 def get_profile(vendor_id=0x1038, product_id=None):
     """Get the profile of the requested device.
 
@@ -210,59 +443,319 @@ def get_profile(vendor_id=0x1038, product_id=None):
     return PROFILES[profile_name]
 
 
-def _generate_profiles():
-    """List devices imported in the current module and generates a separated
-    profile for each device variation.
+def list_supported_devices():
+    """List all the devices supported by rivalcfg, in the order of the device
+    modules. Only the device index is read: the device modules are not
+    imported.
+
+    :rtype: [dict]
+
+    ::
+
+       [
+           {
+               "vendor_id": ...,
+               "product_id": ...,
+               "name": ...,
+               "endpoint": ...,
+               "family": ...,  # The name of the familly of the device
+               "module": ...,  # The name of the device module
+           },
+       ]
+
+    >>> from rivalcfg import devices
+    >>> devices.list_supported_devices()[0]
+    {'vendor_id': 4152, 'product_id': 6198, 'name': 'SteelSeries Aerox 3', ...}
+    """
+    return [
+        {
+            "vendor_id": vendor_id,
+            "product_id": product_id,
+            "name": name,
+            "endpoint": endpoint,
+            "family": _index.FAMILIES[module_name],
+            "module": module_name,
+        }
+        for (vendor_id, product_id), (module_name, name, endpoint) in (
+            _index.MODELS.items()
+        )
+    ]
+
+
+def _generate_profiles(module_name):
+    """Imports a device module and generates a separated profile for each
+    device variation of its familly.
+
+    :param str module_name: The name of the device module (e.g.
+                            ``"rival100"``).
+    :rtype: dict
+    """
+    module = importlib.import_module("%s.%s" % (__name__, module_name))
+    return _get_models_profiles(module.profile)
 
+
+def _get_models_profiles(family_profile):
+    """Generates a separated profile for each device variation of a familly.
+
+    :param dict family_profile: The profile of the familly (the ``profile``
+                                of a device module).
     :rtype: dict
     """
-    from . import (  # noqa: F401
-        aerox3,
-        aerox3_wireless_wired,
-        aerox3_wireless_wireless,
-        aerox5,
-        aerox5_wireless_wired,
-        aerox5_wireless_wireless,
-        aerox9_wireless_wired,
-        aerox9_wireless_wireless,
-        kanav2,
-        kinzuv2,
-        prime,
-        prime_mini,
-        prime_plus,
-        prime_wireless_wired,
-        prime_wireless_wireless,
-        rival3,
-        rival3_gen2,
-        rival3_wireless,
-        rival3_wireless_gen2,
-        rival5,
-        rival95,
-        rival100,
-        rival110,
-        rival300,
-        rival300s,
-        rival310,
-        rival500,
-        rival600,
-        rival650,
-        rival700,
-        sensei310,
-        sensei_raw,
-        sensei_ten,
-    )
-
-    profile_modules = locals()
     profiles = {}
-    for item in profile_modules.values():
-        for model in item.profile["models"]:
-            profile = item.profile.copy()
-            profile_name = (model["vendor_id"], model["product_id"])
-            del profile["models"]
-            for k, v in model.items():
-                profile[k] = v
-            profiles[profile_name] = profile
+    for model in family_profile["models"]:
+        profile = family_profile.copy()
+        profile_name = (model["vendor_id"], model["product_id"])
+        del profile["models"]
+        for k, v in model.items():
+            profile[k] = v
+        profiles[profile_name] = profile
     return profiles
 
 
-PROFILES = _generate_profiles()
+def get_xdg_cache_home():
+    """Returns the path of the folder where to store the cached data
+    (generally ``$HOME/.cache``).
+
+    :rtype: str
+    """
+    if "XDG_CACHE_HOME" in os.environ and os.environ["XDG_CACHE_HOME"]:
+        return os.environ["XDG_CACHE_HOME"]
+    return os.path.join(os.path.expanduser("~"), ".cache")
+
+
+def get_profiles_cache_dir():
+    """Returns the path of the folder where the generated profiles are cached
+    (``$XDG_CACHE_HOME/rivalcfg/profiles-<version>/``).
+
+    The version includes the rivalcfg and Python versions and the format of
+    the cache, so each version uses its own cache.
+
+    :rtype: str
+    """
+    global _PROFILES_CACHE_DIR
+    if _PROFILES_CACHE_DIR is None:
+        _PROFILES_CACHE_DIR = os.path.join(
+            get_xdg_cache_home(),
+            "rivalcfg",
+            "profiles-%s-py%i.%i-%i"
+            % (
+                VERSION,
+                sys.version_info[0],
+                sys.version_info[1],
+                _PROFILES_CACHE_FORMAT,
+            ),
+        )
+    return _PROFILES_CACHE_DIR
+
+
+def _get_module_sources(module, sources=None):
+    """Lists the source files the profile of a device module is built from:
+    the device module, the device modules it imports, and this module.
+
+    :param module: The device module.
+    :rtype: [str]
+    """
+    if sources is None:
+        sources = [__file__]
+    sources.append(module.__file__)
+    for item in vars(module).values():
+        if (
+            isinstance(item, types.ModuleType)
+            and item.__name__.startswith(__name__ + ".")
+            and item.__file__ not in sources
+        ):
+            _get_module_sources(item, sources)
+    return sources
+
+
+def _get_sources_fingerprint(sources):
+    """Returns the size and the modification time of the given files.
+
+    :param [str] sources: The paths of the files.
+    :rtype: [tuple]
+    """
+    fingerprint = []
+    for path in sources:
+        stat = os.stat(path)
+        fingerprint.append((path, stat.st_size, stat.st_mtime_ns))
+    return fingerprint
+
+
+def _encode_cached_value(value):
+    """Converts a value of a profile to a JSON-serializable value (see
+    :func:`_decode_cached_value`).
+
+    :raise TypeError: The value cannot be stored in the cache.
+    """
+    if isinstance(value, types.FunctionType):
+        module = sys.modules.get(value.__module__)
+        if (
+            not value.__module__.startswith(__name__ + ".")
+            or getattr(module, value.__qualname__, None) is not value
+        ):
+            raise TypeError("Only the functions of the device modules can be cached")
+        return {"!function": "%s:%s" % (value.__module__, value.__qualname__)}
+    if isinstance(value, dict):
+        if all(type(key) is str and not key.startswith("!") for key in value):
+            return {key: _encode_cached_value(item) for key, item in value.items()}
+        if not all(type(key) in (str, int) for key in value):
+            raise TypeError("Only str and int keys can be cached")
+        return {
+            "!items": [[key, _encode_cached_value(item)] for key, item in value.items()]
+        }
+    if isinstance(value, list):
+        return [_encode_cached_value(item) for item in value]
+    if isinstance(value, tuple):
+        return {"!tuple": [_encode_cached_value(item) for item in value]}
+    if value is None or type(value) in (bool, int, float, str):
+        return value
+    raise TypeError("Values of type %s cannot be cached" % type(value).__name__)
+
+
+def _decode_cached_value(obj):
+    """Rebuilds the values encoded by :func:`_encode_cached_value` (hook for
+    :func:`json.load`).
+
+    :raise ValueError: Invalid cached value.
+    """
+    if "!items" in obj:
+        return dict(obj["!items"])
+    if "!tuple" in obj:
+        return tuple(obj["!tuple"])
+    if "!function" in obj:
+        module_name, _, function_name = obj["!function"].partition(":")
+        # Only the device modules can be imported
+        if not module_name.startswith(__name__ + ".") or "." in function_name:
+            raise ValueError("Invalid cached function %s" % obj["!function"])
+        function = getattr(importlib.import_module(module_name), function_name)
+        if not isinstance(function, types.FunctionType):
+            raise ValueError("Invalid cached function %s" % obj["!function"])
+        return function
+    return obj
+
+
+def _load_cached_profiles(module_name):
+    """Loads the profiles of a device module from the cache.
+
+    :param str module_name: The name of the device module.
+    :rtype: dict
+    :return: The profiles, or ``None`` if they are not available in the
+             cache, or if the source files changed since they were cached.
+    """
+    path = os.path.join(get_profiles_cache_dir(), "%s.json" % module_name)
+    try:
+        with open(path, "r") as cache_file:
+            # Files of other users are ignored (e.g. when run with sudo)
+            if os.fstat(cache_file.fileno()).st_uid != os.getuid():
+                return None
+            cache = json.load(cache_file, object_hook=_decode_cached_value)
+        fingerprint = [tuple(source) for source in cache["fingerprint"]]
+        sources = [source for source, _, _ in fingerprint]
+        if _get_sources_fingerprint(sources) != fingerprint:
+            return None  # Stale cache
+        return _get_models_profiles(cache["profile"])
+    except Exception:
+        return None  # Missing, corrupted or incompatible cache
+
+
+def _save_cached_profiles(module_name):
+    """Stores the profile of a device module in the cache. Errors are
+    ignored.
+
+    :param str module_name: The name of the device module.
+    """
+    cache_dir = get_profiles_cache_dir()
+    temp_path = None
+    try:
+        module = importlib.import_module("%s.%s" % (__name__, module_name))
+        sources = _get_module_sources(module)
+        # The device modules that do not import other ones (lookup tables,
+        # other devices,...) are faster to run than to load from the cache
+        if len(sources) <= 2:
+            return
+        fingerprint = _get_sources_fingerprint(sources)
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+            # Removes the caches of the previous versions
+            parent_dir = os.path.dirname(cache_dir)
+            for name in os.listdir(parent_dir):
+                path = os.path.join(parent_dir, name)
+                if name.startswith("profiles-") and path != cache_dir:
+                    shutil.rmtree(path, ignore_errors=True)
+        # Written to a temporary file first, so that a partially written
+        # cache is never read
+        cache = {
+            "fingerprint": fingerprint,
+            # The profiles of the models are generated from the profile of the
+            # familly, so the common parts are stored only once
+            "profile": _encode_cached_value(module.profile),
+        }
+        with tempfile.NamedTemporaryFile(
+            "w", dir=cache_dir, suffix=".tmp", delete=False
+        ) as cache_file:
+            temp_path = cache_file.name
+            json.dump(cache, cache_file, separators=(",", ":"))
+        os.replace(temp_path, os.path.join(cache_dir, "%s.json" % module_name))
+    except Exception:
+        if temp_path is not None and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _load_profiles(module_name):
+    """Loads the profiles of a device module, from the cache if possible (see
+    :func:`get_profiles_cache_dir`).
+
+    :param str module_name: The name of the device module (e.g.
+                            ``"rival100"``).
+    :rtype: dict
+    """
+    if "RIVALCFG_NO_PROFILES_CACHE" in os.environ:
+        return _generate_profiles(module_name)
+    profiles = _load_cached_profiles(module_name)
+    if profiles is None:
+        profiles = _generate_profiles(module_name)
+        _save_cached_profiles(module_name)
+    return profiles
+
+
+class _Profiles(collections.abc.Mapping):
+    """Read-only mapping of the profiles of the supported devices (see
+    :data:`PROFILES`). The keys come from the device index, and the profiles
+    of a device module are generated the first time one of them is accessed.
+    """
+
+    def __init__(self):
+        self._profiles = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, profile_name):
+        if profile_name not in self._profiles:
+            module_name = _index.MODELS[profile_name][0]
+            with self._lock:
+                # Profiles must be generated only once, as they are compared
+                # by identity (e.g. by rivalcfg.mouse.get_mouse_class())
+                if profile_name not in self._profiles:
+                    self._profiles.update(_load_profiles(module_name))
+        return self._profiles[profile_name]
+
+    def __contains__(self, profile_name):
+        return profile_name in _index.MODELS
+
+    def __iter__(self):
+        return iter(_index.MODELS)
+
+    def __len__(self):
+        return len(_index.MODELS)
+
+    def __repr__(self):
+        return "<Profiles of %i devices>" % len(self)
+
+
+PROFILES = _Profiles()
+
+
+def __getattr__(name):
+    # Device modules are imported on first access (e.g. devices.rival100)
+    if name in _index.FAMILIES:
+        return importlib.import_module("%s.%s" % (__name__, name))
+    raise AttributeError("module '%s' has no attribute '%s'" % (__name__, name))
@@ -0,0 +1,424 @@
+# This file is generated by scripts/generate_devices_index.py.
+# Do not edit it manually.
+
+#: The name of the family of each device module: ``{module_name: name}``.
+FAMILIES = {
+    "aerox3": "SteelSeries Aerox 3",
+    "aerox3_wireless_wired": "SteelSeries Aerox 3 Wireless",
+    "aerox3_wireless_wireless": "SteelSeries Aerox 3 Wireless",
+    "aerox5": "SteelSeries Aerox 5",
+    "aerox5_wireless_wired": "SteelSeries Aerox 5 Wireless",
+    "aerox5_wireless_wireless": "SteelSeries Aerox 5 Wireless",
+    "aerox9_wireless_wired": "SteelSeries Aerox 9 Wireless",
+    "aerox9_wireless_wireless": "SteelSeries Aerox 9 Wireless",
+    "kanav2": "SteelSeries Kana v2",
+    "kinzuv2": "SteelSeries Kinzu v2",
+    "prime": "SteelSeries Prime",
+    "prime_mini": "SteelSeries Prime Mini",
+    "prime_plus": "SteelSeries Prime+",
+    "prime_wireless_wired": "SteelSeries Prime Wireless",
+    "prime_wireless_wireless": "SteelSeries Prime Wireless",
+    "rival3": "SteelSeries Rival 3",
+    "rival3_gen2": "SteelSeries Rival 3 Gen 2",
+    "rival3_wireless": "SteelSeries Rival 3 Wireless",
+    "rival3_wireless_gen2": "SteelSeries Rival 3 Wireless Gen 2",
+    "rival5": "SteelSeries Rival 5",
+    "rival95": "SteelSeries Rival 95 / SteelSeries Rival 100 PC Bang",
+    "rival100": "SteelSeries Rival 100 / SteelSeries Rival 105",
+    "rival110": "SteelSeries Rival 110 / SteelSeries Rival 106",
+    "rival300": "SteelSeries Rival 300 / SteelSeries Rival",
+    "rival300s": "SteelSeries Rival 300S",
+    "rival310": "SteelSeries Rival 310",
+    "rival500": "SteelSeries Rival 500",
+    "rival600": "SteelSeries Rival 600",
+    "rival650": "SteelSeries Rival 650 Wireless",
+    "rival700": "SteelSeries Rival 700 / SteelSeries Rival 710",
+    "sensei310": "SteelSeries Sensei 310",
+    "sensei_raw": "SteelSeries Sensei [RAW]",
+    "sensei_ten": "SteelSeries Sensei TEN",
+}
+
+#: The supported models:
+#: ``{(vendor_id, product_id): (module_name, name, endpoint)}``.
+MODELS = {
+    (0x1038, 0x1836): (
+        "aerox3",
+        "SteelSeries Aerox 3",
+        3,
+    ),
+    (0x1038, 0x183A): (
+        "aerox3_wireless_wired",
+        "SteelSeries Aerox 3 Wireless (wired mode)",
+        3,
+    ),
+    (0x1038, 0x187A): (
+        "aerox3_wireless_wired",
+        "SteelSeries Aerox 3 Wireless CS2 Dragon Lore Edition (wired mode)",
+        3,
+    ),
+    (0x1038, 0x1838): (
+        "aerox3_wireless_wireless",
+        "SteelSeries Aerox 3 Wireless (2.4\u00a0GHz wireless mode)",
+        3,
+    ),
+    (0x1038, 0x1878): (
+        "aerox3_wireless_wireless",
+        "SteelSeries Aerox 3 Wireless CS2 Dragon Lore Edition (2.4\u00a0GHz wireless mode)",
+        3,
+    ),
+    (0x1038, 0x1850): (
+        "aerox5",
+        "SteelSeries Aerox 5",
+        3,
+    ),
+    (0x1038, 0x1854): (
+        "aerox5_wireless_wired",
+        "SteelSeries Aerox 5 Wireless (wired mode)",
+        3,
+    ),
+    (0x1038, 0x185E): (
+        "aerox5_wireless_wired",
+        "SteelSeries Aerox 5 Wireless Destiny 2 Edition (wired mode)",
+        3,
+    ),
+    (0x1038, 0x1862): (
+        "aerox5_wireless_wired",
+        "SteelSeries Aerox 5 Wireless Diablo IV Edition (wired mode)",
+        3,
+    ),
+    (0x1038, 0x1852): (
+        "aerox5_wireless_wireless",
+        "SteelSeries Aerox 5 Wireless (2.4\u00a0GHz wireless mode)",
+        3,
+    ),
+    (0x1038, 0x185C): (
+        "aerox5_wireless_wireless",
+        "SteelSeries Aerox 5 Wireless Destiny 2 Edition (2.4\u00a0GHz wireless mode)",
+        3,
+    ),
+    (0x1038, 0x1860): (
+        "aerox5_wireless_wireless",
+        "SteelSeries Aerox 5 Wireless Diablo IV Edition (2.4\u00a0GHz wireless mode)",
+        3,
+    ),
+    (0x1038, 0x185A): (
+        "aerox9_wireless_wired",
+        "SteelSeries Aerox 9 Wireless (wired mode)",
+        3,
+    ),
+    (0x1038, 0x1876): (
+        "aerox9_wireless_wired",
+        "SteelSeries Aerox 9 Wireless WOW Edition (wired mode)",
+        3,
+    ),
+    (0x1038, 0x1858): (
+        "aerox9_wireless_wireless",
+        "SteelSeries Aerox 9 Wireless (2.4\u00a0GHz wireless mode)",
+        3,
+    ),
+    (0x1038, 0x1874): (
+        "aerox9_wireless_wireless",
+        "SteelSeries Aerox 9 Wireless WOW Edition (2.4\u00a0GHz wireless mode)",
+        3,
+    ),
+    (0x1038, 0x137A): (
+        "kanav2",
+        "SteelSeries Kana v2",
+        0,
+    ),
+    (0x1038, 0x1366): (
+        "kinzuv2",
+        "SteelSeries Kinzu v2",
+        0,
+    ),
+    (0x1038, 0x1378): (
+        "kinzuv2",
+        "SteelSeries Kinzu v2",
+        0,
+    ),
+    (0x1038, 0x182E): (
+        "prime",
+        "SteelSeries Prime",
+        0,
+    ),
+    (0x1038, 0x182A): (
+        "prime",
+        "SteelSeries Prime Rainbow 6 Siege Black Ice Edition",
+        0,
+    ),
+    (0x1038, 0x1856): (
+        "prime",
+        "SteelSeries Prime CS:GO Neo Noir Edition",
+        0,
+    ),
+    (0x1038, 0x184D): (
+        "prime_mini",
+        "SteelSeries Prime Mini",
+        3,
+    ),
+    (0x1038, 0x182C): (
+        "prime_plus",
+        "SteelSeries Prime+",
+        0,
+    ),
+    (0x1038, 0x1842): (
+        "prime_wireless_wired",
+        "SteelSeries Prime Wireless (wired mode)",
+        3,
+    ),
+    (0x1038, 0x184A): (
+        "prime_wireless_wired",
+        "SteelSeries Prime Mini Wireless (wired mode)",
+        3,
+    ),
+    (0x1038, 0x1840): (
+        "prime_wireless_wireless",
+        "SteelSeries Prime Wireless (2.4\u00a0GHz wireless mode)",
+        3,
+    ),
+    (0x1038, 0x1848): (
+        "prime_wireless_wireless",
+        "SteelSeries Prime Mini Wireless (2.4\u00a0GHz wireless mode)",
+        3,
+    ),
+    (0x1038, 0x1824): (
+        "rival3",
+        "SteelSeries Rival 3",
+        3,
+    ),
+    (0x1038, 0x184C): (
+        "rival3",
+        "SteelSeries Rival 3 (firmware v0.37.0.0)",
+        3,
+    ),
+    (0x1038, 0x1870): (
+        "rival3_gen2",
+        "SteelSeries Rival 3 Gen 2",
+        3,
+    ),
+    (0x1038, 0x1830): (
+        "rival3_wireless",
+        "SteelSeries Rival 3 Wireless (2.4\u00a0GHz mode)",
+        3,
+    ),
+    (0x1038, 0x1872): (
+        "rival3_wireless_gen2",
+        "SteelSeries Rival 3 Wireless Gen 2 (2.4\u00a0GHz mode)",
+        3,
+    ),
+    (0x1038, 0x183C): (
+        "rival5",
+        "SteelSeries Rival 5",
+        0,
+    ),
+    (0x1038, 0x183E): (
+        "rival5",
+        "SteelSeries Rival 5 Destiny Edition",
+        0,
+    ),
+    (0x1038, 0x1706): (
+        "rival95",
+        "SteelSeries Rival 95",
+        0,
+    ),
+    (0x1038, 0x1707): (
+        "rival95",
+        "SteelSeries Rival 95 MSI Edition",
+        0,
+    ),
+    (0x1038, 0x1704): (
+        "rival95",
+        "SteelSeries Rival 95 PC Bang",
+        0,
+    ),
+    (0x1038, 0x1708): (
+        "rival95",
+        "SteelSeries Rival 100 PC Bang",
+        0,
+    ),
+    (0x1038, 0x1702): (
+        "rival100",
+        "SteelSeries Rival 100",
+        0,
+    ),
+    (0x1038, 0x170A): (
+        "rival100",
+        "SteelSeries Rival 100 (Dell China)",
+        0,
+    ),
+    (0x1038, 0x170B): (
+        "rival100",
+        "SteelSeries Rival 100 Dota 2 Edition (retail)",
+        0,
+    ),
+    (0x1038, 0x170C): (
+        "rival100",
+        "SteelSeries Rival 100 Dota 2 Edition (Lenovo)",
+        0,
+    ),
+    (0x1038, 0x1814): (
+        "rival100",
+        "SteelSeries Rival 105",
+        0,
+    ),
+    (0x1038, 0x1729): (
+        "rival110",
+        "SteelSeries Rival 110",
+        0,
+    ),
+    (0x1038, 0x1816): (
+        "rival110",
+        "SteelSeries Rival 106",
+        0,
+    ),
+    (0x1038, 0x1384): (
+        "rival300",
+        "SteelSeries Rival",
+        0,
+    ),
+    (0x1038, 0x1392): (
+        "rival300",
+        "SteelSeries Rival Dota 2 Edition",
+        0,
+    ),
+    (0x1038, 0x1710): (
+        "rival300",
+        "SteelSeries Rival 300",
+        0,
+    ),
+    (0x1038, 0x1712): (
+        "rival300",
+        "SteelSeries Rival 300 Fallout 4 Edition",
+        0,
+    ),
+    (0x1038, 0x171C): (
+        "rival300",
+        "SteelSeries Rival 300 Evil Geniuses Edition",
+        0,
+    ),
+    (0x1038, 0x1394): (
+        "rival300",
+        "SteelSeries Rival 300 CS:GO Fade Edition",
+        0,
+    ),
+    (0x1038, 0x171A): (
+        "rival300",
+        "SteelSeries Rival 300 CS:GO Hyper Beast Edition",
+        0,
+    ),
+    (0x1038, 0x1716): (
+        "rival300",
+        "SteelSeries Rival 300 CS:GO Fade Edition (stm32)",
+        0,
+    ),
+    (0x1038, 0x1714): (
+        "rival300",
+        "SteelSeries Rival 300 Acer Predator Edition",
+        0,
+    ),
+    (0x1038, 0x1718): (
+        "rival300",
+        "SteelSeries Rival 300 HP OMEN Edition",
+        0,
+    ),
+    (0x1038, 0x1810): (
+        "rival300s",
+        "SteelSeries Rival 300S",
+        0,
+    ),
+    (0x1038, 0x1720): (
+        "rival310",
+        "SteelSeries Rival 310",
+        0,
+    ),
+    (0x1038, 0x171E): (
+        "rival310",
+        "SteelSeries Rival 310 CS:GO Howl Edition",
+        0,
+    ),
+    (0x1038, 0x1736): (
+        "rival310",
+        "SteelSeries Rival 310 PUBG Edition",
+        0,
+    ),
+    (0x1038, 0x170E): (
+        "rival500",
+        "SteelSeries Rival 500",
+        0,
+    ),
+    (0x1038, 0x1724): (
+        "rival600",
+        "SteelSeries Rival 600",
+        0,
+    ),
+    (0x1038, 0x172E): (
+        "rival600",
+        "SteelSeries Rival 600 Dota 2 Edition",
+        0,
+    ),
+    (0x1038, 0x172B): (
+        "rival650",
+        "SteelSeries Rival 650 Wireless (wired mode)",
+        0,
+    ),
+    (0x1038, 0x1726): (
+        "rival650",
+        "SteelSeries Rival 650 Wireless (2.4\u00a0GHz wireless mode)",
+        0,
+    ),
+    (0x1038, 0x1700): (
+        "rival700",
+        "SteelSeries Rival 700",
+        0,
+    ),
+    (0x1038, 0x1730): (
+        "rival700",
+        "SteelSeries Rival 710",
+        0,
+    ),
+    (0x1038, 0x1722): (
+        "sensei310",
+        "SteelSeries Sensei 310",
+        0,
+    ),
+    (0x1038, 0x1369): (
+        "sensei_raw",
+        "SteelSeries Sensei [RAW]",
+        0,
+    ),
+    (0x1038, 0x1362): (
+        "sensei_raw",
+        "SteelSeries Sensei [RAW] Diablo III Edition",
+        0,
+    ),
+    (0x1038, 0x136D): (
+        "sensei_raw",
+        "SteelSeries Sensei [RAW] Guild Wars 2 Edition",
+        0,
+    ),
+    (0x1038, 0x136F): (
+        "sensei_raw",
+        "SteelSeries Sensei [RAW] CoD Black Ops II Edition",
+        0,
+    ),
+    (0x1038, 0x1380): (
+        "sensei_raw",
+        "SteelSeries Sensei [RAW] World of Tanks Edition",
+        0,
+    ),
+    (0x1038, 0x1390): (
+        "sensei_raw",
+        "SteelSeries Sensei [RAW] Heroes of the Storm Edition",
+        0,
+    ),
+    (0x1038, 0x1832): (
+        "sensei_ten",
+        "SteelSeries Sensei TEN",
+        0,
+    ),
+    (0x1038, 0x1834): (
+        "sensei_ten",
+        "SteelSeries Sensei TEN CS:GO Neon Rider Edition",
+        0,
+    ),
+}
@@ -1,9 +1,7 @@
 from .dpi import truemove_air
+from . import battery
 from .. import usbhid
 
-_BATTERY_CHARGING_FLAG = 0b10000000
-
-
 profile = {
     "name": "SteelSeries Aerox 3 Wireless",
     "models": [
@@ -166,8 +164,8 @@ profile = {
         "report_type": usbhid.HID_REPORT_TYPE_OUTPUT,
         "command": [0x92],
         "response_length": 2,
-        "is_charging": lambda data: bool(data[1] & _BATTERY_CHARGING_FLAG),
-        "level": lambda data: ((data[1] & ~_BATTERY_CHARGING_FLAG) - 1) * 5,
+        "is_charging": battery.flag_is_charging,
+        "level": battery.flag_level,
     },
     "save_command": {
         "report_type": usbhid.HID_REPORT_TYPE_OUTPUT,
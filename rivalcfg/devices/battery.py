@@ -0,0 +1,50 @@
+"""Functions that decode the battery level responses of the wireless devices.
+
+They are referenced by the ``"battery_level"`` section of the profiles. They
+are defined here rather than as lambdas in the device modules, so that the
+profiles can be serialized (see the profile cache of :mod:`rivalcfg.devices`).
+"""
+
+#: The flag set in the level byte when the device is charging.
+CHARGING_FLAG = 0b10000000
+
+
+def flag_is_charging(data):
+    """Charging state of the devices that set :data:`CHARGING_FLAG` in the
+    level byte (Aerox Wireless, Prime Wireless).
+
+    >>> flag_is_charging([0x00, 0x85])
+    True
+    """
+    return bool(data[1] & CHARGING_FLAG)
+
+
+def flag_level(data):
+    """Battery level of the devices that set :data:`CHARGING_FLAG` in the
+    level byte (Aerox Wireless, Prime Wireless). The level is sent by steps of
+    5 %, starting at ``1``.
+
+    >>> flag_level([0x00, 0x85])
+    20
+    """
+    return ((data[1] & ~CHARGING_FLAG) - 1) * 5
+
+
+def status_is_charging(data):
+    """Charging state of the devices that send it in its own byte (Rival 3
+    Wireless, Rival 650 Wireless).
+
+    >>> status_is_charging([42, 0x00, 0x01])
+    True
+    """
+    return bool(data[2])
+
+
+def status_level(data):
+    """Battery level of the devices that send it in the first byte, in
+    percent (Rival 3 Wireless, Rival 650 Wireless).
+
+    >>> status_level([42, 0x00, 0x01])
+    42
+    """
+    return int(data[0])
@@ -67,4 +67,8 @@ profile = {
         "report_type": usbhid.HID_REPORT_TYPE_OUTPUT,
         "command": [0x09, 0x00],
     },
+    # This mouse becomes laggy or crashes when commands are sent too quickly
+    "command_delay": {
+        "min": 0.05,
+    },
 }
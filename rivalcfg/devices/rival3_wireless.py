@@ -1,4 +1,5 @@
 from .dpi import truemove_air
+from . import battery
 from .. import usbhid
 
 profile = {
@@ -72,8 +73,8 @@ profile = {
         "report_type": usbhid.HID_REPORT_TYPE_OUTPUT,
         "command": [0xAA, 0x01],
         "response_length": 3,
-        "is_charging": lambda data: bool(data[2]),
-        "level": lambda data: int(data[0]),
+        "is_charging": battery.status_is_charging,
+        "level": battery.status_level,
     },
     "save_command": {
         "report_type": usbhid.HID_REPORT_TYPE_OUTPUT,
@@ -0,0 +1,349 @@
+"""
+This module compiles the settings of the device profiles into encoders.
+
+An encoder transforms the value of a setting into the packet sent to the
+device. Everything that does not depend on the value (the handler, the
+command, the suffix, the packet length and, for handlers that provide
+a ``compile_process_value`` function, the lookup tables) is computed only
+once per setting of a profile, when the encoder is built.
+
+Encoders can also write the full HID report (report id, command, value,
+suffix and padding) straight into a buffer that is reused from one packet to
+the next (see :meth:`SettingEncoder.encode_report`). Handlers that provide
+the ``write_value`` and ``get_value_length`` functions write their value in
+place, without building intermediate lists.
+
+The values encoded by handlers that do not provide precomputed tables (color
+gradients, buttons mappings,...) are memoized in a bounded LRU cache
+(:data:`ENCODING_CACHE`), so identical inputs are parsed only once.
+"""
+
+import threading
+import functools
+import collections
+
+from . import handlers
+from . import helpers
+
+_ENCODERS_CACHE = {}
+
+
+def _normalize_value(value):
+    """Returns a hashable representation of a setting value, used as cache
+    key. Lists and tuples are equivalent, and so are dicts with the same
+    items.
+
+    :param value: The value to normalize.
+    :raise TypeError: The value cannot be normalized.
+
+    >>> _normalize_value(["red", (1, 2, 3)]) == _normalize_value(("red", [1, 2, 3]))
+    True
+    >>> _normalize_value(1) == _normalize_value(True)
+    False
+    """
+    if isinstance(value, (list, tuple)):
+        return ("seq", tuple(_normalize_value(v) for v in value))
+    if isinstance(value, dict):
+        return ("dict", frozenset((k, _normalize_value(v)) for k, v in value.items()))
+    hash(value)
+    # 1, 1.0 and True are equal but may not be encoded the same way
+    return (type(value), value)
+
+
+class EncodingCache:
+    """A bounded LRU cache of encoded values.
+
+    :param int maxsize: The maximum number of entries (``0`` disables the
+                        cache).
+
+    >>> from rivalcfg.encoders import EncodingCache
+    >>> cache = EncodingCache(maxsize=1)
+    >>> cache.get("foo")
+    >>> cache.put("foo", b"\\x01")
+    >>> cache.get("foo")
+    b'\\x01'
+    >>> cache.put("bar", b"\\x02")
+    >>> cache.get("foo")
+    >>> cache.hits, cache.misses, len(cache)
+    (1, 2, 1)
+    """
+
+    def __init__(self, maxsize=256):
+        """Constructor."""
+        #: The maximum number of entries.
+        self.maxsize = maxsize
+        #: The number of lookups that found an entry.
+        self.hits = 0
+        #: The number of lookups that found no entry.
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Get an entry, and mark it as the most recently used one.
+
+        :param key: The key of the entry.
+        :return: The value of the entry, or ``None`` if it is not cached.
+        """
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, value):
+        """Add an entry, and evict the least recently used ones beyond
+        :attr:`maxsize`.
+
+        :param key: The key of the entry.
+        :param value: The value of the entry.
+        """
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > max(self.maxsize, 0):
+                self._entries.popitem(last=False)
+
+    def invalidate(self, mouse_profile):
+        """Remove all the entries of a profile.
+
+        :param dict mouse_profile: The mouse profile (``rivalcfg.devices.*``).
+        """
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == id(mouse_profile)]:
+                del self._entries[key]
+
+    def clear(self):
+        """Remove all the entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+#: The cache of the values encoded by the handlers (see :class:`EncodingCache`).
+ENCODING_CACHE = EncodingCache()
+
+
+class SettingEncoder:
+    """Encodes the values of a setting from a device profile.
+
+    :param dict mouse_profile: The mouse profile (``rivalcfg.devices.*``).
+    :param str setting_name: The name of the setting.
+    :raise ValueError: The handler of the setting does not exist.
+
+    >>> from rivalcfg import devices
+    >>> from rivalcfg.encoders import SettingEncoder
+    >>> profile = devices.get_profile(vendor_id=0x1038, product_id=0x1702)
+    >>> encoder = SettingEncoder(profile, "light_effect")
+    >>> encoder.encode("breath")
+    [7, 0, 3]
+    """
+
+    def __init__(self, mouse_profile, setting_name):
+        """Constructor."""
+        setting_info = mouse_profile["settings"][setting_name]
+        self._profile_id = id(mouse_profile)
+
+        #: The name of the setting.
+        self.setting_name = setting_name
+
+        #: The information dict of the setting from the device profile.
+        self.setting_info = setting_info
+
+        #: The HID report type of the packets.
+        self.report_type = setting_info["report_type"]
+
+        #: The fixed length of the packets (``0`` for no padding).
+        self.packet_length = 0
+        if "packet_length" in setting_info:
+            self.packet_length = setting_info["packet_length"]
+
+        #: The length of the response to read after each packet (``0`` for
+        #: no response).
+        self.readback_length = 0
+        if "readback_length" in setting_info and setting_info["readback_length"]:
+            self.readback_length = setting_info["readback_length"]
+
+        #: The name of the handler of the setting (``None`` for settings
+        #: without value).
+        self.handler_name = None
+        if "value_type" in setting_info and setting_info["value_type"]:
+            self.handler_name = setting_info["value_type"]
+
+        self._command = helpers.merge_bytes(setting_info["command"])
+        self._suffix = []
+        if "command_suffix" in setting_info:
+            self._suffix = helpers.merge_bytes(setting_info["command_suffix"])
+
+        self._process_value = None
+        self._write_value = None
+        self._cached = False
+        self._report_size = 1 + self.packet_length
+        if self.handler_name:
+            try:
+                handler = handlers.get_handler(self.handler_name)
+            except handlers.UnknownHandler:
+                raise handlers.UnknownHandler(
+                    "Unknown handler '%s' for '%s' setting of the %s"
+                    % (
+                        self.handler_name,
+                        setting_name,
+                        mouse_profile["name"],
+                    )
+                ) from None
+            if hasattr(handler, "compile_process_value"):
+                self._process_value = handler.compile_process_value(setting_info)
+            else:
+                self._process_value = functools.partial(
+                    handler.process_value, setting_info
+                )
+                # Compiled handlers are already a table lookup
+                self._cached = True
+            if hasattr(handler, "write_value"):
+                self._write_value = functools.partial(handler.write_value, setting_info)
+                self._report_size = max(
+                    self._report_size,
+                    1
+                    + len(self._command)
+                    + handler.get_value_length(setting_info)
+                    + len(self._suffix),
+                )
+
+    def encode(self, *args):
+        """Encodes the packet that sets the setting to the given value.
+
+        :param args: The value(s) of the setting.
+        :rtype: list(int)
+        :return: The command, the encoded value and the command suffix.
+        """
+        if self._process_value:
+            return helpers.merge_bytes(
+                self._command, self._encode_value(*args), self._suffix
+            )
+        return self._command + self._suffix
+
+    def _cache_key(self, kind, args):
+        """Returns the key of a value in :data:`ENCODING_CACHE`, or ``None``
+        if the value cannot be cached.
+        """
+        if not self._cached:
+            return None
+        try:
+            return (self._profile_id, self.setting_name, kind, _normalize_value(args))
+        except TypeError:
+            return None
+
+    def _encode_value(self, *args):
+        """Encodes a value with the handler, through the cache.
+
+        :rtype: list(int)
+        """
+        key = self._cache_key("list", args)
+        if key is not None:
+            value = ENCODING_CACHE.get(key)
+            if value is not None:
+                return list(value)
+        value = self._process_value(*args)
+        if key is not None:
+            ENCODING_CACHE.put(key, tuple(value))
+        return value
+
+    def encode_report(self, buffer, *args):
+        """Encodes the full HID report that sets the setting to the given
+        value: the report id (``0x00``), the command, the encoded value, the
+        command suffix and the padding to the packet length.
+
+        :param bytearray buffer: The buffer of a previous report of this
+                                 setting, reused if it is large enough
+                                 (optional, can be ``None``).
+        :param args: The value(s) of the setting.
+        :rtype: memoryview
+        :return: A view of the report. The buffer that holds it is available
+                 as its ``obj`` attribute, and can be passed to the next
+                 call. The view is overwritten by the next call with the
+                 same buffer: copy it (``bytes(report)``) to keep it.
+
+        >>> from rivalcfg import devices
+        >>> from rivalcfg.encoders import SettingEncoder
+        >>> profile = devices.get_profile(vendor_id=0x1038, product_id=0x1702)
+        >>> encoder = SettingEncoder(profile, "light_effect")
+        >>> report = encoder.encode_report(None, "breath")
+        >>> bytes(report)
+        b'\\x00\\x07\\x00\\x03'
+        >>> encoder.encode_report(report.obj, "steady").obj is report.obj
+        True
+        """
+        if self._write_value:
+            size = self._report_size
+        else:
+            data = self.encode(*args)
+            size = max(1 + len(data), self._report_size)
+
+        if buffer is None or len(buffer) < size:
+            buffer = bytearray(size)
+        # Writing through a view ensures the buffer is never resized
+        view = memoryview(buffer)
+
+        if self._write_value:
+            position = helpers.write_bytes(view, 0, 0x00, self._command)
+            key = self._cache_key("bytes", args)
+            value = None
+            if key is not None:
+                value = ENCODING_CACHE.get(key)
+            if value is not None:
+                position = helpers.write_bytes(view, position, value)
+            else:
+                length = self._write_value(view, position, *args)
+                if key is not None:
+                    ENCODING_CACHE.put(key, bytes(view[position : position + length]))
+                position += length
+            position = helpers.write_bytes(view, position, self._suffix)
+        else:
+            position = 1 + len(data)
+            view[0] = 0x00
+            view[1:position] = bytes(data)
+
+        if position <= self.packet_length:
+            view[position : 1 + self.packet_length] = bytes(
+                1 + self.packet_length - position
+            )
+            position = 1 + self.packet_length
+
+        return view[:position]
+
+
+def get_encoder(mouse_profile, setting_name):
+    """Returns the encoder of a setting. The encoder is built on the first call
+    and then reused for the same profile.
+
+    :param dict mouse_profile: The mouse profile (``rivalcfg.devices.*``).
+    :param str setting_name: The name of the setting.
+    :raise ValueError: The handler of the setting does not exist.
+    :rtype: SettingEncoder
+    """
+    # The profile is kept in the cache so its id cannot be reused
+    _, encoders = _ENCODERS_CACHE.setdefault(id(mouse_profile), (mouse_profile, {}))
+    if setting_name not in encoders:
+        encoders[setting_name] = SettingEncoder(mouse_profile, setting_name)
+    return encoders[setting_name]
+
+
+def invalidate(mouse_profile):
+    """Forget the encoders, the cached values and the generated mouse classes
+    (see :func:`rivalcfg.mouse.get_mouse_class`) of a profile. This must be
+    called after a profile is modified, and releases the profile.
+
+    :param dict mouse_profile: The mouse profile (``rivalcfg.devices.*``).
+    """
+    # Imported here as rivalcfg.mouse imports this module
+    from . import mouse
+
+    ENCODING_CACHE.invalidate(mouse_profile)
+    _ENCODERS_CACHE.pop(id(mouse_profile), None)
+    mouse._invalidate_mouse_classes(mouse_profile)
@@ -0,0 +1,367 @@
+"""
+This module implements the ``rivalcfg fleet`` command, that configures all
+the plugged supported devices at once (e.g. the mice of a LAN party, plugged
+on USB hubs)::
+
+    rivalcfg fleet --jobs 8 --per-hub 2 -- --color red --polling-rate 1000
+
+The options after ``--`` are the usual rivalcfg options (see ``rivalcfg
+--help``). They are checked against the profile of each model before any
+device is configured.
+
+Each device is configured by its own process, so a device that hangs or
+crashes does not affect the others. The number of devices configured at the
+same time is limited globally (``--jobs``) and for each USB hub
+(``--per-hub``), the hub being read from the path of the device (see
+:func:`rivalcfg.usbhid.get_usb_port_path`). A device that fails or does not
+finish in time (``--timeout``) is retried (``--retries``).
+
+Once all the devices are configured, a JSON summary is printed::
+
+    [
+      {
+        "name": "SteelSeries Rival 100",
+        "vendor_id": 4152,
+        "product_id": 5890,
+        "path": "1-2.1:1.0",
+        "hub": "1-2",
+        "status": "ok",
+        "attempts": 1,
+        "errors": [],
+        "duration": 0.12
+      }
+    ]
+"""
+
+import sys
+import json
+import time
+import argparse
+import collections
+import multiprocessing
+import multiprocessing.connection
+
+from . import cli
+from . import mouse
+from . import usbhid
+from . import devices
+
+#: Default maximum number of devices configured at the same time.
+DEFAULT_JOBS = 4
+
+#: Default maximum number of devices configured at the same time on a given
+#: USB hub.
+DEFAULT_PER_HUB = 2
+
+#: Default number of retries of a device that failed.
+DEFAULT_RETRIES = 2
+
+#: Default maximum time to configure a device (in seconds, for each attempt).
+DEFAULT_TIMEOUT = 30
+
+#: The status of a device that was configured.
+STATUS_OK = "ok"
+
+#: The status of a device that failed to be configured.
+STATUS_ERROR = "error"
+
+#: The status of a device that was not configured in time.
+STATUS_TIMEOUT = "timeout"
+
+
+def get_hub(port_path):
+    """Returns the USB hub a device is plugged on, from its port path.
+
+    :param str port_path: The port path of the device (see
+                          :func:`rivalcfg.usbhid.get_usb_port_path`).
+    :rtype: str
+    :return: The port path of the hub, the bus number if the device is plugged
+             on the root hub, or ``None`` if the port path is unknown.
+
+    >>> from rivalcfg.fleet import get_hub
+    >>> get_hub("1-2.3")
+    '1-2'
+    >>> get_hub("1-2")
+    '1'
+    """
+    if not port_path:
+        return None
+    if "." in port_path:
+        return port_path.rsplit(".", 1)[0]
+    return port_path.split("-", 1)[0]
+
+
+def discover_devices():
+    """Lists all the plugged devices that are supported by rivalcfg (see
+    :func:`rivalcfg.devices.list_all_plugged_devices`), with the USB hub each
+    one is plugged on.
+
+    :rtype: [dict]
+
+    ::
+
+       [
+           {
+               "vendor_id": ...,
+               "product_id": ...,
+               "name": ...,
+               "endpoint": ...,
+               "path": ...,
+               "hub": ...,  # See get_hub()
+           },
+       ]
+    """
+    result = []
+    for device in devices.list_all_plugged_devices():
+        if device["path"] is None:
+            continue  # RIVALCFG_PROFILE
+        device["hub"] = get_hub(usbhid.get_usb_port_path(device["path"]))
+        result.append(device)
+    return result
+
+
+def provision_device(device, settings):
+    """Configures a device.
+
+    :param dict device: The device (see :func:`discover_devices`).
+    :param argparse.Namespace settings: The parsed options (see
+                                        :func:`rivalcfg.cli.apply_settings`).
+    """
+    mouse_ = mouse.get_mouse(
+        vendor_id=device["vendor_id"],
+        product_id=device["product_id"],
+        path=device["path"],
+        lock=True,
+    )
+    try:
+        cli.apply_settings(mouse_, settings)
+    finally:
+        mouse_.close()
+
+
+def _worker(connection, target, device, settings):
+    """Runs in the process of a device and sends the error back, if any."""
+    error = None
+    try:
+        target(device, settings)
+    except Exception as exception:
+        error = "%s: %s" % (type(exception).__name__, exception)
+    connection.send(error)
+    connection.close()
+
+
+class _Job:
+    """A device to configure, and the result of its attempts."""
+
+    def __init__(self, device, settings):
+        self.device = device
+        self.settings = settings
+        self.status = None
+        self.attempts = 0
+        self.errors = []
+        self.start_time = None
+        self.end_time = None
+
+    def to_dict(self):
+        path = self.device["path"]
+        if isinstance(path, bytes):
+            path = path.decode("utf-8", errors="replace")
+        return {
+            "name": self.device["name"],
+            "vendor_id": self.device["vendor_id"],
+            "product_id": self.device["product_id"],
+            "path": path,
+            "hub": self.device["hub"],
+            "status": self.status,
+            "attempts": self.attempts,
+            "errors": self.errors,
+            "duration": round(self.end_time - self.start_time, 3),
+        }
+
+
+def run_fleet(
+    devices_,
+    settings,
+    jobs=DEFAULT_JOBS,
+    per_hub=DEFAULT_PER_HUB,
+    retries=DEFAULT_RETRIES,
+    timeout=DEFAULT_TIMEOUT,
+    target=provision_device,
+):
+    """Configures the given devices, each one in its own process.
+
+    :param [dict] devices_: The devices (see :func:`discover_devices`).
+    :param dict settings: The settings of each model, as a ``{(vendor_id,
+                          product_id): settings}`` dict.
+    :param int jobs: The maximum number of devices configured at the same
+                     time.
+    :param int per_hub: The maximum number of devices configured at the same
+                        time on a given USB hub. Devices whose hub is unknown
+                        are only limited by ``jobs``.
+    :param int retries: The number of retries of a device that failed.
+    :param float timeout: The maximum time to configure a device (in seconds,
+                          for each attempt). The process of the device is
+                          killed once elapsed.
+    :param target: The function that configures a device (default:
+                   :func:`provision_device`). It is called with a device and
+                   its settings.
+    :raise ValueError: ``jobs`` or ``per_hub`` is lower than ``1``.
+    :rtype: [dict]
+    :return: The result of each device, in the same order as the devices.
+    """
+    if jobs < 1 or per_hub < 1:
+        raise ValueError("jobs and per_hub must be greater than 0")
+
+    all_jobs = [
+        _Job(device, settings[(device["vendor_id"], device["product_id"])])
+        for device in devices_
+    ]
+    pending = collections.deque(all_jobs)
+    running = {}  # {sentinel: (job, process, connection, deadline)}
+    hubs_usage = collections.Counter()
+
+    while pending or running:
+        # Start as many devices as the limits allow
+        for job in list(pending):
+            if len(running) >= jobs:
+                break
+            hub = job.device["hub"]
+            if hub is not None and hubs_usage[hub] >= per_hub:
+                continue
+            pending.remove(job)
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(
+                target=_worker,
+                args=(sender, target, job.device, job.settings),
+                daemon=True,
+            )
+            process.start()
+            sender.close()
+            if job.start_time is None:
+                job.start_time = time.monotonic()
+            job.attempts += 1
+            hubs_usage[hub] += 1
+            running[process.sentinel] = (
+                job,
+                process,
+                receiver,
+                time.monotonic() + timeout,
+            )
+
+        # Wait for a device to finish or to time out
+        next_deadline = min(deadline for _, _, _, deadline in running.values())
+        ready = multiprocessing.connection.wait(
+            list(running), timeout=max(0, next_deadline - time.monotonic())
+        )
+
+        now = time.monotonic()
+        for sentinel, (job, process, receiver, deadline) in list(running.items()):
+            if sentinel in ready:
+                process.join()
+                try:
+                    error = receiver.recv()
+                except EOFError:
+                    error = "The process exited with code %s" % process.exitcode
+                status = STATUS_ERROR if error else STATUS_OK
+            elif now >= deadline:
+                process.kill()
+                process.join()
+                error = "Timed out after %g s" % timeout
+                status = STATUS_TIMEOUT
+            else:
+                continue
+
+            receiver.close()
+            del running[sentinel]
+            hubs_usage[job.device["hub"]] -= 1
+
+            if error:
+                job.errors.append(error)
+            if error and job.attempts <= retries:
+                pending.append(job)
+                continue
+            job.status = status
+            job.end_time = now
+
+    return [job.to_dict() for job in all_jobs]
+
+
+def main(args=sys.argv[1:]):
+    """Entry point of the ``rivalcfg fleet`` command.
+
+    :param [str] args: The command line arguments (without ``fleet``).
+    :rtype: int
+    :return: The exit code (``0`` if all the devices were configured).
+    """
+    cli_parser = argparse.ArgumentParser(
+        prog="rivalcfg fleet",
+        description="Configures all the plugged supported devices at once.",
+        epilog="The options after '--' are the ones of rivalcfg (see 'rivalcfg --help').",
+        allow_abbrev=False,
+    )
+    cli_parser.add_argument(
+        "--jobs",
+        help="Maximum number of devices configured at the same time (default: %(default)s)",
+        type=int,
+        default=DEFAULT_JOBS,
+    )
+    cli_parser.add_argument(
+        "--per-hub",
+        help="Maximum number of devices configured at the same time on an USB hub (default: %(default)s)",
+        type=int,
+        default=DEFAULT_PER_HUB,
+    )
+    cli_parser.add_argument(
+        "--retries",
+        help="Number of retries of a device that failed (default: %(default)s)",
+        type=int,
+        default=DEFAULT_RETRIES,
+    )
+    cli_parser.add_argument(
+        "--timeout",
+        help="Maximum time to configure a device, in seconds (default: %(default)s)",
+        type=float,
+        default=DEFAULT_TIMEOUT,
+    )
+    cli_parser.add_argument(
+        "--summary",
+        help="Also write the JSON summary to the given file",
+        metavar="FILE",
+    )
+    options, settings_args = cli_parser.parse_known_args(args)
+    if settings_args and settings_args[0] == "--":
+        settings_args = settings_args[1:]
+
+    devices_ = discover_devices()
+    if not devices_:
+        print("E: No supported device found.")
+        return 1
+
+    # Checks the options for each model before configuring any device
+    settings = {}
+    for device in devices_:
+        profile_name = (device["vendor_id"], device["product_id"])
+        if profile_name in settings:
+            continue
+        settings_parser = cli.get_parser(
+            devices.get_profile(*profile_name), prog="rivalcfg fleet ... --"
+        )
+        settings[profile_name] = settings_parser.parse_args(settings_args)
+
+    results = run_fleet(
+        devices_,
+        settings,
+        jobs=options.jobs,
+        per_hub=options.per_hub,
+        retries=options.retries,
+        timeout=options.timeout,
+    )
+
+    summary = json.dumps(results, indent=2)
+    print(summary)
+    if options.summary:
+        with open(options.summary, "w") as file_:
+            file_.write(summary)
+            file_.write("\n")
+
+    return 0 if all(result["status"] == STATUS_OK for result in results) else 1
@@ -1,14 +1,110 @@
-from . import none
-from . import choice
-from . import range
-from . import range_choice
-from . import rgbcolor
-from . import reactive_rgbcolor
-from . import rgbgradient
-from . import rgbgradientv2
-from . import multidpi_range
-from . import multidpi_range_choice
-from . import multidpi_range_choice_xy
-from .buttons import buttons
-
-# flake8: noqa
+"""
+Registry of the handlers, that transform the values of the settings of a
+device profile (see the ``value_type`` of each setting).
+
+Handlers are imported the first time they are requested (see
+:func:`get_handler`), so the handlers that the profile of the mouse does not
+use (and their lookup tables) are never loaded. For compatibility, handlers
+are also available as attributes of this module (e.g.
+``rivalcfg.handlers.rgbcolor``).
+
+Third-party packages can provide new handlers by declaring an entry point in
+the ``rivalcfg.handlers`` group, that references the handler module::
+
+    [project.entry-points."rivalcfg.handlers"]
+    my_led_protocol = "my_package.my_led_protocol"
+
+Built-in handlers cannot be overridden by entry points.
+"""
+
+import importlib
+import threading
+
+#: The name of the entry point group of the third-party handlers.
+ENTRY_POINTS_GROUP = "rivalcfg.handlers"
+
+#: The built-in handlers: ``{value_type: module_name}``.
+BUILTIN_HANDLERS = {
+    "none": "rivalcfg.handlers.none",
+    "choice": "rivalcfg.handlers.choice",
+    "range": "rivalcfg.handlers.range",
+    "range_choice": "rivalcfg.handlers.range_choice",
+    "rgbcolor": "rivalcfg.handlers.rgbcolor",
+    "reactive_rgbcolor": "rivalcfg.handlers.reactive_rgbcolor",
+    "rgbgradient": "rivalcfg.handlers.rgbgradient",
+    "rgbgradientv2": "rivalcfg.handlers.rgbgradientv2",
+    "multidpi_range": "rivalcfg.handlers.multidpi_range",
+    "multidpi_range_choice": "rivalcfg.handlers.multidpi_range_choice",
+    "multidpi_range_choice_xy": "rivalcfg.handlers.multidpi_range_choice_xy",
+    "buttons": "rivalcfg.handlers.buttons",
+}
+
+_entry_points = None
+_plugin_handlers = {}
+_lock = threading.Lock()
+
+
+class UnknownHandler(ValueError):
+    """Exception raised when the requested handler does not exist."""
+
+
+def _get_entry_points():
+    """Returns the entry points of the third-party handlers (the packages
+    metadata are only read once).
+
+    :rtype: dict
+    """
+    global _entry_points
+    if _entry_points is None:
+        import importlib.metadata
+
+        _entry_points = {
+            entry_point.name: entry_point
+            for entry_point in importlib.metadata.entry_points(group=ENTRY_POINTS_GROUP)
+        }
+    return _entry_points
+
+
+def list_handlers():
+    """Lists the available handlers, built-in or provided by third-party
+    packages.
+
+    :rtype: [str]
+
+    >>> from rivalcfg import handlers
+    >>> "rgbcolor" in handlers.list_handlers()
+    True
+    """
+    return sorted(set(BUILTIN_HANDLERS) | set(_get_entry_points()))
+
+
+def get_handler(name):
+    """Returns the handler of the given ``value_type``, importing it if
+    needed.
+
+    :param str name: The name of the handler (e.g. ``"rgbcolor"``).
+    :raise UnknownHandler: There is no handler with this name.
+    :rtype: module
+
+    >>> from rivalcfg import handlers
+    >>> handlers.get_handler("rgbcolor")
+    <module 'rivalcfg.handlers.rgbcolor' from '...'>
+    """
+    if name in BUILTIN_HANDLERS:
+        return importlib.import_module(BUILTIN_HANDLERS[name])
+
+    if name not in _plugin_handlers:
+        entry_points = _get_entry_points()
+        if name not in entry_points:
+            raise UnknownHandler("Unknown handler '%s'" % name)
+        with _lock:
+            if name not in _plugin_handlers:
+                _plugin_handlers[name] = entry_points[name].load()
+    return _plugin_handlers[name]
+
+
+def __getattr__(name):
+    # Built-in handlers are imported on first access (e.g. handlers.rgbcolor)
+    if name in BUILTIN_HANDLERS:
+        return get_handler(name)
+    raise AttributeError("module '%s' has no attribute '%s'" % (__name__, name))
@@ -0,0 +1,12 @@
+# The package is the "buttons" handler (see rivalcfg.handlers.get_handler())
+from .buttons import LAYOUTS
+from .buttons import build_layout
+from .buttons import is_buttons
+from .buttons import get_value_length
+from .buttons import process_value
+from .buttons import write_value
+from .buttons import CheckButtonsAction
+from .buttons import cli_buttons_validator
+from .buttons import add_cli_option
+
+# flake8: noqa
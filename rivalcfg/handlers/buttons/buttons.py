@@ -164,8 +164,9 @@ Functions
 """
 
 import argparse
+import functools
 
-from ...helpers import parse_param_string, REGEXP_PARAM_STRING
+from ...helpers import parse_param_string, REGEXP_PARAM_STRING, write_bytes
 from . import layout_multimedia
 from . import layout_qwerty
 
@@ -230,6 +231,16 @@ def is_buttons(string, setting_info):
     return True, ""
 
 
+def get_value_length(setting_info):
+    """Returns the length of the values encoded by :func:`write_value`.
+
+    :param dict setting_info: The information dict of the setting from the
+                              device profile.
+    :rtype: int
+    """
+    return len(setting_info["buttons"]) * setting_info["button_field_length"]
+
+
 def process_value(setting_info, mapping):
     """Called by the :class:`rivalcfg.mouse.Mouse` class when processing a
     "buttons" type setting.
@@ -239,6 +250,24 @@ def process_value(setting_info, mapping):
     :param str,dict mapping: The mapping of the mouse buttons.
     :rtype: [int]
     """
+    buffer = bytearray(get_value_length(setting_info))
+    length = write_value(setting_info, buffer, 0, mapping)
+    return list(buffer[:length])
+
+
+def write_value(setting_info, buffer, offset, mapping):
+    """Writes the encoded mapping of the buttons into a buffer, in place (see
+    :func:`process_value`).
+
+    :param dict setting_info: The information dict of the setting from the
+                              device profile.
+    :param bytearray,memoryview buffer: The buffer to write in (see
+                                        :func:`get_value_length`).
+    :param int offset: The position of the value in the buffer.
+    :param str,dict mapping: The mapping of the mouse buttons.
+    :rtype: int
+    :return: The length of the encoded value.
+    """
     # -- Parse input values
 
     if isinstance(mapping, str) and REGEXP_PARAM_STRING.match(mapping):
@@ -298,7 +327,6 @@ def process_value(setting_info, mapping):
     # -- Craft packet
 
     packet_length = len(buttons) * setting_info["button_field_length"]
-    packet = [0x00] * packet_length
 
     for button, value in [(k.lower(), v) for k, v in mapping["buttons"].items()]:
         if button == "layout":
@@ -307,52 +335,63 @@ def process_value(setting_info, mapping):
             raise ValueError("Unknown button name '%s'" % button)
         buttons[button]["value"] = value
 
+    write_bytes(buffer, offset, bytes(packet_length))
+
     for button, data in buttons.items():
         value = data["default"]
         if "value" in data and data["value"].lower() != "default":
             value = data["value"]
         value = value.lower()
 
+        position = offset + data["offset"]
         if value in buttons:
-            packet[data["offset"]] = buttons[value]["id"]
+            buffer[position] = buttons[value]["id"]
         elif value in button_special:
-            packet[data["offset"]] = button_special[value]
+            buffer[position] = button_special[value]
         elif value in mm_layout:
-            packet[data["offset"]] = button_multimedia
-            packet[data["offset"] + 1] = mm_layout[value]
+            write_bytes(buffer, position, button_multimedia, mm_layout[value])
         elif value in keyboard_layout:
-            packet[data["offset"]] = button_keyboard
-            packet[data["offset"] + 1] = keyboard_layout[value]
+            write_bytes(buffer, position, button_keyboard, keyboard_layout[value])
         else:
             raise ValueError("Unknown button, key or action '%s'" % value)
 
-    return packet
+    return packet_length
 
 
-def cli_buttons_validator(setting_info):
-    class CheckButtonsAction(argparse.Action):
-        """Validate buttons from CLI"""
+class CheckButtonsAction(argparse.Action):
+    """Validate buttons from CLI"""
+
+    def __init__(self, option_strings, dest, setting_info=None, **kwargs):
+        argparse.Action.__init__(self, option_strings, dest, **kwargs)
+        self.setting_info = setting_info
+
+    def __call__(self, parser, namespace, value, option_string=None):
+        if value.lower() == "default":
+            setattr(namespace, self.dest.upper(), value)
+            return
+
+        if REGEXP_PARAM_STRING.match(value):
+            is_valid, reason = is_buttons(value, self.setting_info)
 
-        def __call__(self, parser, namespace, value, option_string=None):
-            if value.lower() == "default":
+            if is_valid:
                 setattr(namespace, self.dest.upper(), value)
                 return
 
-            if REGEXP_PARAM_STRING.match(value):
-                is_valid, reason = is_buttons(value, setting_info)
+            raise argparse.ArgumentError(self, "%s" % reason)
 
-                if is_valid:
-                    setattr(namespace, self.dest.upper(), value)
-                    return
+        else:
+            raise argparse.ArgumentError(
+                self, "not a valid buttons mapping param: '%s'" % value
+            )
 
-                raise argparse.ArgumentError(self, "%s" % reason)
 
-            else:
-                raise argparse.ArgumentError(
-                    self, "not a valid buttons mapping param: '%s'" % value
-                )
+def cli_buttons_validator(setting_info):
+    """Returns the action that validates the buttons of the given setting.
 
-    return CheckButtonsAction
+    :param dict setting_info: The information dict of the setting from the
+                              device profile.
+    """
+    return functools.partial(CheckButtonsAction, setting_info=setting_info)
 
 
 def add_cli_option(cli_parser, setting_name, setting_info):
@@ -372,6 +411,7 @@ def add_cli_option(cli_parser, setting_name, setting_info):
         dest=setting_name,
         help=description,
         type=str,
-        action=cli_buttons_validator(setting_info),
+        action=CheckButtonsAction,
+        setting_info=setting_info,
         metavar=setting_name.upper(),
     )
@@ -111,6 +111,34 @@ def process_value(setting_info, choice):
     return helpers.merge_bytes(value)
 
 
+def compile_process_value(setting_info):
+    """Returns a function equivalent to :func:`process_value` for the given
+    setting, with a precomputed lookup table.
+
+    :param dict setting_info: The information dict of the setting from the
+                              device profile.
+    :rtype: function
+
+    >>> process = compile_process_value({"choices": {"foo": 0x01, 2: 0x02}})
+    >>> process("foo")
+    [1]
+    >>> process(2)
+    [2]
+    """
+    choices = {
+        str(k): helpers.merge_bytes(v) for k, v in setting_info["choices"].items()
+    }
+    choices_string = choices_to_string(setting_info["choices"])
+
+    def _process_value(choice):
+        choice = str(choice)
+        if choice not in choices:
+            raise ValueError("value must be one of [%s]" % choices_string)
+        return list(choices[choice])
+
+    return _process_value
+
+
 def add_cli_option(cli_parser, setting_name, setting_info):
     """Add the given "choice" type setting to the given CLI arguments parser.
 
@@ -77,9 +77,10 @@ Functions
 
 import re
 import argparse
+import functools
 
 from ..helpers import merge_bytes, uint_to_little_endian_bytearray
-from .range import process_range
+from .range import process_range, compile_range
 
 
 def process_value(setting_info, value, selected_preset=None):
@@ -93,6 +94,30 @@ def process_value(setting_info, value, selected_preset=None):
                                 first preset).
     :rtype: list[int]
     """
+    return _process_value(setting_info, process_range, value, selected_preset)
+
+
+def compile_process_value(setting_info):
+    """Returns a function equivalent to :func:`process_value` for the given
+    setting, with a precomputed DPI table (see
+    :func:`rivalcfg.handlers.range.compile_range`).
+
+    :param dict setting_info: The information dict of the setting from the
+                              device profile.
+    :rtype: function
+    """
+    compiled_range = compile_range(setting_info)
+
+    def _process_range(setting_info, value):
+        return compiled_range(value)
+
+    def _compiled_process_value(value, selected_preset=None):
+        return _process_value(setting_info, _process_range, value, selected_preset)
+
+    return _compiled_process_value
+
+
+def _process_value(setting_info, process_range, value, selected_preset):
     dpis = []
 
     if isinstance(value, (int, float)):
@@ -169,19 +194,28 @@ def process_value(setting_info, value, selected_preset=None):
     return merge_bytes(dpi_count, selected_preset, output_values)
 
 
-def cli_multirange_validator(max_preset_count):
-    class CheckMultiDpiRange(argparse.Action):
-        """Validate value from CLI"""
+class CheckMultiDpiRange(argparse.Action):
+    """Validate value from CLI"""
+
+    def __init__(self, option_strings, dest, max_preset_count=1, **kwargs):
+        argparse.Action.__init__(self, option_strings, dest, **kwargs)
+        self.regexp = re.compile(
+            r"^ *[0-9]+( *, *[0-9]+){0,%i} *$" % (max_preset_count - 1)
+        )
 
-        def __call__(self, parser, namespace, value, option_string=None):
-            if not re.match(
-                r"^ *[0-9]+( *, *[0-9]+){0,%i} *$" % (max_preset_count - 1),
-                value,
-            ):
-                raise argparse.ArgumentError(self, "invalid DPI list: '%s'" % value)
-            setattr(namespace, self.dest.upper(), value)
+    def __call__(self, parser, namespace, value, option_string=None):
+        if not self.regexp.match(value):
+            raise argparse.ArgumentError(self, "invalid DPI list: '%s'" % value)
+        setattr(namespace, self.dest.upper(), value)
 
-    return CheckMultiDpiRange
+
+def cli_multirange_validator(max_preset_count):
+    """Returns the action that validates a DPI list of up to
+    ``max_preset_count`` values.
+
+    :param int max_preset_count: The maximum number of DPI values.
+    """
+    return functools.partial(CheckMultiDpiRange, max_preset_count=max_preset_count)
 
 
 def add_cli_option(cli_parser, setting_name, setting_info):
@@ -204,5 +238,6 @@ def add_cli_option(cli_parser, setting_name, setting_info):
         help=description,
         dest=setting_name.upper(),
         metavar=setting_name.upper(),
-        action=cli_multirange_validator(setting_info["max_preset_count"]),
+        action=CheckMultiDpiRange,
+        max_preset_count=setting_info["max_preset_count"],
     )
@@ -82,7 +82,7 @@ Functions
 """
 
 from .range_choice import process_range_choice
-from .multidpi_range import cli_multirange_validator
+from .multidpi_range import CheckMultiDpiRange
 from ..helpers import merge_bytes, uint_to_little_endian_bytearray
 
 
@@ -181,5 +181,6 @@ def add_cli_option(cli_parser, setting_name, setting_info):
         help=description,
         dest=setting_name.upper(),
         metavar=setting_name.upper(),
-        action=cli_multirange_validator(setting_info["max_preset_count"]),
+        action=CheckMultiDpiRange,
+        max_preset_count=setting_info["max_preset_count"],
     )
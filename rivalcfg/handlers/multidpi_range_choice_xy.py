@@ -89,6 +89,7 @@ Functions
 
 import re
 import argparse
+import functools
 
 from .range_choice import process_range_choice
 from ..helpers import merge_bytes, uint_to_little_endian_bytearray
@@ -256,20 +257,29 @@ def process_value(setting_info, value, selected_preset=None):
     return merge_bytes(dpi_count, selected_preset, output_values)
 
 
-def cli_multirange_xy_validator(max_preset_count):
-    class CheckMultiDpiRangeXY(argparse.Action):
-        """Validate value from CLI"""
+class CheckMultiDpiRangeXY(argparse.Action):
+    """Validate value from CLI"""
+
+    def __init__(self, option_strings, dest, max_preset_count=1, **kwargs):
+        argparse.Action.__init__(self, option_strings, dest, **kwargs)
+        self.regexp = re.compile(
+            r"^ *([0-9]+( *: *[0-9]+)?)( *, *([0-9]+( *: *[0-9]+)?)){0,%i} *$"
+            % (max_preset_count - 1)
+        )
+
+    def __call__(self, parser, namespace, value, option_string=None):
+        if not self.regexp.match(value):
+            raise argparse.ArgumentError(self, "invalid DPI list: '%s'" % value)
+        setattr(namespace, self.dest.upper(), value)
 
-        def __call__(self, parser, namespace, value, option_string=None):
-            if not re.match(
-                r"^ *([0-9]+( *: *[0-9]+)?)( *, *([0-9]+( *: *[0-9]+)?)){0,%i} *$"
-                % (max_preset_count - 1),
-                value,
-            ):
-                raise argparse.ArgumentError(self, "invalid DPI list: '%s'" % value)
-            setattr(namespace, self.dest.upper(), value)
 
-    return CheckMultiDpiRangeXY
+def cli_multirange_xy_validator(max_preset_count):
+    """Returns the action that validates a DPI list of up to
+    ``max_preset_count`` values.
+
+    :param int max_preset_count: The maximum number of DPI values.
+    """
+    return functools.partial(CheckMultiDpiRangeXY, max_preset_count=max_preset_count)
 
 
 def add_cli_option(cli_parser, setting_name, setting_info):
@@ -292,5 +302,6 @@ def add_cli_option(cli_parser, setting_name, setting_info):
         help=description,
         dest=setting_name.upper(),
         metavar=setting_name.upper(),
-        action=cli_multirange_xy_validator(setting_info["max_preset_count"]),
+        action=CheckMultiDpiRangeXY,
+        max_preset_count=setting_info["max_preset_count"],
     )
@@ -146,6 +146,46 @@ def process_range(setting_info, value):
     return output_range[input_range.index(matched_value)]
 
 
+def compile_range(setting_info):
+    """Returns a function equivalent to :func:`process_range` for the given
+    setting, with a precomputed table matching the input range with the
+    output range.
+
+    :param dict setting_info: The information dict of the setting from the
+                              device profile.
+    :rtype: function
+
+    >>> process = compile_range({"input_range": [100, 2000, 100], "output_range": [2, 40, 2]})
+    >>> process(149)
+    2
+    >>> process(150)
+    4
+    """
+    range_start, range_stop, range_step = setting_info["input_range"]
+    input_range = range(range_start, range_stop + 1, range_step)
+    output_range = range(
+        setting_info["output_range"][0],
+        setting_info["output_range"][1] + 1,
+        setting_info["output_range"][2],
+    )
+    table = dict(zip(input_range, output_range))
+
+    def _process_range(value):
+        if len(input_range) != len(output_range):
+            raise ValueError("Input range and output range must have the same length")
+        matched_value = matches_value_in_range(
+            range_start,
+            range_stop,
+            range_step,
+            int(value),
+        )
+        if matched_value not in table:
+            raise ValueError("%i is not in the input range" % matched_value)
+        return table[matched_value]
+
+    return _process_range
+
+
 def process_value(setting_info, value):
     """Called by the :class:`rivalcfg.mouse.Mouse` class when processing a
     "range" type setting.
@@ -163,6 +203,25 @@ def process_value(setting_info, value):
     )
 
 
+def compile_process_value(setting_info):
+    """Returns a function equivalent to :func:`process_value` for the given
+    setting, with precomputed tables (see :func:`compile_range`).
+
+    :param dict setting_info: The information dict of the setting from the
+                              device profile.
+    :rtype: function
+    """
+    range_length = 1
+    if "range_length_byte" in setting_info:
+        range_length = setting_info["range_length_byte"]
+    process_range = compile_range(setting_info)
+
+    def _process_value(value):
+        return uint_to_little_endian_bytearray(process_range(value), range_length)
+
+    return _process_value
+
+
 def add_cli_option(cli_parser, setting_name, setting_info):
     """Add the given "range" type setting to the given CLI arguments parser.
 
@@ -105,9 +105,18 @@ def process_range_choice(setting_info, value):
     :param value: The input value.
     :rtype: int
     """
+    check_output_choices(setting_info)
+    matched_dpi = find_nearest_choice(setting_info["output_choices"].keys(), int(value))
+    return setting_info["output_choices"][matched_dpi]
+
 
-    # Checks
+def check_output_choices(setting_info):
+    """Checks that the output choices of the setting match its input range.
 
+    :param dict setting_info: The information dict of the setting from the
+                              device profile.
+    :raise ValueError: The output choices do not match the input range.
+    """
     _first, _last, _step = setting_info["input_range"]
 
     if len(setting_info["output_choices"]) != (_last - _first + _step) / _step:
@@ -123,11 +132,6 @@ def process_range_choice(setting_info, value):
             "Input range and output choices mismatch: not the same max value"
         )
 
-    #
-
-    matched_dpi = find_nearest_choice(setting_info["output_choices"].keys(), int(value))
-    return setting_info["output_choices"][matched_dpi]
-
 
 def process_value(setting_info, value):
     """Called by the :class:`rivalcfg.mouse.Mouse` class when processing a
@@ -146,6 +150,37 @@ def process_value(setting_info, value):
     )
 
 
+def compile_process_value(setting_info):
+    """Returns a function equivalent to :func:`process_value` for the given
+    setting. The profile is checked and the choices are sorted only once.
+
+    :param dict setting_info: The information dict of the setting from the
+                              device profile.
+    :rtype: function
+    """
+    range_length = 1
+    if "range_length_byte" in setting_info:
+        range_length = setting_info["range_length_byte"]
+
+    output_choices = setting_info["output_choices"]
+    sorted_choices = sorted(output_choices.keys())
+    choices_error = None
+    try:
+        check_output_choices(setting_info)
+    except ValueError as error:
+        choices_error = error
+
+    def _process_value(value):
+        if choices_error:
+            raise ValueError(str(choices_error))
+        matched_dpi = find_nearest_choice(sorted_choices, int(value))
+        return uint_to_little_endian_bytearray(
+            output_choices[matched_dpi], range_length
+        )
+
+    return _process_value
+
+
 def add_cli_option(cli_parser, setting_name, setting_info):
     """Add the given "range" type setting to the given CLI arguments parser.
 
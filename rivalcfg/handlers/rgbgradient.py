@@ -106,12 +106,13 @@ Functions
 
 import argparse
 
-from ..helpers import uint_to_little_endian_bytearray, merge_bytes
+from ..helpers import uint_to_little_endian_bytearray, write_bytes
 from ..helpers import parse_param_string, REGEXP_PARAM_STRING
 from ..color_helpers import is_color, parse_color_string
 from ..color_helpers import parse_color_gradient_string
 
 _default_duration = 1000
+_max_color_stops = 14
 
 
 def _handle_color_tuple(color):
@@ -187,6 +188,19 @@ def _handle_rgbgradient_string(colors):
     return _handle_rgbgradient_dict(gradient_dict["rgbgradient"])
 
 
+def get_value_length(setting_info):
+    """Returns the maximum length of the values encoded by
+    :func:`write_value`.
+
+    :param dict setting_info: The information dict of the setting from the
+                              device profile.
+    :rtype: int
+    """
+    header_length = setting_info["rgbgradient_header"]["header_length"]
+    # First color + (color, position) of each color stop
+    return header_length + 3 + 4 * _max_color_stops
+
+
 def process_value(setting_info, colors):
     """Called by the :class:`rivalcfg.mouse.Mouse` class when processing a
     "rgbgradient" type setting.
@@ -196,6 +210,24 @@ def process_value(setting_info, colors):
     :param str,tuple,list,dict colors: The color(s).
     :rtype: [int]
     """
+    buffer = bytearray(get_value_length(setting_info))
+    length = write_value(setting_info, buffer, 0, colors)
+    return list(buffer[:length])
+
+
+def write_value(setting_info, buffer, offset, colors):
+    """Writes the encoded color(s) into a buffer, in place (see
+    :func:`process_value`).
+
+    :param dict setting_info: The information dict of the setting from the
+                              device profile.
+    :param bytearray,memoryview buffer: The buffer to write in (see
+                                        :func:`get_value_length`).
+    :param int offset: The position of the value in the buffer.
+    :param str,tuple,list,dict colors: The color(s).
+    :rtype: int
+    :return: The length of the encoded value.
+    """
     header_length = setting_info["rgbgradient_header"]["header_length"]
     led_id_offsets = setting_info["rgbgradient_header"]["led_id_offsets"]
     duration_offset = setting_info["rgbgradient_header"]["duration_offset"]
@@ -243,39 +275,40 @@ def process_value(setting_info, colors):
     if len(gradient) == 0:
         raise ValueError("no color: %s" % str(colors))
 
-    if len(gradient) > 14:
-        raise ValueError("a maximum of 14 color stops are allowed")
+    if len(gradient) > _max_color_stops:
+        raise ValueError("a maximum of %i color stops are allowed" % _max_color_stops)
 
     # TODO check pos orders
 
     # -- Generate header
 
-    header = [0x00] * header_length
-    header[repeat_offset] = repeat
-    header[triggers_offset] = triggers
-    header[color_count_offset] = len(gradient)
+    write_bytes(buffer, offset, bytes(header_length))
+    buffer[offset + repeat_offset] = repeat
+    buffer[offset + triggers_offset] = triggers
+    buffer[offset + color_count_offset] = len(gradient)
 
     for led_id_offset in led_id_offsets:
-        header[led_id_offset] = led_id
+        buffer[offset + led_id_offset] = led_id
 
-    offset = 0
-    for b in uint_to_little_endian_bytearray(duration, duration_length):
-        header[duration_offset + offset] = b
-        offset += 1
+    write_bytes(
+        buffer,
+        offset + duration_offset,
+        uint_to_little_endian_bytearray(duration, duration_length),
+    )
 
     # -- Generate body
 
-    body = list(gradient[0]["color"])
+    position = write_bytes(buffer, offset + header_length, gradient[0]["color"])
 
     last_real_pos = 0
     for pos, color in [(item["pos"], item["color"]) for item in gradient]:
         real_pos = int(pos * 255 / 100)
-        body = merge_bytes(body, color, real_pos - last_real_pos)
+        position = write_bytes(buffer, position, color, real_pos - last_real_pos)
         last_real_pos = real_pos
 
     # --
 
-    return merge_bytes(header, body)
+    return position - offset
 
 
 def is_rgbgradient(string):
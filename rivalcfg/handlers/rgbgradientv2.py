@@ -100,7 +100,7 @@ Functions
 ---------
 """
 
-from ..helpers import uint_to_little_endian_bytearray, merge_bytes
+from ..helpers import uint_to_little_endian_bytearray, write_bytes
 from ..helpers import bytes_to_high_low_nibbles, nibbles_to_byte
 from ..color_helpers import is_color
 from .rgbgradient import _handle_color_tuple, _handle_color_string
@@ -110,6 +110,23 @@ from .rgbgradient import is_rgbgradient, CheckGradientAction
 _default_duration = 1000
 
 
+def get_value_length(setting_info):
+    """Returns the maximum length of the values encoded by
+    :func:`write_value`.
+
+    :param dict setting_info: The information dict of the setting from the
+                              device profile.
+    :rtype: int
+    """
+    color_field_length = setting_info["rgbgradientv2_header"]["color_field_length"]
+    duration_length = setting_info["rgbgradientv2_header"]["duration_length"]
+    maxgradient = setting_info["rgbgradientv2_header"]["maxgradient"]
+    # LED id + start header + 8 bytes per stage
+    header_length = max(color_field_length, 1 + 8 + 8 * (maxgradient - 1))
+    # Start color + end suffix + focal point + end suffix 2 + color count
+    return header_length + 6 + 2 + 4 + 6 + 2 + duration_length
+
+
 def process_value(setting_info, colors):
     """Called by the :class:`rivalcfg.mouse.Mouse` class when processing a
     "rgbgradientv2" type setting.
@@ -119,6 +136,24 @@ def process_value(setting_info, colors):
     :param str,tuple,list,dict colors: The color(s).
     :rtype: [int]
     """
+    buffer = bytearray(get_value_length(setting_info))
+    length = write_value(setting_info, buffer, 0, colors)
+    return list(buffer[:length])
+
+
+def write_value(setting_info, buffer, offset, colors):
+    """Writes the encoded color(s) into a buffer, in place (see
+    :func:`process_value`).
+
+    :param dict setting_info: The information dict of the setting from the
+                              device profile.
+    :param bytearray,memoryview buffer: The buffer to write in (see
+                                        :func:`get_value_length`).
+    :param int offset: The position of the value in the buffer.
+    :param str,tuple,list,dict colors: The color(s).
+    :rtype: int
+    :return: The length of the encoded value.
+    """
     color_field_length = setting_info["rgbgradientv2_header"]["color_field_length"]
     duration_length = setting_info["rgbgradientv2_header"]["duration_length"]
     maxgradient = setting_info["rgbgradientv2_header"]["maxgradient"]
@@ -171,28 +206,26 @@ def process_value(setting_info, colors):
     start_header = [0x1D, 0x01, 0x02, 0x31, 0x51, 0xFF, 0xC8, 0x00]
     #              [0xff, 0x3c, 0x00, 0xff, 0x32, 0xc8, 0xc8, 0x00]
     # [WIP] header command
-    header = merge_bytes(setting_info["led_id"], start_header)
+    position = write_bytes(buffer, offset, setting_info["led_id"], start_header)
 
     # 8 bytes in a stage, first byte is index, 2nd is padding,
     # 3-5 is signed bytes depecting color increase/decrease, 6 bytes
     # is padding, the 7-8 is time since last stage in ms
-    # Process colors and positions in shift array, appending each stage
-    # to the previous one
+    # Process colors and positions in shift array, writing each stage
+    # after the previous one
 
     last_real_pos = gradient[0]["pos"]
     start_color = gradient[0]["color"]
     del gradient[0]
 
     index = 0
-    stage = []
     oldcolor = list(start_color)
     for pos, color in [(item["pos"], item["color"]) for item in gradient]:
         if pos <= last_real_pos:
             raise ValueError(
                 "Incorrect order for gradient or duplicate order found please check position order"
             )
-        stage.append(index)  # Stage index number
-        stage.append(0)  # Padding
+        position = write_bytes(buffer, position, index, 0)  # Index + padding
         time = int((duration / 100) * (pos - last_real_pos))
         last_real_pos = pos
         if time == 0:
@@ -202,19 +235,23 @@ def process_value(setting_info, colors):
             diff = rgb - oldcolor[rgb_index]
             ramp = int(diff / float(time) * 16)
             oldcolor[rgb_index] = rgb
-            stage = merge_bytes(stage, ramp & 255)
+            position = write_bytes(buffer, position, ramp & 255)
             rgb_index = rgb_index + 1
-        stage.append(0)  # Padding
-        time = uint_to_little_endian_bytearray(time, 2)
-        stage = merge_bytes(stage, time)
+        position = write_bytes(
+            buffer,
+            position,
+            0,  # Padding
+            uint_to_little_endian_bytearray(time, 2),
+        )
         index = index + 1
 
-    header = merge_bytes(header, stage)
     # Pad the rest of the command so we can place start color, end suffix and
     # cycle time at the correct offset in the command
 
-    padding = [0] * (color_field_length - len(header))
-    header = merge_bytes(header, padding)
+    if position < offset + color_field_length:
+        position = write_bytes(
+            buffer, position, bytes(offset + color_field_length - position)
+        )
 
     # Split start color into high low nibbles
     split_color = []
@@ -233,7 +270,9 @@ def process_value(setting_info, colors):
     # Amount of colors in gradient (command still work if value is incorrect)
     num_color = uint_to_little_endian_bytearray(gradient_length - 1, 2)
     duration = uint_to_little_endian_bytearray(duration, duration_length)
-    suffix = merge_bytes(
+    position = write_bytes(
+        buffer,
+        position,
         split_color,
         end_suffix,
         focal_x,
@@ -243,7 +282,7 @@ def process_value(setting_info, colors):
         duration,
     )
 
-    return merge_bytes(header, suffix)
+    return position - offset
 
 
 def add_cli_option(cli_parser, setting_name, setting_info):
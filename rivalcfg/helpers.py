@@ -31,6 +31,34 @@ def merge_bytes(*args):
     return result
 
 
+def write_bytes(buffer, offset, *args):
+    """Writes the given int and list of int into a buffer, in place. This is
+    the in place equivalent of :func:`merge_bytes`.
+
+    :param bytearray,memoryview buffer: The buffer to write in. It must be
+                                        large enough to hold the values.
+    :param int offset: The position of the first byte to write.
+    :param int,list[int] args: Values to write.
+    :rtype: int
+    :return: The position following the last written byte.
+
+    >>> from rivalcfg.helpers import write_bytes
+    >>> buffer = bytearray(5)
+    >>> write_bytes(buffer, 1, 1, [2, 3])
+    4
+    >>> buffer
+    bytearray(b'\\x00\\x01\\x02\\x03\\x00')
+    """
+    for arg in args:
+        if isinstance(arg, (list, tuple, bytes, bytearray)):
+            buffer[offset : offset + len(arg)] = bytes(arg)
+            offset += len(arg)
+        else:
+            buffer[offset] = arg
+            offset += 1
+    return offset
+
+
 def module_ls(module):
     """List the content of the given Python module, ignoring private elements.
 
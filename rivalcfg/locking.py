@@ -0,0 +1,358 @@
+"""
+This module provides an advisory lock per physical device, shared by all the
+processes that use rivalcfg. It avoids commands from several processes
+(e.g. a login script and an udev hook) to be interleaved, which can hang some
+devices.
+
+The lock is an ``flock()`` on a file named after the physical location of the
+device on the USB buses, so the different paths of a device (``/dev/hidrawN``
+or libusb path) give the same lock. Waiters are queued in a directory next to
+the lock file and get the lock in their order of arrival. The time of the
+last command sent to the device is stored in the lock file, so the delay
+between two commands is respected across processes.
+
+.. NOTE::
+
+   Lock files are located in ``/run/lock/rivalcfg/`` (or in a ``rivalcfg``
+   folder of the temporary directory if ``/run/lock`` does not exist). This
+   folder is shared by all the users, so a process run as root (e.g. an udev
+   hook) and the processes of the logged in user lock the same files.
+
+   As any user can create files in it, the folder is only used if it is owned
+   by root or by the current user and has the sticky bit, and symbolic links
+   are never followed in it. Lock files are created with the umask of the
+   process: the time of the last command is only shared with the users that
+   can write to the lock file.
+
+.. NOTE::
+
+   Locks are only available on POSIX systems. On other systems, they do
+   nothing.
+"""
+
+import os
+import stat
+import time
+import uuid
+import tempfile
+
+from . import usbhid
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+
+class LockTimeout(Exception):
+    """Exception raised when a lock cannot be acquired in time."""
+
+
+class UnsafeLock(Exception):
+    """Exception raised when the lock folder or the lock file could have been
+    tampered with by another user (symbolic link, folder owned by another
+    user or without the sticky bit,...).
+    """
+
+
+#: The system-wide folder where the lock folder is created, if it exists.
+SYSTEM_LOCK_DIR = "/run/lock"
+
+
+def get_lock_dir():
+    """Returns the path of the folder where lock files are stored. It is the
+    same for all the users.
+
+    :rtype: str
+    """
+    if os.path.isdir(SYSTEM_LOCK_DIR):
+        return os.path.join(SYSTEM_LOCK_DIR, "rivalcfg")
+    return os.path.join(tempfile.gettempdir(), "rivalcfg")
+
+
+def get_lock_path(vendor_id, product_id, endpoint, path=None):
+    """Returns the path of the lock file of a device.
+
+    :param int vendor_id: The vendor id of the device (e.g. ``0x1038``)).
+    :param int product_id: The product id of the device (e.g. ``0x1710``).
+    :param int endpoint: The endpoint of the device (e.g. ``0``).
+    :param bytes path: The path of the device (optional). When provided, the
+                       lock is specific to this physical device, whatever the
+                       backend that returned the path (see
+                       :func:`rivalcfg.usbhid.get_device_id`).
+    :rtype: str
+
+    >>> import os
+    >>> os.path.basename(get_lock_path(0x1038, 0x1702, 0, b"1-2.3:1.0"))
+    'usb-1-2.3.lock'
+    >>> os.path.basename(get_lock_path(0x1038, 0x1702, 0, b"DevSrvsID:4294969636"))
+    'DevSrvsID_4294969636.lock'
+    >>> os.path.basename(get_lock_path(0x1038, 0x1702, 0))
+    '1038_1702_00.lock'
+    """
+    if path:
+        name = usbhid.get_device_id(path)
+    else:
+        name = "%04x_%04x_%02x" % (vendor_id, product_id, endpoint)
+    return os.path.join(get_lock_dir(), "%s.lock" % name)
+
+
+def _open_dir(path, mode, dir_fd=None):
+    """Opens a folder, without following symbolic links, and creates it if
+    it does not exist.
+
+    :param str path: The path of the folder.
+    :param int mode: The mode of the folder if it is created (the umask is
+                     ignored).
+    :param int dir_fd: The folder the path is relative to (optional).
+    :raise UnsafeLock: The path is a symbolic link or is not a folder.
+    :rtype: int
+    :return: A file descriptor of the folder.
+    """
+    created = False
+    try:
+        os.mkdir(path, mode, dir_fd=dir_fd)
+        created = True
+    except FileExistsError:
+        pass
+    try:
+        fd = os.open(
+            path,
+            os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW | os.O_CLOEXEC,
+            dir_fd=dir_fd,
+        )
+    except FileNotFoundError:
+        raise
+    except OSError as error:  # ELOOP on symbolic links, ENOTDIR on files
+        raise UnsafeLock("Unsafe lock folder (%s): %s" % (path, error)) from None
+    if created:
+        os.fchmod(fd, mode)
+    return fd
+
+
+def _check_lock_dir(fd, path):
+    """Checks that the files of the lock folder can only be removed or
+    replaced by their owner, root or the current user.
+
+    :param int fd: A file descriptor of the lock folder.
+    :param str path: The path of the lock folder (for error messages).
+    :raise UnsafeLock: The folder is not safe.
+    """
+    stat_ = os.fstat(fd)
+    if stat_.st_uid not in (0, os.getuid()):
+        raise UnsafeLock(
+            "Unsafe lock folder (%s): owned by another user (uid %i)"
+            % (path, stat_.st_uid)
+        )
+    if not stat_.st_mode & stat.S_ISVTX:
+        raise UnsafeLock("Unsafe lock folder (%s): sticky bit not set" % path)
+
+
+def _open_lock_file(name, dir_fd):
+    """Opens (and creates if needed) a lock file, without following symbolic
+    links. The file is opened read-only if it is not writable by the current
+    user.
+
+    :param str name: The name of the lock file.
+    :param int dir_fd: A file descriptor of the lock folder.
+    :raise UnsafeLock: The lock file is not a regular file.
+    :rtype: (int, bool)
+    :return: A file descriptor of the lock file and whether it is writable.
+    """
+    flags = os.O_NOFOLLOW | os.O_CLOEXEC
+    try:
+        try:
+            fd = os.open(name, os.O_RDWR | os.O_CREAT | flags, 0o666, dir_fd=dir_fd)
+            writable = True
+        except PermissionError:
+            fd = os.open(name, os.O_RDONLY | flags, dir_fd=dir_fd)
+            writable = False
+    except PermissionError:
+        raise
+    except OSError as error:  # ELOOP on symbolic links
+        raise UnsafeLock("Unsafe lock file (%s): %s" % (name, error)) from None
+    stat_ = os.fstat(fd)
+    if not stat.S_ISREG(stat_.st_mode) or stat_.st_nlink != 1:
+        os.close(fd)
+        raise UnsafeLock("Unsafe lock file (%s): not a regular file" % name)
+    return fd, writable
+
+
+def _is_process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class DeviceLock:
+    """An advisory lock shared by all the processes that access a device.
+
+    :param str lock_path: The path of the lock file (see
+                          :func:`get_lock_path`).
+    :param float poll_interval: How often waiters check if it is their turn
+                                (in seconds).
+
+    >>> from rivalcfg.locking import DeviceLock, get_lock_path
+    >>> with DeviceLock(get_lock_path(0x1038, 0x1702, 0)) as lock:
+    ...     lock.is_locked
+    True
+    """
+
+    def __init__(self, lock_path, poll_interval=0.005):
+        """Constructor."""
+        self._lock_path = lock_path
+        self._queue_path = "%s.queue" % lock_path
+        self._poll_interval = poll_interval
+        self._fd = None
+        self._writable = False
+        self._last_command_time = None
+
+    @property
+    def is_locked(self):
+        """``True`` if the lock is held by this object."""
+        return self._fd is not None
+
+    @property
+    def last_command_time(self):
+        """The time (:func:`time.monotonic`) of the last command sent to the
+        device by the previous holder of the lock, or ``None`` if unknown.
+        """
+        return self._last_command_time
+
+    def acquire(self, timeout=None):
+        """Acquires the lock, waiting for the previous waiters to get and
+        release it first.
+
+        :param float timeout: The maximum time to wait (in seconds, optional,
+                              by default wait forever).
+        :raise LockTimeout: The lock was not acquired in time.
+        :raise UnsafeLock: The lock folder or the lock file could have been
+                           tampered with by another user.
+        """
+        if self._fd is not None:
+            return
+        if fcntl is None:
+            self._fd = -1
+            return
+
+        lock_dir = os.path.dirname(self._lock_path)
+        dir_fd = _open_dir(lock_dir, 0o1777)
+        try:
+            _check_lock_dir(dir_fd, lock_dir)
+            # The sticky bit of the lock folder protects the lock files. It
+            # is not set on the queue, as the tickets of dead processes are
+            # removed by the other ones.
+            queue_fd = _open_dir(
+                os.path.basename(self._queue_path), 0o777, dir_fd=dir_fd
+            )
+            try:
+                fd, writable = _open_lock_file(
+                    os.path.basename(self._lock_path), dir_fd
+                )
+                try:
+                    self._wait_turn(fd, queue_fd, timeout)
+                except BaseException:
+                    os.close(fd)
+                    raise
+            finally:
+                os.close(queue_fd)
+        finally:
+            os.close(dir_fd)
+
+        self._fd = fd
+        self._writable = writable
+        self._last_command_time = self._read_last_command_time()
+
+    def _wait_turn(self, fd, queue_fd, timeout):
+        ticket = "%020d-%d-%s" % (time.time_ns(), os.getpid(), uuid.uuid4().hex)
+        os.close(
+            os.open(
+                ticket,
+                os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_NOFOLLOW | os.O_CLOEXEC,
+                0o644,
+                dir_fd=queue_fd,
+            )
+        )
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            while True:
+                if self._is_first_in_queue(ticket, queue_fd):
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        return
+                    except BlockingIOError:
+                        pass
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise LockTimeout(
+                        "Unable to lock the device (%s)" % self._lock_path
+                    )
+                time.sleep(self._poll_interval)
+        finally:
+            _remove_file(ticket, queue_fd)
+
+    def release(self, last_command_time=None):
+        """Releases the lock.
+
+        :param float last_command_time: The time (:func:`time.monotonic`) of
+                                        the last command sent to the device
+                                        (optional). It will be used by the
+                                        next holder of the lock to respect
+                                        the delay between two commands.
+        """
+        if self._fd is None:
+            return
+        if self._fd >= 0:
+            if last_command_time is not None and self._writable:
+                self._write_last_command_time(last_command_time)
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+        self._fd = None
+
+    def _is_first_in_queue(self, ticket, queue_fd):
+        for other_ticket in sorted(os.listdir(queue_fd)):
+            if other_ticket == ticket:
+                return True
+            # Remove the tickets of dead processes
+            try:
+                pid = int(other_ticket.split("-")[1])
+            except (IndexError, ValueError):
+                pid = None
+            if pid is None or not _is_process_alive(pid):
+                _remove_file(other_ticket, queue_fd)
+                continue
+            return False
+        return False
+
+    def _read_last_command_time(self):
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        try:
+            wall_time = float(os.read(self._fd, 64).decode() or "nan")
+        except ValueError:
+            return None
+        if wall_time != wall_time:  # NaN
+            return None
+        return time.monotonic() - max(0, time.time() - wall_time)
+
+    def _write_last_command_time(self, last_command_time):
+        wall_time = time.time() - max(0, time.monotonic() - last_command_time)
+        os.ftruncate(self._fd, 0)
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        os.write(self._fd, ("%.6f" % wall_time).encode())
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, type_, value, traceback):
+        self.release()
+
+
+def _remove_file(path, dir_fd=None):
+    try:
+        os.remove(path, dir_fd=dir_fd)
+    except FileNotFoundError:
+        pass
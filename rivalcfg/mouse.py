@@ -1,14 +1,39 @@
 import os
 import time
+import hashlib
+import contextlib
 
 from . import usbhid
 from . import devices
-from . import handlers
+from . import encoders
 from . import helpers
+from . import locking
+from . import calibration
 from . import mouse_settings
+from .pacing import CommandPacer
 
+#: Default time to wait for the response of a device (in milliseconds).
+DEFAULT_RESPONSE_TIMEOUT_MS = 200
 
-def get_mouse(vendor_id=0x1038, product_id=None):
+#: How long to skip reads once a device did not respond (in seconds).
+DEFAULT_NO_RESPONSE_COOLDOWN = 5
+
+# Maximum length of the reports discarded by Mouse._drain_unread_responses()
+_DRAIN_REPORT_LENGTH = 64
+
+# Maximum number of reports discarded by Mouse._drain_unread_responses()
+_DRAIN_MAX_REPORTS = 16
+
+
+def get_mouse(
+    vendor_id=0x1038,
+    product_id=None,
+    path=None,
+    pool=None,
+    lock=False,
+    lock_timeout=None,
+    skip_unchanged=False,
+):
     """Get a :class:`Mouse` instance to manipulate requested device.
 
     :param int vendor_id: The vendor id of the device (optional, by default
@@ -16,8 +41,28 @@ def get_mouse(vendor_id=0x1038, product_id=None):
                           (``0x1038``)).
     :param int product_id: The product id of one of the supported device (e.g.
                            ``0x1702``).
+    :param bytes path: The path of the device endpoint, as returned by
+                       :func:`rivalcfg.devices.list_plugged_devices`
+                       (optional). When provided, the bus is not scanned
+                       again to find the device.
+    :param rivalcfg.usbhid.DevicePool pool: A device pool to borrow the HID
+                                            device from (optional). When
+                                            provided, the device is kept open
+                                            when the mouse is closed, and
+                                            reused by the next calls.
+    :param bool lock: Lock the device for all the other processes until the
+                      mouse is closed (see :mod:`rivalcfg.locking`, default:
+                      ``False``).
+    :param float lock_timeout: The maximum time to wait for the lock (in
+                               seconds, optional, by default wait forever).
+    :param bool skip_unchanged: Do not resend the settings the device already
+                                has (see :attr:`Mouse.skip_unchanged`,
+                                default: ``False``).
     :raise rivalcfg.devices.UnsupportedDevice: The requested device is not
                                                supported by rivalcfg.
+    :raise rivalcfg.locking.LockTimeout: The device was not locked in time.
+    :raise rivalcfg.locking.UnsafeLock: The lock folder of the device is not
+                                        safe to use.
     :rtype: Mouse
 
     >>> from rivalcfg.mouse import get_mouse
@@ -28,15 +73,162 @@ def get_mouse(vendor_id=0x1038, product_id=None):
         raise ValueError("You must define the 'product_id' parameter")
 
     profile = devices.get_profile(vendor_id, product_id)
-    settings = mouse_settings.get_mouse_settings(
-        vendor_id,
-        product_id,
-        profile,
+
+    # The path identifies the physical device. Pooled devices are found
+    # without scanning the bus again.
+    if not path and (lock or pool is None) and "RIVALCFG_DRY" not in os.environ:
+        path = usbhid.enumerate_devices(vendor_id).get(
+            (vendor_id, product_id, profile["endpoint"])
+        )
+
+    device_lock = None
+    if lock:
+        device_lock = locking.DeviceLock(
+            locking.get_lock_path(vendor_id, product_id, profile["endpoint"], path)
+        )
+        device_lock.acquire(timeout=lock_timeout)
+
+    hid_device = None
+    try:
+        if pool is not None:
+            hid_device = pool.open_device(
+                vendor_id,
+                product_id,
+                profile["endpoint"],
+                path=path,
+            )
+        else:
+            hid_device = usbhid.open_device(
+                vendor_id,
+                product_id,
+                profile["endpoint"],
+                path=path,
+            )
+        device_path = path
+        if not device_path and isinstance(hid_device, usbhid.PooledDevice):
+            device_path = hid_device.key[3]
+        settings = mouse_settings.get_mouse_settings(
+            vendor_id,
+            product_id,
+            profile,
+            device_id=usbhid.get_device_id(device_path) if device_path else None,
+        )
+        mouse = Mouse(hid_device, profile, settings, device_lock=device_lock)
+    except BaseException:
+        if hid_device is not None:
+            hid_device.close()
+        if device_lock is not None:
+            device_lock.release()
+        raise
+
+    try:
+        mouse.skip_unchanged = skip_unchanged
+        calibration.apply_calibrated_delay(mouse)
+    except BaseException:
+        mouse.close()  # Also releases the lock
+        raise
+
+    return mouse
+
+
+_MOUSE_CLASSES_CACHE = {}
+
+
+def _get_setting_method_doc(setting_info):
+    """Returns the docstring of the ``set_<setting_name>`` method of a
+    setting.
+
+    :param dict setting_info: The information dict of the setting from the
+                              device profile.
+    :rtype: str
+    """
+    doc = "%s." % setting_info.get("description", "").rstrip(".")
+    if (
+        "value_type" in setting_info
+        and setting_info["value_type"]
+        and setting_info["value_type"] != "none"
+    ):
+        doc += "\n\n:param args: The value (see :mod:`rivalcfg.handlers.%s`)." % (
+            setting_info["value_type"]
+        )
+    doc += (
+        "\n:param bool force: Send the setting even if the device already has it"
+        "\n                   (see :attr:`Mouse.skip_unchanged`)."
     )
+    return doc
+
+
+def _make_setting_method(setting_name, setting_info):
+    """Creates the ``set_<setting_name>`` method of a setting.
+
+    :param str setting_name: The name of the setting.
+    :param dict setting_info: The information dict of the setting from the
+                              device profile.
+    :rtype: function
+    """
+
+    def set_setting(self, *args, force=False):
+        return self._set_setting(setting_name, *args, force=force)
+
+    set_setting.__name__ = "set_%s" % setting_name
+    set_setting.__qualname__ = "Mouse.set_%s" % setting_name
+    set_setting.__doc__ = _get_setting_method_doc(setting_info)
+
+    return set_setting
+
 
-    hid_device = usbhid.open_device(vendor_id, product_id, profile["endpoint"])
+def get_mouse_class(mouse_profile, base_class=None):
+    """Returns a subclass of :class:`Mouse` (or of the given base class) with
+    a ``set_<setting_name>`` method for each setting of the given profile.
+    The methods are created by the ``_make_setting_method`` static method of
+    the base class. The class is generated on the first call and then reused
+    for the same profile.
 
-    return Mouse(hid_device, profile, settings)
+    .. NOTE::
+
+       :class:`Mouse` instances are always created from this class, so you
+       do not need to call this function yourself.
+
+    :param dict mouse_profile: The mouse profile (``rivalcfg.devices.*``).
+    :param type base_class: The class to derive from (optional, default:
+                            :class:`Mouse`, see also
+                            :class:`rivalcfg.aio.AsyncMouse`).
+    :rtype: type
+
+    >>> from rivalcfg import devices
+    >>> from rivalcfg.mouse import get_mouse_class
+    >>> profile = devices.get_profile(vendor_id=0x1038, product_id=0x1702)
+    >>> "set_light_effect" in dir(get_mouse_class(profile))
+    True
+    """
+    if base_class is None:
+        base_class = Mouse
+    key = (id(mouse_profile), base_class)
+    if key not in _MOUSE_CLASSES_CACHE:
+        attrs = {
+            "__module__": base_class.__module__,
+            "__doc__": base_class.__doc__,
+            "_profile_class": True,
+        }
+        for setting_name, setting_info in mouse_profile["settings"].items():
+            attrs["set_%s" % setting_name] = base_class._make_setting_method(
+                setting_name, setting_info
+            )
+        mouse_class = type(base_class.__name__, (base_class,), attrs)
+        # The profile is kept in the cache so its id cannot be reused
+        _MOUSE_CLASSES_CACHE[key] = (mouse_profile, mouse_class)
+    return _MOUSE_CLASSES_CACHE[key][1]
+
+
+def _invalidate_mouse_classes(mouse_profile):
+    """Forget the classes generated for a profile (see
+    :func:`rivalcfg.encoders.invalidate`).
+
+    :param dict mouse_profile: The mouse profile (``rivalcfg.devices.*``).
+    """
+    for key in list(_MOUSE_CLASSES_CACHE):
+        if _MOUSE_CLASSES_CACHE[key][0] is mouse_profile:
+            del _MOUSE_CLASSES_CACHE[key]
 
 
 class Mouse:
@@ -46,6 +238,8 @@ class Mouse:
 
        Additional methods are available in this class depending on the loaded
        profile. Read device specific documentation for more information.
+       Instances are created from a subclass generated for the profile (see
+       :func:`get_mouse_class`).
 
     .. WARNING::
 
@@ -53,11 +247,15 @@ class Mouse:
        :func:`get_mouse` factory function instead.
 
     :param hid_device: The HID device to write in (provided by the
-                        :func:`rivalcfg.usbhid.open_device`).
+                        :func:`rivalcfg.usbhid.open_device`). It can be any
+                        of the :data:`rivalcfg.usbhid.TRANSPORTS`.
     :param mouse_profile: One of the rivalcfg mouse profile (provided by
                             :func:`rivalcfg.devices.get_profile`).
     :param float command_delay: Waiting time beween two commands to not
                                 overload the device.
+    :param rivalcfg.locking.DeviceLock device_lock: The lock of the device,
+                                                   released when the mouse
+                                                   is closed (optional).
 
     >>> from rivalcfg import usbhid
     >>> from rivalcfg import devices
@@ -79,12 +277,57 @@ class Mouse:
     #: The mouse settings (:class:`rivalcfg.mouse_settings.MouseSettings`)
     mouse_settings = None
 
-    _MIN_COMMAND_DELAY = 0.001
-    _command_approve_delay = None
-
-    def __init__(self, hid_device, mouse_profile, mouse_settings, command_delay=0.05):
+    #: How long to skip reads once the device did not respond (in seconds).
+    #: Requests that expect a response (battery level, firmware version) are
+    #: not sent at all during this time. As it is stored with the mouse
+    #: settings (see
+    #: :meth:`rivalcfg.mouse_settings.MouseSettings.set_no_response_until`),
+    #: other processes skip them too for the same physical device. ``0``
+    #: disables this behaviour.
+    no_response_cooldown = DEFAULT_NO_RESPONSE_COOLDOWN
+
+    #: Do not resend a setting when its encoded packet is the same as the last
+    #: one sent to the device, and do not save the settings in the device
+    #: memory when nothing changed since the last save. Pass ``force=True`` to
+    #: the ``set_*`` methods, to :meth:`reset_settings` or to :meth:`save` to
+    #: send the packets anyway. The packets sent are remembered across
+    #: sessions per physical device, and only in memory if the path of the
+    #: device is unknown.
+    skip_unchanged = False
+
+    _MIN_COMMAND_DELAY = calibration.MIN_COMMAND_DELAY
+
+    _profile_class = False
+    _make_setting_method = staticmethod(_make_setting_method)
+
+    def __new__(cls, hid_device, mouse_profile, *args, **kwargs):
+        if not cls._profile_class:
+            cls = get_mouse_class(mouse_profile, base_class=cls)
+        return super().__new__(cls)
+
+    def __init__(
+        self,
+        hid_device,
+        mouse_profile,
+        mouse_settings,
+        command_delay=calibration.DEFAULT_COMMAND_DELAY,
+        device_lock=None,
+    ):
         """Constructor."""
         self._hid_device = hid_device
+        self._device_lock = device_lock
+        self._pacer = CommandPacer(command_delay)
+        if device_lock is not None and device_lock.last_command_time is not None:
+            # Respect the delay after the commands of the previous session
+            self._pacer.mark(device_lock.last_command_time)
+        self._report_reader = None
+        self._report_buffers = {}
+        self._last_write_time = None
+        self._response_timeout_ms = None
+        self._unread_responses = False
+        self._batch = None
+        self._batch_save = False
+        self._unsaved_changes = False
         self.mouse_profile = mouse_profile
         self.mouse_settings = mouse_settings
         self.command_delay = command_delay
@@ -93,11 +336,18 @@ class Mouse:
     def command_delay(self):
         """Waiting time beween two commands to not overload the device.
 
+        The delay is counted from the moment a command is sent: the time
+        spent between two commands is deduced from it, and no time is wasted
+        after the last command (see :class:`rivalcfg.pacing.CommandPacer`).
+
         .. WARNING::
 
            Setting this value too low can hang the device. Some mice like the
            Kinzu v2 are known to become laggy or even to crash when commands
            are sent too quickly.
+
+        A safe value can be measured for each device with
+        :func:`rivalcfg.calibration.calibrate_command_delay`.
         """
         return self._command_delay
 
@@ -108,7 +358,27 @@ class Mouse:
                 f"command_delay is unsafe to use, with a delay of less than {self._MIN_COMMAND_DELAY} seconds"
             )
 
-        self._command_approve_delay = new_value
+        self._command_delay = new_value
+        self._pacer.delay = new_value
+
+    @property
+    def response_timeout_ms(self):
+        """How long to wait for the response of the device (in milliseconds).
+
+        The default value is read from the ``response_timeout_ms`` key of the
+        mouse profile (or :data:`DEFAULT_RESPONSE_TIMEOUT_MS` if not
+        defined). Setting this property overrides it for the session.
+        """
+        if self._response_timeout_ms is not None:
+            return self._response_timeout_ms
+        return self.mouse_profile.get(
+            "response_timeout_ms",
+            DEFAULT_RESPONSE_TIMEOUT_MS,
+        )
+
+    @response_timeout_ms.setter
+    def response_timeout_ms(self, new_value):
+        self._response_timeout_ms = new_value
 
     @property
     def name(self):
@@ -132,13 +402,14 @@ class Mouse:
         """
         if "firmware_version" not in self.mouse_profile:
             return (0,)
+        if self._is_in_no_response_cooldown():
+            return (0,)
         self._hid_write(
             self.mouse_profile["firmware_version"]["report_type"],
             data=self.mouse_profile["firmware_version"]["command"],
         )
-        version = self._hid_device.read(
+        version = self._read_response(
             self.mouse_profile["firmware_version"]["response_length"],
-            timeout_ms=200,
         )
         if not version:
             return (0,)
@@ -168,14 +439,15 @@ class Mouse:
         }
         if "battery_level" not in self.mouse_profile:
             return result
+        if self._is_in_no_response_cooldown():
+            return result
 
         self._hid_write(
             self.mouse_profile["battery_level"]["report_type"],
             data=self.mouse_profile["battery_level"]["command"],
         )
-        data = self._hid_device.read(
+        data = self._read_response(
             self.mouse_profile["battery_level"]["response_length"],
-            timeout_ms=200,
         )
 
         try:
@@ -197,8 +469,13 @@ class Mouse:
 
         return result
 
-    def reset_settings(self):
-        """Sets all settings to their factory default values."""
+    def reset_settings(self, force=False):
+        """Sets all settings to their factory default values.
+
+        :param bool force: Send all the settings even if the device already
+                           has them (see :attr:`skip_unchanged`, default:
+                           ``False``).
+        """
         for name, setting_info in self.mouse_profile["settings"].items():
             method_name = "set_%s" % name
             method = getattr(self, method_name)
@@ -207,12 +484,75 @@ class Mouse:
                 and setting_info["value_type"]
                 and setting_info["value_type"] != "none"
             ):
-                method(setting_info["default"])
+                method(setting_info["default"], force=force)
             else:
-                method()
+                method(force=force)
+
+    @contextlib.contextmanager
+    def batch(self, save=False):
+        """Context manager that queues the changes of settings and sends them
+        all at once when the context exits.
+
+        Inside the context, ``set_*`` methods only encode their value (so
+        invalid values are still reported immediately) and return ``None``.
+        When a setting is changed several times, only its last value is sent,
+        at the place of its first change. The mouse settings are updated once
+        the packets are sent. If an exception is raised inside the context,
+        nothing is sent.
+
+        :param bool save: Save the settings in the mouse internal memory once
+                          all the changes are sent (default: ``False``).
+                          Calling :meth:`save` inside the context has the
+                          same effect.
+
+        >>> from rivalcfg.mouse import get_mouse
+        >>> mouse = get_mouse(vendor_id=0x1038, product_id=0x1702)
+        >>> with mouse.batch(save=True):
+        ...     mouse.set_color("red")
+        ...     mouse.set_light_effect("breath")
+        ...     mouse.set_color("blue")  # Only "blue" will be sent
+        """
+        if self._batch is not None:
+            # Nested batch: changes are sent by the outer one
+            if save:
+                self._batch_save = True
+            yield self
+            return
+
+        self._batch = {}
+        self._batch_save = save
+        try:
+            yield self
+        except BaseException:
+            self._batch = None
+            raise
+
+        commands = self._batch
+        self._batch = None
+        for setting_name, (data, args, force) in commands.items():
+            self._send_setting(setting_name, data, args, force=force)
+        if self._batch_save:
+            self.save()
+
+    def save(self, force=False):
+        """Save current config to the mouse internal memory.
+
+        .. NOTE::
+
+           Inside a :meth:`batch`, the settings are saved when the batch is
+           sent, and this method returns ``None``.
+
+        :param bool force: Save the settings even if nothing changed since the
+                           last save (see :attr:`skip_unchanged`, default:
+                           ``False``).
+        """
+        if self._batch is not None:
+            self._batch_save = True
+            return None
+
+        if self.skip_unchanged and not force and not self._unsaved_changes:
+            return None
 
-    def save(self):
-        """Save current config to the mouse internal memory."""
         # This should never happen... But who knows...
         if (
             "save_command" not in self.mouse_profile
@@ -235,15 +575,42 @@ class Mouse:
             "readback_length" in self.mouse_profile["save_command"]
             and self.mouse_profile["save_command"]["readback_length"]
         ):
-            response = self._hid_device.read(
+            response = self._read_response(
                 self.mouse_profile["save_command"]["readback_length"],
-                timeout_ms=200,
+                command=self.mouse_profile["save_command"]["command"],
             )
 
         self.mouse_settings.save()
+        self._unsaved_changes = False
 
         return response
 
+    def start_report_reader(self, capacity=32):
+        """Starts a background thread that reads the input reports of the
+        device (see :class:`rivalcfg.usbhid.ReportReader`).
+
+        Once started, the responses of the device are taken from the reports
+        read by this thread: each command gets the first report received
+        after it was sent (that is a valid acknowledgement of the command if
+        the profile describes one). Late or stale reports do not block the
+        caller anymore, and are not paired with the wrong command.
+
+        :param int capacity: The maximum number of reports kept in the buffer.
+        """
+        if self._report_reader is not None:
+            return
+        self._report_reader = usbhid.ReportReader(self._hid_device, capacity=capacity)
+        self._report_reader.start()
+
+    def stop_report_reader(self):
+        """Stops the background thread started by
+        :meth:`start_report_reader`.
+        """
+        if self._report_reader is None:
+            return
+        self._report_reader.stop()
+        self._report_reader = None
+
     def close(self):
         """Close the device.
 
@@ -252,7 +619,10 @@ class Mouse:
            Once called, any access of the Mouse class properties or function
            may raise an error.
         """
+        self.stop_report_reader()
         self._hid_device.close()
+        if self._device_lock is not None:
+            self._device_lock.release(self._pacer.last_command_time)
 
     def _hid_write(
         self,
@@ -284,80 +654,222 @@ class Mouse:
             )
         else:
             bytes_ = bytearray(helpers.merge_bytes(report_id, data))
+
+        self._hid_write_report(report_type, bytes_)
+
+    def _hid_write_report(self, report_type, report):
+        """
+        Write a full HID report to the device.
+
+        :param int report_type: The HID report type
+                                (:data:`rivalcfg.usbhid.HID_REPORT_TYPE_OUTPUT`
+                                or
+                                :data:`rivalcfg.usbhid.HID_REPORT_TYPE_FEATURE`).
+        :param bytes report: The report, starting with the report id. Any
+                             bytes-like object is accepted (``bytes``,
+                             ``bytearray``, ``memoryview``,...).
+
+        :raises ValueError: Invalid report type, or HID device not openned.
+        """
+        # Avoids sending multiple commands to quickly
+        if "RIVALCFG_DEBUG_NO_COMMAND_DELAY" not in os.environ:
+            self._pacer.wait()
+
+        if self._unread_responses:
+            self._drain_unread_responses()
+
+        self._last_write_time = time.monotonic()
+
         if report_type == usbhid.HID_REPORT_TYPE_OUTPUT:
-            self._hid_device.write(bytes_)
+            self._hid_device.write(report)
         elif report_type == usbhid.HID_REPORT_TYPE_FEATURE:
-            self._hid_device.send_feature_report(bytes_)
+            self._hid_device.send_feature_report(report)
         else:
             raise ValueError("Invalid HID report type: %2x" % report_type)
 
-        # Avoids sending multiple commands to quickly
-        if "RIVALCFG_DEBUG_NO_COMMAND_DELAY" not in os.environ:
-            time.sleep(self._command_approve_delay)
+        self._pacer.mark()
 
-    def __getattr__(self, name):
-        # Handle every set_xxx methods generated from device's profiles
+    def _read_response(self, length, command=None):
+        """Reads the response of the device to the last command.
 
-        if not name.startswith("set_"):
-            raise AttributeError("Mouse instance has no attribute '%s'" % name)
+        :param int length: The length of the response.
+        :param list(int) command: The command the response answers to
+                                  (optional). If provided, the response is
+                                  checked as an acknowledgement of the
+                                  command (see :meth:`_handle_ack`).
+        :rtype: list(int)
+        :return: The response, or an empty list if the device did not respond.
 
-        setting_name = name[4:]
+        When the device does not respond, further reads are skipped for
+        :attr:`no_response_cooldown` seconds.
+        """
+        if self._is_in_no_response_cooldown():
+            # The response may still come: it is discarded before the next
+            # command is sent, not to be taken as the response of another one
+            self._unread_responses = True
+            return []
+        if self._report_reader is not None:
+
+            def is_ack(report):
+                return self._is_ack(command, report)
+
+            response = self._report_reader.wait_for_report(
+                is_ack if command and "ack" in self.mouse_profile else None,
+                timeout_ms=self.response_timeout_ms,
+                since=self._last_write_time,
+            )[:length]
+        else:
+            response = self._hid_device.read(
+                length,
+                timeout_ms=self.response_timeout_ms,
+            )
+        if not response:
+            # The response may arrive after the timeout
+            self._unread_responses = True
+        if not response and self.no_response_cooldown:
+            self.mouse_settings.set_no_response_until(
+                time.time() + self.no_response_cooldown
+            )
+        else:
+            self.mouse_settings.set_no_response_until(None)
+        if command is not None:
+            self._handle_ack(command, response)
+        return response
 
-        if setting_name not in self.mouse_profile["settings"]:
-            raise AttributeError("Mouse instance has no attribute '%s'" % name)
+    def _is_in_no_response_cooldown(self):
+        """Returns ``True`` if the device recently did not respond.
 
-        setting_info = self.mouse_profile["settings"][setting_name]
+        :rtype: bool
+        """
+        if not self.no_response_cooldown:
+            return False
+        no_response_until = self.mouse_settings.get_no_response_until()
+        if no_response_until is None:
+            return False
+        # The cooldown may have been set by another process
+        if not 0 < no_response_until - time.time() <= self.no_response_cooldown:
+            return False
+        return True
+
+    def _drain_unread_responses(self):
+        """Discards the responses of the device that were not read (see
+        :meth:`_read_response`)."""
+        self._unread_responses = False
+        # The report reader already ignores the reports received before the
+        # command
+        if self._report_reader is not None:
+            return
+        for _ in range(_DRAIN_MAX_REPORTS):
+            if not self._hid_device.read(_DRAIN_REPORT_LENGTH, timeout_ms=1):
+                break
+
+    def _is_ack(self, command, response):
+        """Checks if the response read after a command is a valid
+        acknowledgement of this command, as described by the ``"ack"`` key of
+        the mouse profile.
+
+        :param list(int) command: The command that was sent.
+        :param list(int) response: The response read from the device.
+        :rtype: bool
+        """
+        if "ack" not in self.mouse_profile or not response:
+            return False
+        echo_length = self.mouse_profile["ack"]["command_echo_length"]
+        return list(response[:echo_length]) == list(command[:echo_length])
 
-        handler_name = None
+    def _handle_ack(self, command, response):
+        """Allows the next command to be sent immediately if the device
+        acknowledged the given command.
 
-        if "value_type" in setting_info and setting_info["value_type"]:
-            handler_name = setting_info["value_type"]
-            if handler_name not in helpers.module_ls(handlers):
-                raise ValueError(
-                    "Unknown handler '%s' for '%s' setting of the %s"
-                    % (
-                        handler_name,
-                        setting_name,
-                        self.mouse_profile["name"],
-                    )
-                )
+        :param list(int) command: The command that was sent.
+        :param list(int) response: The response read from the device.
+        """
+        if self._is_ack(command, response):
+            self._pacer.release()
+
+    def _set_setting(self, setting_name, *args, force=False):
+        """Sets the value of a setting, or queues it if a batch is in
+        progress (see :meth:`batch`).
+
+        :param str setting_name: The name of the setting.
+        :param args: The value(s) of the setting.
+        :param bool force: Send the setting even if the device already has it
+                           (see :attr:`skip_unchanged`).
+        :return: The response of the device if the setting requires a
+                 readback, else ``None``.
+        """
+        # The report is encoded in a buffer reused for each packet of the
+        # setting
+        report = encoders.get_encoder(self.mouse_profile, setting_name).encode_report(
+            self._report_buffers.get(setting_name), *args
+        )
+        self._report_buffers[setting_name] = report.obj
+        if self._batch is not None:
+            # Only the last value of each setting is sent, in the order of
+            # the first changes
+            self._batch[setting_name] = (bytes(report), args, force)
+            return None
+        return self._send_setting(setting_name, report, args, force=force)
+
+    def _send_setting(self, setting_name, report, args, force=False):
+        """Sends an encoded setting to the device and updates the mouse
+        settings.
+
+        :param str setting_name: The name of the setting.
+        :param bytes report: The encoded HID report (see
+                             :meth:`rivalcfg.encoders.SettingEncoder.encode_report`).
+        :param tuple args: The value(s) of the setting.
+        :param bool force: Send the setting even if the device already has it
+                           (see :attr:`skip_unchanged`).
+        :return: The response of the device if the setting requires a
+                 readback, else ``None``.
+        """
+        encoder = encoders.get_encoder(self.mouse_profile, setting_name)
 
-        packet_length = 0
-        if "packet_length" in setting_info:
-            packet_length = setting_info["packet_length"]
-
-        suffix = []
-        if "command_suffix" in setting_info:
-            suffix = setting_info["command_suffix"]
-
-        def _exec_command(*args):
-            data = []
-            if handler_name:
-                data = getattr(handlers, handler_name).process_value(
-                    setting_info, *args
-                )
-            # Write data to the device
-            self._hid_write(
-                report_type=setting_info["report_type"],
-                data=helpers.merge_bytes(setting_info["command"], data, suffix),
-                packet_length=packet_length,
+        # Only settings that hold a value can be compared: the other ones
+        # trigger an action on the device
+        digest = None
+        if (
+            encoder.handler_name
+            and encoder.handler_name != "none"
+            and not encoder.readback_length
+        ):
+            digest = hashlib.sha1(report).hexdigest()
+            if (
+                self.skip_unchanged
+                and not force
+                and digest == self.mouse_settings.get_packet_digest(setting_name)
+            ):
+                self._update_mouse_settings(setting_name, args)
+                return None
+
+        # Write data to the device
+        self._hid_write_report(encoder.report_type, report)
+        self._unsaved_changes = True
+        # Readback when required
+        response = None
+        if encoder.readback_length:
+            response = self._read_response(
+                encoder.readback_length,
+                command=encoder.setting_info["command"],
             )
-            # Readback when required
-            response = None
-            if "readback_length" in setting_info and setting_info["readback_length"]:
-                response = self._hid_device.read(
-                    setting_info["readback_length"],
-                    timeout_ms=200,
-                )
-            # Save settings
-            if len(args) == 1:
-                self.mouse_settings.set(setting_name, args[0])
-            else:
-                self.mouse_settings.set(setting_name, args)
-            #
-            return response
+        if digest:
+            self.mouse_settings.set_packet_digest(setting_name, digest)
+        # Save settings
+        self._update_mouse_settings(setting_name, args)
+        #
+        return response
 
-        return _exec_command
+    def _update_mouse_settings(self, setting_name, args):
+        """Updates the value of a setting in the mouse settings.
+
+        :param str setting_name: The name of the setting.
+        :param tuple args: The value(s) of the setting.
+        """
+        if len(args) == 1:
+            self.mouse_settings.set(setting_name, args[0])
+        else:
+            self.mouse_settings.set(setting_name, args)
 
     def __repr__(self):
         return "<Mouse %s (%04x:%04x:%02x)>" % (
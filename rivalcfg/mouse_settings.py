@@ -1,6 +1,8 @@
 import os
 import json
 
+from .devices import get_xdg_cache_home
+
 
 def get_xdg_config_home():
     """Returns the path of the folder where to store the configs (generally
@@ -32,6 +34,54 @@ def get_settings_path(vendor_id, product_id):
     )
 
 
+def get_packet_digests_path(vendor_id, product_id, device_id):
+    """Returns the path of the file that stores the digests of the packets
+    saved in the internal memory of a specific mouse.
+
+    :param int vendor_id: The device's vendor id (e.g. ``0x1038``).
+    :param int product_id: The device's product id (e.g. ``0xbaad``).
+    :param str device_id: The identifier of the physical device (see
+                          :func:`rivalcfg.usbhid.get_device_id`), as
+                          several identical mice do not have the same
+                          settings in their memory.
+
+    :rtype: str
+    """
+    return os.path.join(
+        get_xdg_config_home(),
+        "rivalcfg",
+        "%04x_%04x_%s.digests.json"
+        % (
+            vendor_id,
+            product_id,
+            device_id,
+        ),
+    )
+
+
+def get_no_response_path(vendor_id, product_id, device_id):
+    """Returns the path of the file that stores until when a specific mouse
+    is known to not respond (e.g. a wireless mouse that is switched off).
+
+    :param int vendor_id: The device's vendor id (e.g. ``0x1038``).
+    :param int product_id: The device's product id (e.g. ``0xbaad``).
+    :param str device_id: The identifier of the physical device (see
+                          :func:`rivalcfg.usbhid.get_device_id`).
+
+    :rtype: str
+    """
+    return os.path.join(
+        get_xdg_cache_home(),
+        "rivalcfg",
+        "%04x_%04x_%s.no_response"
+        % (
+            vendor_id,
+            product_id,
+            device_id,
+        ),
+    )
+
+
 class MouseSettings(object):
     """Stores the settings of a mouse.
 
@@ -40,6 +90,11 @@ class MouseSettings(object):
     :param dict mouse_profile: The mouse profie (``devices/*``).
     :param str current_profile_name: The name of the active profile (optional,
                                      default: ``"default"``).
+    :param str device_id: The identifier of the physical device (see
+                          :func:`rivalcfg.usbhid.get_device_id`, optional).
+                          Without it, the digests of the packets sent to the
+                          device and until when it does not respond are only
+                          kept in memory.
     """
 
     def __init__(
@@ -48,12 +103,25 @@ class MouseSettings(object):
         product_id,
         mouse_profile,
         current_profile_name="default",
+        device_id=None,
     ):
         self._mouse_profile = mouse_profile
         self._settings_path = get_settings_path(vendor_id, product_id)
+        self._packet_digests_path = None
+        self._no_response_path = None
+        if device_id:
+            self._packet_digests_path = get_packet_digests_path(
+                vendor_id, product_id, device_id
+            )
+            self._no_response_path = get_no_response_path(
+                vendor_id, product_id, device_id
+            )
+        self._no_response_until = False  # Not loaded yet
         # TODO Check that the profile exists first!
         self._current_profile_name = current_profile_name
         self._settings = {}
+        self._packet_digests = {}
+        self._saved_packet_digests = {}
         self._load()
 
     def list_settings_profiles(self):
@@ -156,6 +224,60 @@ class MouseSettings(object):
             return None
         return self._settings[self._current_profile_name][setting_name]
 
+    def get_packet_digest(self, setting_name):
+        """Get the digest of the last packet sent to the device for a
+        setting.
+
+        :param str setting_name: The name of the setting.
+        :rtype: str or None
+        :return: The digest, or ``None`` if the state of the device is not
+                 known for this setting.
+        """
+        return self._packet_digests.get(setting_name)
+
+    def set_packet_digest(self, setting_name, digest):
+        """Set the digest of the last packet sent to the device for a
+        setting.
+
+        The digests are written to the disk when the settings are saved. If
+        the new digest differs from the saved one, the saved one is forgotten
+        immediately: the device may be unplugged before its memory is saved.
+
+        :param str setting_name: The name of the setting.
+        :param str digest: The digest of the packet.
+        """
+        self._packet_digests[setting_name] = digest
+        if (
+            setting_name in self._saved_packet_digests
+            and self._saved_packet_digests[setting_name] != digest
+        ):
+            del self._saved_packet_digests[setting_name]
+            self._save_packet_digests()
+
+    def get_no_response_until(self):
+        """Get until when the device is known to not respond.
+
+        :rtype: float or None
+        :return: The time (:func:`time.time`), or ``None`` if the device
+                 responded the last time.
+        """
+        if self._no_response_until is False:
+            self._no_response_until = self._load_no_response_until()
+        return self._no_response_until
+
+    def set_no_response_until(self, until):
+        """Set until when the device is known to not respond. It is written
+        to the disk immediately, so the other processes do not wait for the
+        device either.
+
+        :param float until: The time (:func:`time.time`), or ``None`` if the
+                            device responded.
+        """
+        if until is None and self.get_no_response_until() is None:
+            return
+        self._no_response_until = until
+        self._save_no_response_until()
+
     def save(self):
         """Save settings in a file.
 
@@ -169,6 +291,60 @@ class MouseSettings(object):
             os.makedirs(settings_dir)
         with open(self._settings_path, "w") as file_:
             json.dump(self._settings, file_, indent=2)
+        if self._packet_digests or self._saved_packet_digests:
+            self._saved_packet_digests = dict(self._packet_digests)
+            self._save_packet_digests()
+
+    def _save_packet_digests(self):
+        """Save the digests of the packets saved in the device memory.
+
+        .. NOTE::
+
+            Digests are located in
+            ``$XDG_CONFIG_HOME/rivalcfg/<vendor_id>_<product_id>_<device_id>.digests.json``.
+        """
+        if not self._packet_digests_path:
+            return
+        settings_dir = os.path.dirname(self._packet_digests_path)
+        if not os.path.isdir(settings_dir):
+            os.makedirs(settings_dir)
+        with open(self._packet_digests_path, "w") as file_:
+            json.dump(self._saved_packet_digests, file_, indent=2)
+
+    def _save_no_response_until(self):
+        """Save until when the device is known to not respond.
+
+        .. NOTE::
+
+            It is located in
+            ``$XDG_CACHE_HOME/rivalcfg/<vendor_id>_<product_id>_<device_id>.no_response``.
+        """
+        if not self._no_response_path:
+            return
+        if self._no_response_until is None:
+            try:
+                os.remove(self._no_response_path)
+            except FileNotFoundError:
+                pass
+            return
+        cache_dir = os.path.dirname(self._no_response_path)
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        with open(self._no_response_path, "w") as file_:
+            file_.write("%.6f" % self._no_response_until)
+
+    def _load_no_response_until(self):
+        """Load until when the device is known to not respond.
+
+        :rtype: float or None
+        """
+        if not self._no_response_path:
+            return None
+        try:
+            with open(self._no_response_path, "r") as file_:
+                return float(file_.read())
+        except (OSError, ValueError):
+            return None
 
     def _load(self):
         """Load settings from a file.
@@ -185,6 +361,18 @@ class MouseSettings(object):
             self._settings = {
                 "default": self.get_default_values(),
             }
+        if self._packet_digests_path and os.path.isfile(self._packet_digests_path):
+            try:
+                with open(self._packet_digests_path, "r") as file_:
+                    digests = json.load(file_)
+            except ValueError:
+                # A truncated or corrupted file: the settings will just be
+                # sent again to the device
+                digests = {}
+            if not isinstance(digests, dict):
+                digests = {}
+            self._saved_packet_digests = digests
+            self._packet_digests = dict(self._saved_packet_digests)
 
 
 class FakeMouseSettings(MouseSettings):
@@ -200,6 +388,15 @@ class FakeMouseSettings(MouseSettings):
     def save(self):
         pass
 
+    def _save_packet_digests(self):
+        pass
+
+    def _save_no_response_until(self):
+        pass
+
+    def _load_no_response_until(self):
+        return None
+
     def _load(self):
         self._settings = {
             "default": self.get_default_values(),
@@ -211,6 +408,7 @@ def get_mouse_settings(
     product_id,
     mouse_profile,
     current_profile_name="default",
+    device_id=None,
 ):
     """Returns a :class:`MouseSetting` instance.
 
@@ -224,6 +422,8 @@ def get_mouse_settings(
     :param dict mouse_profile: The mouse profie (``devices/*``).
     :param str current_profile_name: The name of the active profile (optional,
                                      default: ``"default"``).
+    :param str device_id: The identifier of the physical device (see
+                          :func:`rivalcfg.usbhid.get_device_id`, optional).
 
     :rtype MouseSettings, FakeMouseSettings
     """
@@ -233,10 +433,12 @@ def get_mouse_settings(
             product_id,
             mouse_profile,
             current_profile_name,
+            device_id,
         )
     return MouseSettings(
         vendor_id,
         product_id,
         mouse_profile,
         current_profile_name,
+        device_id,
     )
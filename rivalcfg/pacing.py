@@ -0,0 +1,67 @@
+"""
+This module handles the pacing of the commands sent to the devices.
+
+Devices need some time to process a command before receiving the next one.
+Instead of sleeping after each command, the :class:`CommandPacer` records when
+the last command was sent and only waits, right before sending the next one,
+for the remaining part of the delay. The time spent between two commands
+(encoding values, reading responses,...) is then counted in the delay, and no
+time is wasted after the last command.
+"""
+
+import time
+
+
+class CommandPacer:
+    """Ensures a minimal delay between two commands sent to a device.
+
+    :param float delay: The minimal delay between two commands (in seconds).
+
+    >>> from rivalcfg.pacing import CommandPacer
+    >>> pacer = CommandPacer(0.05)
+    >>> pacer.remaining()
+    0
+    >>> pacer.mark()
+    >>> 0 < pacer.remaining() <= 0.05
+    True
+    """
+
+    def __init__(self, delay):
+        """Constructor."""
+        #: The minimal delay between two commands (in seconds).
+        self.delay = delay
+        self._last_command_time = None
+
+    @property
+    def last_command_time(self):
+        """The time (:func:`time.monotonic`) of the last command, or ``None``
+        if no command was sent yet.
+        """
+        return self._last_command_time
+
+    def remaining(self):
+        """Returns how long to wait before the next command can be sent.
+
+        :rtype: float
+        """
+        if self._last_command_time is None:
+            return 0
+        return max(0, self._last_command_time + self.delay - time.monotonic())
+
+    def wait(self):
+        """Waits until the next command can be sent."""
+        remaining = self.remaining()
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def mark(self, timestamp=None):
+        """Records that a command was just sent.
+
+        :param float timestamp: The time (:func:`time.monotonic`) when the
+                                command was sent (optional, default: now).
+        """
+        self._last_command_time = time.monotonic() if timestamp is None else timestamp
+
+    def release(self):
+        """Allows the next command to be sent immediately."""
+        self._last_command_time = None
@@ -12,7 +12,7 @@ import os.path
 import subprocess
 
 from .version import VERSION
-from .devices import PROFILES
+from . import devices
 
 #: Path to the udev rules file
 RULES_FILE_PATH = "/etc/udev/rules.d/99-steelseries-rival.rules"
@@ -30,15 +30,15 @@ def generate_rules():
     rules += "# \n"
     rules += "#     rivalcfg --update-udev\n\n"
 
-    for profile in PROFILES.values():
-        rules += "# %s\n" % profile["name"]
+    for device in devices.list_supported_devices():
+        rules += "# %s\n" % device["name"]
         rules += (
             'SUBSYSTEM=="hidraw", ATTRS{idVendor}=="%04x", ATTRS{idProduct}=="%04x", MODE="0666"\n'
-            % (profile["vendor_id"], profile["product_id"])
+            % (device["vendor_id"], device["product_id"])
         )
         rules += (
             'SUBSYSTEM=="usb", ATTRS{idVendor}=="%04x", ATTRS{idProduct}=="%04x", MODE="0666"\n\n'
-            % (profile["vendor_id"], profile["product_id"])
+            % (device["vendor_id"], device["product_id"])
         )
 
     return rules
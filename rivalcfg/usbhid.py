@@ -15,13 +15,50 @@ This module can also simulate devices:
   plugged::
 
     RIVALCFG_PROFILE=1038:1702 rivalcfg -h
+
+On Linux, the HID devices are discovered by reading the ``uevent`` files of
+the ``hidraw`` class in sysfs instead of enumerating all the USB devices
+through hidapi. The ``RIVALCFG_HID_DISCOVERY`` environment variable can be
+used to force a discovery backend::
+
+    RIVALCFG_HID_DISCOVERY=hidapi rivalcfg --print-debug
+
+Devices are accessed through a *transport*: an object that provides the same
+methods as ``hid.device`` (``open_path()``, ``write()``,
+``send_feature_report()``, ``read()`` and ``close()``). The following
+transports are available (see :data:`TRANSPORTS`):
+
+* ``hidapi``: the `hidapi <https://pypi.org/project/hidapi/>`_ module,
+* ``hidraw``: a pure Python implementation that talks directly to the Linux
+  ``/dev/hidrawN`` devices (:class:`HidrawDevice`),
+* ``fake``: a simulated device (:class:`FakeDevice`).
+
+The ``hidraw`` transport is used for devices discovered through sysfs, the
+``hidapi`` one otherwise. The ``RIVALCFG_HID_TRANSPORT`` environment variable
+can be used to force a transport::
+
+    RIVALCFG_HID_TRANSPORT=hidapi rivalcfg -c ff0000
+
+The hidapi module is only imported when it is needed (bus scan through hidapi,
+device opened with the ``hidapi`` transport), so the device profiles can be
+used without it, and the pure Python ``hidraw`` transport works on Linux even
+if hidapi is not installed.
 """
 
 import os
+import re
+import time
+import errno
+import select
 import struct
+import threading
+import collections
 from io import BytesIO
 
-import hid
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
 
 #: HID output report
 HID_REPORT_TYPE_OUTPUT = 0x02
@@ -29,10 +66,292 @@ HID_REPORT_TYPE_OUTPUT = 0x02
 #: HID feature report
 HID_REPORT_TYPE_FEATURE = 0x03
 
+#: Path of the ``hidraw`` device class in sysfs (Linux only)
+SYSFS_HIDRAW_PATH = "/sys/class/hidraw"
+
+#: Bus type of USB devices (as reported by hidapi and in the ``HID_ID``
+#: field of the sysfs ``uevent`` files)
+_BUS_USB = 0x03
+
+
+def _read_sysfs_attribute(path, default=None):
+    try:
+        with open(path, "r") as file_:
+            return file_.read().strip()
+    except (IOError, OSError, UnicodeDecodeError):
+        return default
+
+
+def _parse_uevent(path):
+    """Parses a sysfs ``uevent`` file.
+
+    :param str path: The path of the ``uevent`` file.
+    :rtype: dict
+    """
+    result = {}
+    content = _read_sysfs_attribute(path, default="")
+    for line in content.split("\n"):
+        if "=" not in line:
+            continue
+        key, value = line.split("=", 1)
+        result[key] = value
+    return result
+
+
+def _parse_hid_phys_interface_number(hid_phys):
+    """Extracts the USB interface number from the ``HID_PHYS`` field of an
+    uevent file.
+
+    :param str hid_phys: The value of the ``HID_PHYS`` field.
+    :rtype: int
+
+    >>> _parse_hid_phys_interface_number("usb-0000:00:14.0-2/input1")
+    1
+    >>> _parse_hid_phys_interface_number("")
+    -1
+    """
+    _, _, input_ = hid_phys.rpartition("/input")
+    if not input_.isdigit():
+        return -1
+    return int(input_)
+
+
+def is_sysfs_available():
+    """Returns ``True`` if the HID devices can be discovered through sysfs.
+
+    :rtype: bool
+    """
+    if os.environ.get("RIVALCFG_HID_DISCOVERY", "sysfs") != "sysfs":
+        return False
+    return os.path.isdir(SYSFS_HIDRAW_PATH)
+
+
+def _read_sysfs_interface(hidraw_name, vendor_id=0, product_id=0):
+    """Reads the information of a HID interface from sysfs. Returns the same
+    data as one item of ``hid.enumerate()``.
+
+    :param str hidraw_name: The name of the ``hidraw`` device (e.g.
+                            ``"hidraw3"``).
+    :param int vendor_id: The expected vendor id (``0`` for any vendor).
+    :param int product_id: The expected product id (``0`` for any product).
+    :rtype: dict
+    :return: The interface, or ``None`` if it is not a USB device or if it
+             does not match the expected ids.
+    """
+    device_path = os.path.join(SYSFS_HIDRAW_PATH, hidraw_name, "device")
+    uevent = _parse_uevent(os.path.join(device_path, "uevent"))
+
+    try:
+        bus_type, dev_vendor_id, dev_product_id = [
+            int(i, 16) for i in uevent["HID_ID"].split(":")
+        ]
+    except (KeyError, ValueError):
+        return None
+
+    if bus_type != _BUS_USB:
+        return None
+    if vendor_id and dev_vendor_id != vendor_id:
+        return None
+    if product_id and dev_product_id != product_id:
+        return None
+
+    # sysfs tree: <usb_device>/<usb_interface>/<hid_device>
+    usb_device_path = os.path.dirname(os.path.dirname(os.path.realpath(device_path)))
+    release_number = _read_sysfs_attribute(
+        os.path.join(usb_device_path, "bcdDevice"), default="0"
+    )
+
+    return {
+        "path": ("/dev/%s" % hidraw_name).encode(),
+        "vendor_id": dev_vendor_id,
+        "product_id": dev_product_id,
+        "serial_number": uevent.get("HID_UNIQ", ""),
+        "release_number": int(release_number, 16),
+        "manufacturer_string": _read_sysfs_attribute(
+            os.path.join(usb_device_path, "manufacturer"), default=""
+        ),
+        "product_string": _read_sysfs_attribute(
+            os.path.join(usb_device_path, "product"),
+            default=uevent.get("HID_NAME", ""),
+        ),
+        "usage_page": 0,
+        "usage": 0,
+        "interface_number": _parse_hid_phys_interface_number(
+            uevent.get("HID_PHYS", "")
+        ),
+        "bus_type": bus_type,
+    }
+
+
+def _enumerate_sysfs(vendor_id=0, product_id=0):
+    """Lists the HID interfaces by reading sysfs. Returns the same data as
+    ``hid.enumerate()``.
+
+    :param int vendor_id: The vendor id of the devices to list (``0`` to list
+                          any vendor).
+    :param int product_id: The product id of the devices to list (``0`` to
+                           list any product).
+    :rtype: [dict]
+    """
+    result = []
+    try:
+        hidraw_names = sorted(os.listdir(SYSFS_HIDRAW_PATH))
+    except OSError:
+        return result
+
+    for hidraw_name in hidraw_names:
+        interface = _read_sysfs_interface(hidraw_name, vendor_id, product_id)
+        if interface is not None:
+            result.append(interface)
+
+    return result
+
+
+def get_sysfs_interface(path):
+    """Reads the information of a single HID interface from sysfs, without
+    scanning the other ones. Returns the same data as one item of
+    :func:`enumerate_interfaces`.
+
+    :param bytes path: The path of the interface (e.g. ``b"/dev/hidraw3"``).
+    :rtype: dict
+    :return: The interface, or ``None`` if sysfs is not available (see
+             :func:`is_sysfs_available`) or if the path is not the one of a
+             plugged USB HID interface.
+
+    >>> from rivalcfg import usbhid
+    >>> usbhid.get_sysfs_interface(b"/dev/hidraw999") is None
+    True
+    """
+    if not path or not path.startswith(b"/dev/hidraw") or not is_sysfs_available():
+        return None
+    hidraw_name = os.path.basename(path).decode("utf-8", errors="replace")
+    if not os.path.isdir(os.path.join(SYSFS_HIDRAW_PATH, hidraw_name)):
+        return None
+    return _read_sysfs_interface(hidraw_name)
+
+
+def enumerate_interfaces(vendor_id=0, product_id=0):
+    """Lists the HID interfaces plugged to the computer. Returns the same data
+    as ``hid.enumerate()``, using sysfs when available (see
+    :func:`is_sysfs_available`) and hidapi otherwise.
+
+    :param int vendor_id: The vendor id of the devices to list (``0`` to list
+                          any vendor).
+    :param int product_id: The product id of the devices to list (``0`` to
+                           list any product).
+    :rtype: [dict]
+    """
+    if is_sysfs_available():
+        return _enumerate_sysfs(vendor_id, product_id)
+
+    import hid
+
+    return hid.enumerate(vendor_id, product_id)
+
+
+def enumerate_devices(vendor_id=0x1038):
+    """Enumerates all the HID interfaces of the given vendor in a single bus
+    scan and indexes them by vendor id, product id and interface number.
+
+    :param int vendor_id: The vendor id of the devices to list (optional, by
+                          default this is set to the SteelSeries vendor id
+                          (``0x1038``)).
+
+    :rtype: dict
+
+    ::
+
+       {
+           (vendor_id, product_id, interface_number): path,
+       }
+
+    >>> from rivalcfg import usbhid
+    >>> usbhid.enumerate_devices(0xbaad)
+    {}
+    """
+    index = {}
+    for interface in enumerate_interfaces(vendor_id):
+        key = (
+            interface["vendor_id"],
+            interface["product_id"],
+            interface["interface_number"],
+        )
+        # Keep the first path if an interface is reported more than once
+        # (one entry per usage page on some platforms)
+        if key not in index:
+            index[key] = interface["path"]
+    return index
+
+
+#: Matches the path of an interface as reported by the libusb backend of
+#: hidapi (``<bus>-<port>[.<port>...]:<config>.<interface>``).
+_USB_INTERFACE_PATH_REGEXP = re.compile(r"^(\d+-\d+(?:\.\d+)*):\d+\.\d+$")
+
+
+def get_usb_port_path(path):
+    """Returns the physical location of a device on the USB buses: the bus
+    number followed by the port numbers from the root hub (e.g. ``"1-2.3"``
+    for the port 3 of a hub plugged on the port 2 of the bus 1).
+
+    The location is read from sysfs for ``/dev/hidrawN`` paths, and from the
+    path itself for the paths of the libusb backend of hidapi.
+
+    :param bytes path: The path of the device endpoint, as returned by
+                       :func:`enumerate_interfaces`.
+    :rtype: str
+    :return: The port path, or ``None`` if it cannot be determined.
+
+    >>> from rivalcfg import usbhid
+    >>> usbhid.get_usb_port_path(b"1-2.3:1.0")
+    '1-2.3'
+    >>> usbhid.get_usb_port_path(b"IOService:/AppleACPIPlatformExpert/XHC1")
+    """
+    if isinstance(path, bytes):
+        path = path.decode("utf-8", errors="replace")
+    if path.startswith("/dev/hidraw"):
+        # sysfs tree: <usb_device>/<usb_interface>/<hid_device>
+        device_path = os.path.join(SYSFS_HIDRAW_PATH, os.path.basename(path), "device")
+        path = os.path.basename(os.path.dirname(os.path.realpath(device_path)))
+    match = _USB_INTERFACE_PATH_REGEXP.match(path)
+    if not match:
+        return None
+    return match.group(1)
+
+
+def get_device_id(path):
+    """Returns an identifier of a physical device, that can be used in file
+    names. It is the same for all the paths of the device (``/dev/hidrawN``
+    or libusb path) when its location on the USB buses is known (see
+    :func:`get_usb_port_path`), else it is derived from the path itself.
+
+    :param bytes path: The path of the device endpoint, as returned by
+                       :func:`enumerate_interfaces`.
+    :rtype: str
+
+    >>> from rivalcfg import usbhid
+    >>> usbhid.get_device_id(b"1-2.3:1.0")
+    'usb-1-2.3'
+    >>> usbhid.get_device_id(b"DevSrvsID:4294969636")
+    'DevSrvsID_4294969636'
+    """
+    port_path = get_usb_port_path(path)
+    if port_path:
+        return "usb-%s" % port_path
+    return re.sub(
+        r"[^A-Za-z0-9_.-]+",
+        "_",
+        path.decode("utf-8", "replace"),
+    ).strip("_")
+
 
 def is_device_plugged(vendor_id, product_id):
     """Returns ``True`` if the given HID device is plugged to the computer.
 
+    .. NOTE::
+
+       This function scans the bus on each call. Use
+       :func:`enumerate_devices` to check several devices at once.
+
     :param int vendor_id: The vendor id of the device (e.g. ``0x1038``)).
     :param int product_id: The product id of the device (e.g. ``0x1710``).
 
@@ -47,16 +366,41 @@ def is_device_plugged(vendor_id, product_id):
         debug_product_id = int(os.environ["RIVALCFG_PROFILE"].split(":")[1], 16)
         if debug_vendor_id == vendor_id and debug_product_id == product_id:
             return True
-    return len(hid.enumerate(vendor_id, product_id)) > 0
+    return len(enumerate_interfaces(vendor_id, product_id)) > 0
+
+
+def get_default_transport(path=None):
+    """Returns the name of the transport to use to open the given path.
+
+    :param bytes path: The device path (optional).
+    :rtype: str
+
+    >>> from rivalcfg import usbhid
+    >>> usbhid.get_default_transport(b"/dev/hidraw3")  # doctest: +SKIP
+    'hidraw'
+    """
+    if "RIVALCFG_DRY" in os.environ:
+        return "fake"
+    if "RIVALCFG_HID_TRANSPORT" in os.environ:
+        return os.environ["RIVALCFG_HID_TRANSPORT"]
+    if path and path.startswith(b"/dev/hidraw") and fcntl:
+        return "hidraw"
+    return "hidapi"
 
 
-def open_device(vendor_id, product_id, endpoint):
+def open_device(vendor_id, product_id, endpoint, path=None, transport=None):
     """Opens and returns the HID device
 
     :param int vendor_id: The vendor id of the device (e.g. ``0x1038``)).
     :param int product_id: The product id of the device (e.g. ``0x1710``).
     :param int endpoint: The number of the endpoint to open on the device (e.g.
                          ``0``).
+    :param bytes path: The path of the endpoint, as returned by
+                       :func:`enumerate_devices` (optional). When provided,
+                       the bus is not scanned again.
+    :param str transport: The name of the transport to use to access the
+                          device (see :data:`TRANSPORTS`). If not provided,
+                          it is chosen by :func:`get_default_transport`.
 
     :raise DeviceNotFound: The requested device is not plugged to the computer
                            or it does not provide the requested endpoint.
@@ -69,32 +413,351 @@ def open_device(vendor_id, product_id, endpoint):
     >>> usbhid.open_device(0x1038, 0x1702, 0)
     <hid.device at 0x...>
     """
-    # Instanciate the device (real or fake depending of environment)
-    if "RIVALCFG_DRY" in os.environ:
-        # Setting a path allows the fake device to be opened even if requested
-        # device is not plugged to the computer
-        path = b"00:0000:0000"
-        device = FakeDevice()
-    else:
-        path = None
-        device = hid.device()
-
-    # Search the device
-    for interface in hid.enumerate(vendor_id, product_id):
-        if interface["interface_number"] == endpoint:
-            path = interface["path"]
-            break
+    if transport is None:
+        transport = get_default_transport(path)
+    if transport not in TRANSPORTS:
+        raise ValueError("Unknown HID transport '%s'" % transport)
+
+    if not path:
+        path = _find_device_path(vendor_id, product_id, endpoint, transport)
 
     # Open the found device. This can raise an IOError.
-    if path:
-        device.open_path(path)
-        return device
-
-    # No matching device found
-    raise DeviceNotFound(
-        "Requested device or endpoint not found: %04x:%04x:%02x"
-        % (vendor_id, product_id, endpoint)
-    )
+    device = TRANSPORTS[transport](path)
+    device.open_path(path)
+    return device
+
+
+def _find_device_path(vendor_id, product_id, endpoint, transport):
+    """Scans the bus to find the path of a device endpoint.
+
+    :raise DeviceNotFound: The requested device is not plugged to the computer
+                           or it does not provide the requested endpoint.
+    :rtype: bytes
+    """
+    # Setting a path allows the fake device to be opened even if requested
+    # device is not plugged to the computer
+    if transport == "fake":
+        return b"00:0000:0000"
+
+    path = enumerate_devices(vendor_id).get((vendor_id, product_id, endpoint))
+    if not path:
+        raise DeviceNotFound(
+            "Requested device or endpoint not found: %04x:%04x:%02x"
+            % (vendor_id, product_id, endpoint)
+        )
+    return path
+
+
+class DevicePool:
+    """Keeps opened HID devices to reuse them instead of opening them again.
+    This is useful for long-running processes that change the settings of a
+    device regularly.
+
+    Devices are indexed by ``(vendor_id, product_id, endpoint, path)``. When
+    no path is given, any device of the pool with the same vendor id, product
+    id and endpoint is reused, else the path is found before the device is
+    opened: a device opened with and without its path is only opened once.
+
+    The health of the devices is checked when they are reused (the device
+    node must still exist and belong to the same device), and they are
+    dropped from the pool when an I/O error occurs (e.g. when the device was
+    unplugged). A device borrowed without a path is then opened again, at
+    its new path, and the failed call is retried once.
+
+    >>> from rivalcfg import usbhid
+    >>> pool = usbhid.DevicePool()
+    >>> device = pool.open_device(0x1038, 0x1702, 0)
+    >>> pool.open_device(0x1038, 0x1702, 0) is device
+    True
+    >>> pool.close()
+    """
+
+    def __init__(self):
+        """Constructor."""
+        self._devices = {}
+        self._lock = threading.Lock()
+
+    def open_device(self, vendor_id, product_id, endpoint, path=None, transport=None):
+        """Borrows a device from the pool, opening it if necessary. Takes
+        the same parameters as :func:`open_device`.
+
+        :rtype: PooledDevice
+        """
+        with self._lock:
+            if path:
+                device = self._devices.get((vendor_id, product_id, endpoint, path))
+            else:
+                device = self._find_device(vendor_id, product_id, endpoint)
+            if device is not None and not self._is_healthy(device):
+                del self._devices[device.key]
+                device.close_device()
+                device = None
+            if device is None:
+                if transport is None:
+                    transport = get_default_transport(path)
+                reopenable = not path
+                if not path:
+                    path = _find_device_path(vendor_id, product_id, endpoint, transport)
+                key = (vendor_id, product_id, endpoint, path)
+                if key in self._devices:
+                    return self._devices[key]
+                device = PooledDevice(
+                    self,
+                    key,
+                    open_device(vendor_id, product_id, endpoint, path, transport),
+                    transport=transport,
+                    reopenable=reopenable,
+                )
+                self._devices[key] = device
+            return device
+
+    def reopen(self, device):
+        """Opens again a device of the pool, at its current path (that can
+        have changed if the device was unplugged).
+
+        :param PooledDevice device: The device to open again.
+        :rtype: bool
+        :return: ``False`` if the device cannot be opened (e.g. it is not
+                 plugged anymore).
+        """
+        vendor_id, product_id, endpoint, _ = device.key
+        with self._lock:
+            if self._devices.get(device.key) is device:
+                del self._devices[device.key]
+            device.close_device()
+            try:
+                path = _find_device_path(
+                    vendor_id, product_id, endpoint, device.transport
+                )
+                device._device = open_device(
+                    vendor_id, product_id, endpoint, path, device.transport
+                )
+            except (IOError, OSError, DeviceNotFound):
+                return False
+            device.key = (vendor_id, product_id, endpoint, path)
+            device.failed = False
+            self._devices.setdefault(device.key, device)
+            return True
+
+    def discard(self, device):
+        """Removes a device from the pool and closes it.
+
+        :param PooledDevice device: The device to remove.
+        """
+        with self._lock:
+            if self._devices.get(device.key) is device:
+                del self._devices[device.key]
+        device.close_device()
+
+    def close(self):
+        """Closes all the devices of the pool."""
+        with self._lock:
+            devices = list(self._devices.values())
+            self._devices.clear()
+        for device in devices:
+            device.close_device()
+
+    def __len__(self):
+        return len(self._devices)
+
+    def _find_device(self, vendor_id, product_id, endpoint):
+        """Returns the device of the pool that matches the given ids, if there
+        is only one."""
+        devices = [
+            device
+            for key, device in self._devices.items()
+            if key[:3] == (vendor_id, product_id, endpoint)
+        ]
+        return devices[0] if len(devices) == 1 else None
+
+    @staticmethod
+    def _is_healthy(device):
+        if device.failed:
+            return False
+        vendor_id, product_id, _, path = device.key
+        # Device nodes (e.g. /dev/hidrawN) disappear when unplugged, and can
+        # then be given to another device
+        interface = get_sysfs_interface(path)
+        if interface is not None:
+            return (interface["vendor_id"], interface["product_id"]) == (
+                vendor_id,
+                product_id,
+            )
+        if path and path.startswith(b"/") and not os.path.exists(path):
+            return False
+        return True
+
+
+class PooledDevice:
+    """Wraps a device borrowed from a :class:`DevicePool`. It provides the
+    same API as the wrapped device, except that :meth:`close` gives the device
+    back to the pool instead of closing it.
+
+    :param DevicePool pool: The pool that owns the device.
+    :param tuple key: The key of the device in the pool.
+    :param device: The wrapped device.
+    :param str transport: The transport used to open the device.
+    :param bool reopenable: Open the device again, at its current path, when
+                            an I/O error occurs (see
+                            :meth:`DevicePool.reopen`).
+    """
+
+    def __init__(self, pool, key, device, transport=None, reopenable=False):
+        """Constructor."""
+        #: The key of the device in the pool.
+        self.key = key
+        #: ``True`` if an I/O error occurred on the device.
+        self.failed = False
+        #: The transport used to open the device.
+        self.transport = transport
+        self._pool = pool
+        self._device = device
+        self._reopenable = reopenable
+
+    def write(self, data):
+        return self._call("write", data)
+
+    def send_feature_report(self, data):
+        return self._call("send_feature_report", data)
+
+    def read(self, max_length, timeout_ms=0):
+        return self._call("read", max_length, timeout_ms=timeout_ms)
+
+    def close(self):
+        """Gives the device back to the pool."""
+        pass
+
+    def close_device(self):
+        """Really closes the wrapped device."""
+        try:
+            self._device.close()
+        except Exception:
+            pass
+
+    def _call(self, method_name, *args, _retry=True, **kwargs):
+        try:
+            return getattr(self._device, method_name)(*args, **kwargs)
+        except (IOError, OSError, ValueError):
+            self.failed = True
+            if not (_retry and self._reopenable and self._pool.reopen(self)):
+                self._pool.discard(self)
+                raise
+        return self._call(method_name, *args, _retry=False, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._device, name)
+
+    def __repr__(self):
+        return "<PooledDevice %r>" % self._device
+
+
+class ReportReader:
+    """Reads the input reports of a device in a background thread and keeps
+    them, with their reception time, in a bounded ring buffer.
+
+    Callers can then wait for the next report that matches a predicate
+    (see :meth:`wait_for_report`), without blocking on reports that were
+    received too late or that answer another command.
+
+    :param device: The device to read (see :data:`TRANSPORTS`).
+    :param int report_length: The maximum length of the reports.
+    :param int capacity: The maximum number of reports kept in the buffer
+                         (older reports are dropped first).
+    :param int poll_timeout_ms: How long each read waits for a report before
+                                checking if the reader was stopped.
+    """
+
+    def __init__(self, device, report_length=64, capacity=32, poll_timeout_ms=50):
+        """Constructor."""
+        #: The error that stopped the reader (if any).
+        self.error = None
+        self._device = device
+        self._report_length = report_length
+        self._poll_timeout_ms = poll_timeout_ms
+        self._reports = collections.deque(maxlen=capacity)
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    @property
+    def is_running(self):
+        """``True`` if the reader thread is running."""
+        return self._running
+
+    def start(self):
+        """Starts the reader thread."""
+        if self._running:
+            return
+        self._running = True
+        self.error = None
+        self._thread = threading.Thread(
+            target=self._run,
+            name="rivalcfg-report-reader",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stops the reader thread and waits for it to finish."""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def clear(self):
+        """Drops all the buffered reports."""
+        with self._condition:
+            self._reports.clear()
+
+    def wait_for_report(self, predicate=None, timeout_ms=200, since=None):
+        """Waits for the next report that matches the given predicate, and
+        removes it from the buffer. Reports received before ``since`` are
+        dropped.
+
+        :param predicate: A function that takes a report (``[int]``) and
+                          returns ``True`` if it matches (optional, by
+                          default any report matches).
+        :param int timeout_ms: How long to wait for a matching report.
+        :param float since: Ignore the reports received before this time
+                            (:func:`time.monotonic`, optional).
+        :rtype: [int]
+        :return: The report, or an empty list if no matching report was
+                 received before the timeout.
+        """
+        deadline = time.monotonic() + timeout_ms / 1000
+        with self._condition:
+            while True:
+                while since is not None and self._reports:
+                    if self._reports[0][0] >= since:
+                        break
+                    self._reports.popleft()
+                for item in self._reports:
+                    if predicate is None or predicate(item[1]):
+                        self._reports.remove(item)
+                        return item[1]
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._running:
+                    return []
+                self._condition.wait(remaining)
+
+    def _run(self):
+        while self._running:
+            try:
+                report = self._device.read(
+                    self._report_length,
+                    timeout_ms=self._poll_timeout_ms,
+                )
+            except Exception as error:
+                self.error = error
+                self._running = False
+                with self._condition:
+                    self._condition.notify_all()
+                return
+            if not report:
+                continue
+            with self._condition:
+                self._reports.append((time.monotonic(), list(report)))
+                self._condition.notify_all()
 
 
 class DeviceNotFound(Exception):
@@ -193,3 +856,163 @@ class FakeDevice:
 
     def __repr__(self):
         return "<hid.device at 0xbadc0fee%x>" % id(self)
+
+
+def _ioc_readwrite(type_, number, size):
+    """Computes the request code of a Linux ``_IOWR()`` ioctl.
+
+    >>> hex(_ioc_readwrite(ord("H"), 0x06, 65))
+    '0xc0414806'
+    """
+    return (0x03 << 30) | (size << 16) | (type_ << 8) | number
+
+
+def HIDIOCSFEATURE(size):
+    """Request code of the hidraw "set feature report" ioctl."""
+    return _ioc_readwrite(ord("H"), 0x06, size)
+
+
+def HIDIOCGFEATURE(size):
+    """Request code of the hidraw "get feature report" ioctl."""
+    return _ioc_readwrite(ord("H"), 0x07, size)
+
+
+class HidrawDevice:
+    """A pure Python HID transport that talks directly to the Linux
+    ``/dev/hidrawN`` devices. It provides the same API as the ``hid.device``
+    class of the `hidapi <https://pypi.org/project/hidapi/>`_ module.
+
+    Output reports are sent with :func:`os.write` and feature reports with
+    the ``HIDIOCSFEATURE`` ioctl.
+    """
+
+    def __init__(self):
+        """Constructor."""
+        self._fd = None
+        self._blocking = True
+
+    def open_path(self, path):
+        """Opens the device.
+
+        :param bytes path: The device path (e.g. ``b"/dev/hidraw3"``).
+
+        :raise IOError: The device cannot be opened.
+        """
+        self._fd = os.open(path, os.O_RDWR | getattr(os, "O_CLOEXEC", 0))
+
+    def write(self, data):
+        """Sends an output report to the device.
+
+        :param bytes data: The data to send, prefixed by the report id.
+        :rtype: int
+        :return: The number of bytes written.
+        """
+        return os.write(self._get_fd(), data)
+
+    def send_feature_report(self, data):
+        """Sends a feature report to the device.
+
+        :param bytes data: The data to send, prefixed by the report id.
+        :rtype: int
+        :return: The number of bytes written.
+        """
+        buffer_ = bytearray(data)
+        return fcntl.ioctl(self._get_fd(), HIDIOCSFEATURE(len(buffer_)), buffer_)
+
+    def get_feature_report(self, report_id, max_length):
+        """Reads a feature report from the device.
+
+        :param int report_id: The id of the report.
+        :param int max_length: The maximum length of the report.
+        :rtype: [int]
+        """
+        buffer_ = bytearray(max_length + 1)
+        buffer_[0] = report_id
+        size = fcntl.ioctl(self._get_fd(), HIDIOCGFEATURE(len(buffer_)), buffer_)
+        return list(buffer_[:size])
+
+    def read(self, max_length, timeout_ms=0):
+        """Reads an input report from the device.
+
+        :param int max_length: The maximum length of the report.
+        :param int timeout_ms: How long to wait for a report, in milliseconds
+                               (``0`` to wait forever, or not at all in
+                               non-blocking mode).
+        :rtype: [int]
+        :return: The report, or an empty list if no report was received
+                 before the timeout.
+        """
+        fd = self._get_fd()
+        if timeout_ms > 0:
+            poll_timeout = timeout_ms
+        elif self._blocking:
+            poll_timeout = None
+        else:
+            poll_timeout = 0
+        poller = select.poll()
+        poller.register(fd, select.POLLIN)
+        if not poller.poll(poll_timeout):
+            return []
+        try:
+            return list(os.read(fd, max_length))
+        except BlockingIOError:
+            return []
+        except OSError as error:
+            if error.errno == errno.EAGAIN:
+                return []
+            raise
+
+    def set_nonblocking(self, value):
+        """Sets the non-blocking mode of :meth:`read`.
+
+        :param bool value: ``True`` to enable the non-blocking mode.
+        """
+        self._blocking = not value
+
+    def close(self):
+        """Closes the device."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _get_fd(self):
+        if self._fd is None:
+            raise ValueError("not open")
+        return self._fd
+
+    def __repr__(self):
+        return "<rivalcfg.usbhid.HidrawDevice at 0x%x>" % id(self)
+
+
+def _new_hidapi_device(path):
+    # Paths discovered through sysfs (/dev/hidrawN) must be opened with the
+    # hidraw backend of hidapi, other paths with the default one.
+    if path.startswith(b"/dev/hidraw"):
+        try:
+            import hidraw
+        except ImportError:
+            # Some builds of hidapi do not provide the hidraw module, but
+            # their default backend may be the hidraw one
+            pass
+        else:
+            return hidraw.device()
+
+    import hid
+
+    return hid.device()
+
+
+def _new_hidraw_device(path):
+    return HidrawDevice()
+
+
+def _new_fake_device(path):
+    return FakeDevice()
+
+
+#: Available transports (``name -> factory(path)``)
+TRANSPORTS = {
+    "hidapi": _new_hidapi_device,
+    "hidraw": _new_hidraw_device,
+    "fake": _new_fake_device,
+}
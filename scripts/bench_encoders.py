@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+
+"""
+Measures the cost of encoding the value of a setting, per handler, with the
+uncompiled path (handler lookup, ``process_value`` and ``merge_bytes`` on
+each call), with the precompiled encoders of :mod:`rivalcfg.encoders`, and
+and, for the full HID reports, built from the encoded lists or written in
+place into a reused buffer.
+
+The default value of every setting of every supported device is encoded.
+
+Each value is encoded ROUNDS times, so the encoders mostly hit the encoding
+cache (:data:`rivalcfg.encoders.ENCODING_CACHE`). Use ``--no-cache`` to
+measure the encoding itself.
+
+USAGE:
+
+    python scripts/bench_encoders.py [--no-cache] [ROUNDS]
+"""
+
+import sys
+import time
+
+from rivalcfg import devices
+from rivalcfg import encoders
+from rivalcfg import handlers
+from rivalcfg import helpers
+
+
+def encode_uncompiled(profile, setting_name, value):
+    setting_info = profile["settings"][setting_name]
+    handler_name = setting_info["value_type"]
+    data = handlers.get_handler(handler_name).process_value(setting_info, value)
+    suffix = []
+    if "command_suffix" in setting_info:
+        suffix = setting_info["command_suffix"]
+    return helpers.merge_bytes(setting_info["command"], data, suffix)
+
+
+def encode_compiled(profile, setting_name, value):
+    return encoders.get_encoder(profile, setting_name).encode(value)
+
+
+def encode_report_from_list(profile, setting_name, value):
+    encoder = encoders.get_encoder(profile, setting_name)
+    data = encoder.encode(value)
+    padding = [0x00] * (encoder.packet_length - len(data))
+    return bytearray(helpers.merge_bytes(0x00, data, padding))
+
+
+def encode_report(profile, setting_name, value, _buffers={}):
+    report = encoders.get_encoder(profile, setting_name).encode_report(
+        _buffers.get((id(profile), setting_name)), value
+    )
+    _buffers[(id(profile), setting_name)] = report.obj
+    return report
+
+
+def bench(encode, settings, rounds):
+    timings = {}
+    for handler_name, profile, setting_name, value in settings:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            encode(profile, setting_name, value)
+        timings.setdefault(handler_name, []).append(
+            (time.perf_counter() - start) / rounds
+        )
+    return {k: sum(v) / len(v) for k, v in timings.items()}
+
+
+def main(args=sys.argv[1:]):
+    if "--no-cache" in args:
+        args = [arg for arg in args if arg != "--no-cache"]
+        encoders.ENCODING_CACHE.maxsize = 0
+    rounds = int(args[0]) if args else 1000
+
+    settings = []
+    for profile in devices.PROFILES.values():
+        for setting_name, setting_info in profile["settings"].items():
+            if setting_info.get("value_type") in (None, "none"):
+                continue
+            settings.append(
+                (
+                    setting_info["value_type"],
+                    profile,
+                    setting_name,
+                    setting_info["default"],
+                )
+            )
+
+    before = bench(encode_uncompiled, settings, rounds)
+    after = bench(encode_compiled, settings, rounds)
+    report_from_list = bench(encode_report_from_list, settings, rounds)
+    report = bench(encode_report, settings, rounds)
+
+    print("%i settings x %i rounds" % (len(settings), rounds))
+    print(
+        "encoding cache: %i hits, %i misses"
+        % (encoders.ENCODING_CACHE.hits, encoders.ENCODING_CACHE.misses)
+    )
+    print()
+    print(
+        "%-26s %12s %12s %8s %12s %12s"
+        % ("handler", "before", "after", "speedup", "report list", "in place")
+    )
+    for handler_name in sorted(before):
+        print(
+            "%-26s %9.2f µs %9.2f µs %7.1fx %9.2f µs %9.2f µs"
+            % (
+                handler_name,
+                before[handler_name] * 1e6,
+                after[handler_name] * 1e6,
+                before[handler_name] / after[handler_name],
+                report_from_list[handler_name] * 1e6,
+                report[handler_name] * 1e6,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+
+"""
+Compares the time taken to discover SteelSeries devices through sysfs and
+through hidapi.
+
+USAGE:
+
+    python scripts/bench_hid_discovery.py [ROUNDS]
+"""
+
+import sys
+import timeit
+
+import hid
+
+from rivalcfg import usbhid
+
+
+def bench(name, func, rounds):
+    total = timeit.timeit(func, number=rounds)
+    print("%-8s %8.3f ms/scan" % (name, total / rounds * 1000))
+
+
+def main(args=sys.argv[1:]):
+    rounds = int(args[0]) if args else 100
+
+    print("Rounds: %i" % rounds)
+    print()
+    bench("hidapi", lambda: hid.enumerate(0x1038), rounds)
+    if usbhid.is_sysfs_available():
+        bench("sysfs", lambda: usbhid._enumerate_sysfs(0x1038), rounds)
+    else:
+        print("sysfs    not available on this system")
+
+
+if __name__ == "__main__":
+    main()
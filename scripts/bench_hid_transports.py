@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+
+"""
+Measures the latency of each HID transport over the same packet stream (the
+packets that reset every setting of a device to its default value).
+
+USAGE:
+
+    python scripts/bench_hid_transports.py [VID:PID [PATH [ROUNDS]]]
+
+Without a PATH, only the fake transport is measured. With a PATH (e.g.
+``/dev/hidraw3``), the packets are sent to the real device.
+
+.. WARNING::
+
+   This script resets the settings of the device (but does not save them).
+"""
+
+import sys
+import time
+
+from rivalcfg import usbhid
+from rivalcfg import devices
+from rivalcfg import handlers
+from rivalcfg import helpers
+
+
+def build_packet_stream(profile):
+    packets = []
+    for setting_info in profile["settings"].values():
+        data = []
+        if setting_info.get("value_type") not in (None, "none"):
+            handler = handlers.get_handler(setting_info["value_type"])
+            data = handler.process_value(setting_info, setting_info["default"])
+        data = helpers.merge_bytes(
+            setting_info["command"], data, setting_info.get("command_suffix", [])
+        )
+        packet_length = setting_info.get("packet_length", 0)
+        if packet_length:
+            data = helpers.merge_bytes(data, [0x00] * (packet_length - len(data)))
+        packets.append((setting_info["report_type"], bytes([0x00] + data)))
+    return packets
+
+
+def bench(transport, path, packets, rounds):
+    device = usbhid.TRANSPORTS[transport](path)
+    device.open_path(path)
+    timings = []
+    try:
+        for _ in range(rounds):
+            for report_type, packet in packets:
+                start = time.perf_counter()
+                if report_type == usbhid.HID_REPORT_TYPE_FEATURE:
+                    device.send_feature_report(packet)
+                else:
+                    device.write(packet)
+                timings.append(time.perf_counter() - start)
+    finally:
+        device.close()
+    timings.sort()
+    print(
+        "%-8s mean: %8.1f µs | median: %8.1f µs | max: %8.1f µs"
+        % (
+            transport,
+            sum(timings) / len(timings) * 1e6,
+            timings[len(timings) // 2] * 1e6,
+            timings[-1] * 1e6,
+        )
+    )
+
+
+def main(args=sys.argv[1:]):
+    vendor_id, product_id = 0x1038, 0x1702
+    if args:
+        vendor_id, product_id = [int(i, 16) for i in args[0].split(":")]
+    path = args[1].encode() if len(args) > 1 else None
+    rounds = int(args[2]) if len(args) > 2 else 20
+
+    profile = devices.get_profile(vendor_id, product_id)
+    packets = build_packet_stream(profile)
+    print("%s: %i packets x %i rounds" % (profile["name"], len(packets), rounds))
+    print()
+
+    bench("fake", b"00:0000:0000", packets, rounds)
+    if path:
+        bench("hidapi", path, packets, rounds)
+        if usbhid.fcntl and path.startswith(b"/dev/hidraw"):
+            bench("hidraw", path, packets, rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+
+"""
+Measures the time taken to import the rivalcfg modules, each one in a fresh
+Python interpreter (median of ROUNDS runs, the startup time of the
+interpreter itself being subtracted), and lists the costly modules that each
+import pulls in (hidapi, logging, multiprocessing,...).
+
+USAGE:
+
+    python scripts/bench_import.py [ROUNDS]
+"""
+
+import sys
+import time
+import statistics
+import subprocess
+
+MODULES = [
+    "rivalcfg.devices",
+    "rivalcfg.mouse",
+    "rivalcfg",
+    "rivalcfg.__main__",
+]
+
+#: Modules that should only be imported when they are actually needed.
+COSTLY_MODULES = [
+    "hid",
+    "hidraw",
+    "logging",
+    "multiprocessing",
+    "concurrent.futures",
+]
+
+CODE = """\
+import sys
+%s
+print(" ".join(m for m in %r if m in sys.modules))
+"""
+
+
+def run(statement):
+    start = time.perf_counter()
+    output = subprocess.check_output(
+        [sys.executable, "-c", CODE % (statement, COSTLY_MODULES)]
+    )
+    return time.perf_counter() - start, output.decode().strip()
+
+
+def bench(statement, rounds):
+    durations = []
+    for _ in range(rounds):
+        duration, imported = run(statement)
+        durations.append(duration)
+    return statistics.median(durations), imported
+
+
+def main(args=sys.argv[1:]):
+    rounds = int(args[0]) if args else 20
+
+    print("Rounds: %i" % rounds)
+    print()
+    baseline, _ = bench("pass", rounds)
+    print("%-20s %8.2f ms" % ("(interpreter)", baseline * 1000))
+    for module in MODULES:
+        duration, imported = bench("import %s" % module, rounds)
+        print(
+            "%-20s %8.2f ms   %s"
+            % (module, (duration - baseline) * 1000, imported or "-")
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+"""
+Generates the index of the supported devices (rivalcfg/devices/_index.py).
+
+The index allows rivalcfg to list the supported devices, and to find the
+module of a given device, without importing all the device modules. It must be
+regenerated each time a device module is added or a model is changed.
+
+USAGE:
+
+    python scripts/generate_devices_index.py [OUTPUT]
+"""
+
+import os
+import re
+import sys
+import json
+import pkgutil
+import importlib
+
+from rivalcfg import devices
+
+INDEX_PATH = os.path.join(os.path.dirname(devices.__file__), "_index.py")
+
+HEADER = """\
+# This file is generated by scripts/generate_devices_index.py.
+# Do not edit it manually.
+
+"""
+
+
+def _natural_key(name):
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", name)]
+
+
+def _quote(string):
+    return json.dumps(string)
+
+
+def list_device_modules():
+    return sorted(
+        [
+            module.name
+            for module in pkgutil.iter_modules(devices.__path__)
+            if not module.name.startswith("_")
+        ],
+        key=_natural_key,
+    )
+
+
+def generate_index():
+    families = []
+    models = []
+    for module_name in list_device_modules():
+        module = importlib.import_module("rivalcfg.devices.%s" % module_name)
+        if not hasattr(module, "profile"):
+            continue  # Helpers shared by the device modules
+        profile = module.profile
+        families.append((module_name, profile["name"]))
+        for model in profile["models"]:
+            models.append((module_name, model))
+
+    index = HEADER
+    index += (
+        "#: The name of the family of each device module: ``{module_name: name}``.\n"
+    )
+    index += "FAMILIES = {\n"
+    for module_name, name in families:
+        index += "    %s: %s,\n" % (_quote(module_name), _quote(name))
+    index += "}\n\n"
+    index += "#: The supported models:\n"
+    index += "#: ``{(vendor_id, product_id): (module_name, name, endpoint)}``.\n"
+    index += "MODELS = {\n"
+    for module_name, model in models:
+        index += "    (0x%04X, 0x%04X): (\n" % (model["vendor_id"], model["product_id"])
+        index += "        %s,\n" % _quote(module_name)
+        index += "        %s,\n" % _quote(model["name"])
+        index += "        %i,\n" % model["endpoint"]
+        index += "    ),\n"
+    index += "}\n"
+    return index
+
+
+def main(args=sys.argv[1:]):
+    path = args[0] if args else INDEX_PATH
+    index = generate_index()
+    with open(path, "w") as file_:
+        file_.write(index)
+    print("Index written to %s" % path)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,6 @@
 #!/usr/bin/env python
 
 import sys
-import types
 import csv
 import itertools
 
@@ -48,29 +47,25 @@ def list_all_devices():
 
 def list_supported_devices_by_families():
     supported_devices = {}
-    for item in [getattr(devices, name) for name in dir(devices)]:
-        if not isinstance(item, types.ModuleType):
-            continue
-        if not hasattr(item, "profile"):
-            continue
-
+    for device in sorted(
+        devices.list_supported_devices(), key=lambda device: device["module"]
+    ):
         doc_name = (
-            item.__name__.split(".")[-1]
+            device["module"]
             .replace("_wireless_wireless", "_wireless")
             .replace("_wired", "")
         )
 
-        if item.profile["name"] not in supported_devices:
-            supported_devices[item.profile["name"]] = []
-        for model in item.profile["models"]:
-            supported_devices[item.profile["name"]].append(
-                {
-                    "name": model["name"],
-                    "vid": "%4X" % model["vendor_id"],
-                    "pid": "%4X" % model["product_id"],
-                    "url": DOC_DEVICES_BASE_URL + doc_name + ".html",
-                }
-            )
+        if device["family"] not in supported_devices:
+            supported_devices[device["family"]] = []
+        supported_devices[device["family"]].append(
+            {
+                "name": device["name"],
+                "vid": "%4X" % device["vendor_id"],
+                "pid": "%4X" % device["product_id"],
+                "url": DOC_DEVICES_BASE_URL + doc_name + ".html",
+            }
+        )
     for familly in supported_devices:
         supported_devices[familly] = sorted(
             supported_devices[familly],
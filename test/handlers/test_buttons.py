@@ -235,6 +235,19 @@ class TestProcessValue(object):
         # fmt: on
 
 
+class TestWriteValue(object):
+    setting_info2 = TestProcessValue.setting_info2
+
+    def test_same_as_process_value(self, setting_info2):
+        value = "buttons(button1=button2; button2=button1)"
+        buffer = bytearray(2 + buttons.get_value_length(setting_info2))
+        length = buttons.write_value(setting_info2, memoryview(buffer), 2, value)
+        assert list(buffer[2 : 2 + length]) == buttons.process_value(
+            setting_info2, value
+        )
+        assert buffer[:2] == b"\x00\x00"
+
+
 class TestAddCliOption(object):
     @pytest.fixture
     def cli(self):
@@ -36,6 +36,20 @@ class TestProcessValue(object):
             choice.process_value(setting_info, 42)
 
 
+class TestCompileProcessValue(object):
+    setting_info = TestProcessValue.setting_info
+
+    @pytest.mark.parametrize("input_", [10, "10", "foo", "multi"])
+    def test_same_as_process_value(self, setting_info, input_):
+        process_value = choice.compile_process_value(setting_info)
+        assert process_value(input_) == choice.process_value(setting_info, input_)
+
+    def test_not_valid_choice_compiled(self, setting_info):
+        process_value = choice.compile_process_value(setting_info)
+        with pytest.raises(ValueError):
+            process_value(42)
+
+
 class TestAddCliOption(object):
     @pytest.fixture
     def cli(self):
@@ -109,6 +109,32 @@ class TestProcessValue(object):
         # fmt: on
 
 
+class TestCompileProcessValue(object):
+    setting_info = TestProcessValue.setting_info
+    setting_info2 = TestProcessValue.setting_info2
+
+    @pytest.mark.parametrize(
+        "input_",
+        [100, "100", [100, 200, 300], "100, 200, 300", "150,1900,5000"],
+    )
+    def test_same_as_process_value(self, setting_info, input_):
+        process_value = multidpi_range.compile_process_value(setting_info)
+        assert process_value(input_) == multidpi_range.process_value(
+            setting_info, input_
+        )
+
+    def test_selected_preset(self, setting_info2):
+        process_value = multidpi_range.compile_process_value(setting_info2)
+        assert process_value("100,200", selected_preset=1) == (
+            multidpi_range.process_value(setting_info2, "100,200", selected_preset=1)
+        )
+
+    def test_too_many_pressets(self, setting_info):
+        process_value = multidpi_range.compile_process_value(setting_info)
+        with pytest.raises(ValueError):
+            process_value([100, 200, 300, 400, 500, 600])
+
+
 class TestAddCliOption(object):
     @pytest.fixture
     def cli(self):
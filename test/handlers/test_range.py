@@ -50,6 +50,27 @@ class TestProcessValue(object):
         assert range_.process_value(setting_info2, input_) == expected_output
 
 
+class TestCompileProcessValue(object):
+    setting_info = TestProcessValue.setting_info
+    setting_info2 = TestProcessValue.setting_info2
+
+    @pytest.mark.parametrize("input_", [0, 100, 149, 150, "300", 2000, 5000])
+    def test_same_as_process_value(self, setting_info, input_):
+        process_value = range_.compile_process_value(setting_info)
+        assert process_value(input_) == range_.process_value(setting_info, input_)
+
+    @pytest.mark.parametrize("input_", [1, 2, 14, 20])
+    def test_same_as_process_value2(self, setting_info2, input_):
+        process_value = range_.compile_process_value(setting_info2)
+        assert process_value(input_) == range_.process_value(setting_info2, input_)
+
+    def test_ranges_length_mismatch(self, setting_info):
+        setting_info["output_range"] = [2, 20, 2]
+        process_value = range_.compile_process_value(setting_info)
+        with pytest.raises(ValueError):
+            process_value(100)
+
+
 class TestAddCliOption(object):
     @pytest.fixture
     def cli(self):
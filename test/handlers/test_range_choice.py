@@ -106,6 +106,29 @@ class TestProcessValue(object):
         assert range_choice.process_value(setting_info2, input_) == expected_output
 
 
+class TestCompileProcessValue(object):
+    setting_info = TestProcessValue.setting_info
+    setting_info2 = TestProcessValue.setting_info2
+
+    @pytest.mark.parametrize("input_", [0, 100, 150, 151, "300", 1000, 3000])
+    def test_same_as_process_value(self, setting_info, input_):
+        process_value = range_choice.compile_process_value(setting_info)
+        assert process_value(input_) == range_choice.process_value(setting_info, input_)
+
+    @pytest.mark.parametrize("input_", [100, 200, 500, 1000])
+    def test_same_as_process_value2(self, setting_info2, input_):
+        process_value = range_choice.compile_process_value(setting_info2)
+        assert process_value(input_) == range_choice.process_value(
+            setting_info2, input_
+        )
+
+    def test_output_choices_mismatch(self, setting_info):
+        del setting_info["output_choices"][1000]
+        process_value = range_choice.compile_process_value(setting_info)
+        with pytest.raises(ValueError):
+            process_value(100)
+
+
 class TestAddCliOption(object):
     @pytest.fixture
     def cli(self):
@@ -199,6 +199,19 @@ class TestProcessValue(object):
     # TODO Test different header layouts
 
 
+class TestWriteValue(object):
+    setting_info1 = TestProcessValue.setting_info1
+
+    def test_same_as_process_value(self, setting_info1):
+        value = "rgbgradient(duration=1000; colors=0%: red, 50%: blue)"
+        buffer = bytearray(2 + rgbgradientv2.get_value_length(setting_info1))
+        length = rgbgradientv2.write_value(setting_info1, memoryview(buffer), 2, value)
+        assert list(buffer[2 : 2 + length]) == rgbgradientv2.process_value(
+            setting_info1, value
+        )
+        assert buffer[:2] == b"\x00\x00"
+
+
 class TestAddCliOption(object):
     @pytest.fixture
     def cli(self):
@@ -0,0 +1,226 @@
+import time
+import asyncio
+
+import pytest
+
+from rivalcfg import aio
+from rivalcfg import mouse
+from rivalcfg import usbhid
+from rivalcfg import mouse_settings
+
+FAKE_PROFILE = {
+    "name": "Fake Mouse",
+    "vendor_id": 0x1038,
+    "product_id": 0xBAAD,
+    "endpoint": 2,
+    "settings": {
+        "setting1": {
+            "label": "Setting 1",
+            "description": "A setting with no value",
+            "cli": ["-1", "--setting1"],
+            "report_type": usbhid.HID_REPORT_TYPE_OUTPUT,
+            "command": [0xAA, 0xBB],
+            "value_type": None,
+        },
+        "setting2": {
+            "label": "Setting 2",
+            "description": "A setting with a simple choice value",
+            "cli": ["-2", "--setting2"],
+            "report_type": usbhid.HID_REPORT_TYPE_OUTPUT,
+            "command": [0xCC],
+            "value_type": "choice",
+            "choices": {
+                "foo": 0x01,
+                "bar": 0x02,
+            },
+            "default": "bar",
+        },
+    },
+    "firmware_version": {
+        "report_type": usbhid.HID_REPORT_TYPE_OUTPUT,
+        "command": [0x10],
+        "response_length": 2,
+    },
+    "battery_level": {
+        "report_type": usbhid.HID_REPORT_TYPE_OUTPUT,
+        "command": [0x92],
+        "response_length": 2,
+        "level": lambda data: data[1],
+    },
+    "save_command": {
+        "report_type": usbhid.HID_REPORT_TYPE_OUTPUT,
+        "command": [0x5A, 0x0E],
+    },
+}
+
+
+class RespondingDevice(usbhid.FakeDevice):
+    """A fake device that answers to each read with the given response."""
+
+    def __init__(self, response):
+        usbhid.FakeDevice.__init__(self)
+        self.response = response
+
+    def read(self, max_length, timeout_ms=0):
+        return self.response[:max_length]
+
+
+def _read_reports(mouse):
+    mouse._hid_device.bytes.seek(0)
+    reports = mouse._hid_device.bytes.read()
+    mouse._hid_device.bytes.seek(0)
+    mouse._hid_device.bytes.truncate()
+    return reports
+
+
+class TestGetMouse(object):
+    def test_get_mouse(self, monkeypatch):
+        monkeypatch.setenv("RIVALCFG_DRY", "1")
+        async_mouse = asyncio.run(aio.get_mouse(product_id=0x1702))
+        assert isinstance(async_mouse, aio.AsyncMouse)
+        assert async_mouse.product_id == 0x1702
+        assert async_mouse.name == "SteelSeries Rival 100"
+
+    def test_get_mouse_raise_error_if_no_product_id(self):
+        with pytest.raises(ValueError):
+            asyncio.run(aio.get_mouse())
+
+
+class TestAsyncMouse(object):
+    @pytest.fixture
+    def async_mouse(self):
+        return aio.AsyncMouse(
+            mouse.Mouse(
+                RespondingDevice([0x01, 0x42]),
+                FAKE_PROFILE,
+                mouse_settings.FakeMouseSettings(0x1038, 0xBAAD, FAKE_PROFILE),
+            )
+        )
+
+    def test_set_setting(self, async_mouse):
+        asyncio.run(async_mouse.set_setting2("foo"))
+        assert _read_reports(async_mouse.mouse) == b"\x02\x00\xcc\x01"
+        assert async_mouse.mouse_settings.get("setting2") == "foo"
+
+    def test_set_setting_with_no_value(self, async_mouse):
+        asyncio.run(async_mouse.set("setting1"))
+        assert _read_reports(async_mouse.mouse) == b"\x02\x00\xaa\xbb"
+
+    def test_set_invalid_value(self, async_mouse):
+        with pytest.raises(ValueError):
+            asyncio.run(async_mouse.set_setting2("baz"))
+
+    def test_set_unknown_setting(self, async_mouse):
+        with pytest.raises(AttributeError):
+            async_mouse.set_foo
+        with pytest.raises(AttributeError):
+            asyncio.run(async_mouse.set("foo"))
+
+    def test_setting_methods(self, async_mouse):
+        assert "set_setting2" in dir(async_mouse)
+        assert isinstance(async_mouse, aio.AsyncMouse)
+        assert async_mouse.set_setting2.__func__ is type(async_mouse).set_setting2
+        assert async_mouse.set_setting2.__doc__.startswith(
+            "A setting with a simple choice value."
+        )
+        assert type(async_mouse) is type(aio.AsyncMouse(async_mouse.mouse))
+
+    def test_reset_settings(self, async_mouse):
+        asyncio.run(async_mouse.reset_settings())
+        assert _read_reports(async_mouse.mouse) == (
+            b"\x02\x00\xaa\xbb" b"\x02\x00\xcc\x02"
+        )
+
+    def test_save(self, async_mouse):
+        asyncio.run(async_mouse.save())
+        assert _read_reports(async_mouse.mouse) == b"\x02\x00\x5a\x0e"
+
+    def test_firmware_version(self, async_mouse):
+        assert asyncio.run(async_mouse.firmware_version) == "1.66"
+        assert _read_reports(async_mouse.mouse) == b"\x02\x00\x10"
+
+    def test_battery(self, async_mouse):
+        assert asyncio.run(async_mouse.battery) == {
+            "is_charging": None,
+            "level": 0x42,
+        }
+
+    def test_commands_are_serialized(self, async_mouse):
+        async def _main():
+            await asyncio.gather(
+                async_mouse.set_setting2("foo"),
+                async_mouse.set_setting1(),
+                async_mouse.set_setting2("bar"),
+            )
+
+        asyncio.run(_main())
+        assert _read_reports(async_mouse.mouse) == (
+            b"\x02\x00\xcc\x01" b"\x02\x00\xaa\xbb" b"\x02\x00\xcc\x02"
+        )
+
+    def test_context_manager_closes_the_mouse(self, async_mouse):
+        async def _main():
+            async with async_mouse:
+                await async_mouse.set_setting2("foo")
+
+        asyncio.run(_main())
+        assert async_mouse.mouse._hid_device.bytes.closed
+
+
+class TestPacing(object):
+    @pytest.fixture
+    def async_mouse(self, monkeypatch):
+        monkeypatch.delenv("RIVALCFG_DEBUG_NO_COMMAND_DELAY", raising=False)
+        mouse_ = mouse.Mouse(
+            usbhid.FakeDevice(),
+            FAKE_PROFILE,
+            mouse_settings.FakeMouseSettings(0x1038, 0xBAAD, FAKE_PROFILE),
+            command_delay=0.05,
+        )
+        return aio.AsyncMouse(mouse_)
+
+    def test_commands_are_paced(self, async_mouse):
+        async def _main():
+            await async_mouse.set_setting2("foo")
+            await async_mouse.set_setting2("bar")
+
+        start = time.monotonic()
+        asyncio.run(_main())
+        assert time.monotonic() - start >= 0.05
+
+    def test_pacing_does_not_block_the_event_loop(self, async_mouse):
+        ticks = []
+
+        async def _ticker():
+            for _ in range(3):
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.005)
+
+        async def _main():
+            await async_mouse.set_setting2("foo")
+            await asyncio.gather(async_mouse.set_setting2("bar"), _ticker())
+
+        asyncio.run(_main())
+        assert len(ticks) == 3
+        assert ticks[-1] - ticks[0] < 0.04
+
+    def test_devices_are_driven_concurrently(self, async_mouse):
+        other_mouse = aio.AsyncMouse(
+            mouse.Mouse(
+                usbhid.FakeDevice(),
+                FAKE_PROFILE,
+                mouse_settings.FakeMouseSettings(0x1038, 0xBAAD, FAKE_PROFILE),
+                command_delay=0.05,
+            )
+        )
+
+        async def _drive(async_mouse):
+            await async_mouse.set_setting2("foo")
+            await async_mouse.set_setting2("bar")
+
+        async def _main():
+            await asyncio.gather(_drive(async_mouse), _drive(other_mouse))
+
+        start = time.monotonic()
+        asyncio.run(_main())
+        assert time.monotonic() - start < 0.1
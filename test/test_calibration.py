@@ -0,0 +1,214 @@
+import os
+import json
+import time
+
+import pytest
+
+from rivalcfg import usbhid
+from rivalcfg import mouse
+from rivalcfg import calibration
+from rivalcfg import mouse_settings
+
+FAKE_PROFILE = {
+    "name": "Fake Mouse",
+    "vendor_id": 0x1038,
+    "product_id": 0xBAAD,
+    "endpoint": 0,
+    "settings": {},
+    "firmware_version": {
+        "report_type": usbhid.HID_REPORT_TYPE_OUTPUT,
+        "command": [0x10, 0x00],
+        "response_length": 2,
+    },
+    "command_delay": {
+        "min": 0.002,
+        "max": 0.016,
+    },
+}
+
+
+class FlakyDevice(usbhid.FakeDevice):
+    """A fake device that returns garbage when commands are sent too fast."""
+
+    def __init__(self, min_delay):
+        usbhid.FakeDevice.__init__(self)
+        self.min_delay = min_delay
+        self.mouse = None
+
+    def read(self, max_length, timeout_ms=0):
+        if self.mouse.command_delay < self.min_delay:
+            return []
+        return [1, 33][:max_length]
+
+
+class SlowDevice(usbhid.FakeDevice):
+    """A fake device that answers after the given latency, and that loses
+    the commands sent less than ``min_interval`` seconds after the previous
+    one.
+    """
+
+    def __init__(self, min_interval, latency):
+        usbhid.FakeDevice.__init__(self)
+        self.min_interval = min_interval
+        self.latency = latency
+        self.last_write_time = 0
+        self.responses = []
+
+    def write(self, data):
+        now = time.monotonic()
+        if now - self.last_write_time >= self.min_interval:
+            self.responses.append(now + self.latency)
+        self.last_write_time = now
+
+    def read(self, max_length, timeout_ms=0):
+        if not self.responses:
+            return []
+        time.sleep(max(0, self.responses.pop(0) - time.monotonic()))
+        return [1, 33][:max_length]
+
+
+@pytest.fixture(autouse=True)
+def config_home(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(tmp_path))
+    monkeypatch.delenv("RIVALCFG_DRY", raising=False)
+
+
+def _make_mouse(profile, min_delay):
+    device = FlakyDevice(min_delay)
+    mouse_ = mouse.Mouse(
+        device,
+        profile,
+        mouse_settings.FakeMouseSettings(0x1038, 0xBAAD, profile),
+    )
+    device.mouse = mouse_
+    return mouse_
+
+
+class TestCommandDelayBounds(object):
+    def test_bounds_from_profile(self):
+        assert calibration.get_command_delay_bounds(FAKE_PROFILE) == (0.002, 0.016)
+
+    def test_default_bounds(self):
+        assert calibration.get_command_delay_bounds({}) == (
+            calibration.MIN_COMMAND_DELAY,
+            calibration.DEFAULT_COMMAND_DELAY,
+        )
+
+    @pytest.mark.parametrize(
+        "delay,expected",
+        [
+            (0.001, 0.002),
+            (0.004, 0.004),
+            (1, 0.016),
+        ],
+    )
+    def test_clamp(self, delay, expected):
+        assert calibration.clamp_command_delay(FAKE_PROFILE, delay) == expected
+
+
+class TestStore(object):
+    def test_load_not_calibrated(self):
+        assert calibration.load_device_command_delay(0x1038, 0xBAAD) is None
+
+    def test_save_and_load(self):
+        calibration.save_command_delay(0x1038, 0xBAAD, "1.33", 0.01)
+        calibration.save_command_delay(0x1038, 0xBAAD, "1.34", 0.02)
+        assert calibration.load_device_command_delay(0x1038, 0xBAAD) == 0.02
+        assert calibration.load_device_command_delay(0x1038, 0xBAD2) is None
+        with open(calibration.get_calibration_path(), "r") as file_:
+            assert json.load(file_) == {
+                "1038:baad:1.33": 0.01,
+                "1038:baad:1.34": 0.02,
+            }
+
+    def test_save_is_atomic(self, monkeypatch):
+        calibration.save_command_delay(0x1038, 0xBAAD, "1.33", 0.01)
+
+        def _dump(obj, file_, **kwargs):
+            file_.write("{")
+            raise OSError("No space left on device")
+
+        with monkeypatch.context() as patch:
+            patch.setattr(calibration.json, "dump", _dump)
+            with pytest.raises(OSError):
+                calibration.save_command_delay(0x1038, 0xBAAD, "1.34", 0.02)
+        assert calibration.load_device_command_delay(0x1038, 0xBAAD) == 0.01
+        assert os.listdir(os.path.dirname(calibration.get_calibration_path())) == [
+            "command_delays.json"
+        ]
+
+
+class TestCalibrateCommandDelay(object):
+    def test_calibrate(self):
+        mouse_ = _make_mouse(FAKE_PROFILE, min_delay=0.004)
+        delay = calibration.calibrate_command_delay(mouse_, probe_count=2)
+        # 0.016 -> 0.008 -> 0.004 -> 0.002 (fails), 0.004 * 2
+        assert delay == 0.008
+        assert mouse_.command_delay == 0.008
+        assert calibration.load_device_command_delay(0x1038, 0xBAAD) == 0.008
+
+    def test_calibrate_down_to_floor(self):
+        mouse_ = _make_mouse(FAKE_PROFILE, min_delay=0)
+        delay = calibration.calibrate_command_delay(mouse_, probe_count=2)
+        assert delay == 0.004
+
+    def test_calibrate_paced_like_writes(self, monkeypatch):
+        # The commands are not spaced out by the time the device takes to
+        # answer
+        monkeypatch.delenv("RIVALCFG_DEBUG_NO_COMMAND_DELAY", raising=False)
+        mouse_ = mouse.Mouse(
+            SlowDevice(min_interval=0.006, latency=0.01),
+            FAKE_PROFILE,
+            mouse_settings.FakeMouseSettings(0x1038, 0xBAAD, FAKE_PROFILE),
+        )
+        delay = calibration.calibrate_command_delay(mouse_, probe_count=3)
+        # 0.016 -> 0.008 -> 0.004 (fails), 0.008 * 2
+        assert delay == 0.016
+
+    def test_calibrate_with_report_reader(self):
+        mouse_ = _make_mouse(FAKE_PROFILE, min_delay=0)
+        mouse_.start_report_reader()
+        try:
+            with pytest.raises(RuntimeError):
+                calibration.calibrate_command_delay(mouse_)
+        finally:
+            mouse_.close()
+
+    def test_calibrate_without_probe_command(self):
+        profile = dict(FAKE_PROFILE)
+        del profile["firmware_version"]
+        mouse_ = _make_mouse(profile, min_delay=0)
+        with pytest.raises(calibration.CalibrationError):
+            calibration.calibrate_command_delay(mouse_)
+
+    def test_calibrate_device_not_responding(self):
+        mouse_ = _make_mouse(FAKE_PROFILE, min_delay=1)
+        with pytest.raises(calibration.CalibrationError):
+            calibration.calibrate_command_delay(mouse_)
+
+
+class TestApplyCalibratedDelay(object):
+    def test_apply(self):
+        calibration.save_command_delay(0x1038, 0xBAAD, "1.33", 0.004)
+        mouse_ = _make_mouse(FAKE_PROFILE, min_delay=0)
+        calibration.apply_calibrated_delay(mouse_)
+        assert mouse_.command_delay == 0.004
+
+    def test_apply_largest_delay(self):
+        calibration.save_command_delay(0x1038, 0xBAAD, "1.00", 0.008)
+        calibration.save_command_delay(0x1038, 0xBAAD, "1.33", 0.004)
+        mouse_ = _make_mouse(FAKE_PROFILE, min_delay=0)
+        calibration.apply_calibrated_delay(mouse_)
+        assert mouse_.command_delay == 0.008
+
+    def test_apply_sends_nothing(self):
+        calibration.save_command_delay(0x1038, 0xBAAD, "1.33", 0.004)
+        mouse_ = _make_mouse(FAKE_PROFILE, min_delay=0)
+        calibration.apply_calibrated_delay(mouse_)
+        mouse_._hid_device.bytes.seek(0)
+        assert mouse_._hid_device.bytes.read() == b""
+
+    def test_apply_profile_floor(self, monkeypatch):
+        monkeypatch.setenv("RIVALCFG_DRY", "1")
+        rival = mouse.get_mouse(0x1038, 0x1366)  # Kinzu v2
+        assert rival.command_delay == 0.05
@@ -0,0 +1,34 @@
+from rivalcfg import cli
+from rivalcfg import devices
+
+
+class TestGetParser(object):
+    def test_parser_without_profile(self):
+        cli_parser = cli.get_parser()
+        assert cli_parser.parse_args(["--no-save"]).SAVE is False
+
+    def test_parser_with_profile(self):
+        profile = devices.get_profile(vendor_id=0x1038, product_id=0x1702)
+        settings = cli.get_parser(profile).parse_args(["--color", "red"])
+        assert settings.COLOR == "red"
+
+    def test_parsers_are_reused(self):
+        profile = devices.get_profile(vendor_id=0x1038, product_id=0x1702)
+        cli_parser = cli.get_parser(profile)
+        assert cli.get_parser(profile) is cli_parser
+        assert cli.get_parser() is not cli_parser
+        assert cli.get_parser(profile, prog="foo") is not cli_parser
+
+    def test_parser_can_parse_several_times(self):
+        profile = devices.get_profile(vendor_id=0x1038, product_id=0x1702)
+        cli_parser = cli.get_parser(profile)
+        assert cli_parser.parse_args(["--color", "red", "--no-save"]).SAVE is False
+        settings = cli_parser.parse_args(["--color", "blue"])
+        assert settings.COLOR == "blue"
+        assert settings.SAVE is True
+
+    def test_actions_are_module_level_classes(self):
+        # No Action class is created for each setting
+        profile = devices.get_profile(vendor_id=0x1038, product_id=0x1836)
+        for action in cli.get_parser(profile)._actions:
+            assert "<locals>" not in type(action).__qualname__
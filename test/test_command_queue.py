@@ -0,0 +1,234 @@
+import threading
+
+import pytest
+
+from rivalcfg import mouse
+from rivalcfg import usbhid
+from rivalcfg import mouse_settings
+from rivalcfg import command_queue
+
+FAKE_PROFILE = {
+    "name": "Fake Mouse",
+    "vendor_id": 0x1038,
+    "product_id": 0xBAAD,
+    "endpoint": 2,
+    "settings": {
+        "color": {
+            "label": "Color",
+            "description": "Set the color",
+            "cli": ["-c", "--color"],
+            "report_type": usbhid.HID_REPORT_TYPE_OUTPUT,
+            "command": [0x05, 0x00],
+            "value_type": "rgbcolor",
+            "default": "#FF1800",
+        },
+        "effect": {
+            "label": "Effect",
+            "description": "Set the effect",
+            "cli": ["-e", "--effect"],
+            "report_type": usbhid.HID_REPORT_TYPE_OUTPUT,
+            "command": [0x07],
+            "value_type": "choice",
+            "choices": {
+                "steady": 0x01,
+                "breath": 0x02,
+            },
+            "default": "steady",
+        },
+    },
+    "save_command": {
+        "report_type": usbhid.HID_REPORT_TYPE_OUTPUT,
+        "command": [0x09],
+    },
+}
+
+
+class TestCommandQueue(object):
+    @pytest.fixture
+    def queue(self):
+        queue = command_queue.CommandQueue()
+        yield queue
+        queue.close()
+
+    @pytest.fixture
+    def gate(self, queue):
+        """Blocks the worker until the gate is set."""
+        gate = threading.Event()
+        started = threading.Event()
+
+        def _block():
+            started.set()
+            gate.wait()
+
+        queue.submit(_block, priority=-1)
+        started.wait()
+        yield gate
+        gate.set()
+
+    def test_result(self, queue):
+        assert queue.submit(pow, 2, 3).result() == 8
+
+    def test_exception(self, queue):
+        future = queue.submit(int, "foo")
+        with pytest.raises(ValueError):
+            future.result()
+
+    def test_priorities(self, queue, gate):
+        calls = []
+        queue.submit(calls.append, "low", priority=command_queue.PRIORITY_LOW)
+        queue.submit(calls.append, "normal")
+        last = queue.submit(calls.append, "high", priority=command_queue.PRIORITY_HIGH)
+        assert len(queue) == 3
+        gate.set()
+        queue.close()
+        assert last.done()
+        assert calls == ["high", "normal", "low"]
+
+    def test_supersede(self, queue, gate):
+        calls = []
+        first = queue.submit(calls.append, "first", key="foo")
+        second = queue.submit(calls.append, "second", key="foo")
+        assert len(queue) == 1
+        gate.set()
+        assert second.result() is None
+        assert first.result() is None
+        assert calls == ["second"]
+
+    def test_supersede_keeps_highest_priority(self, queue, gate):
+        calls = []
+        queue.submit(calls.append, "first", priority=0, key="foo")
+        queue.submit(calls.append, "other", priority=10)
+        queue.submit(calls.append, "second", priority=20, key="foo")
+        gate.set()
+        queue.close()
+        assert calls == ["second", "other"]
+
+    def test_supersede_exception(self, queue, gate):
+        first = queue.submit(int, "1", key="foo")
+        queue.submit(int, "foo", key="foo")
+        gate.set()
+        with pytest.raises(ValueError):
+            first.result()
+
+    def test_barrier(self, queue, gate):
+        calls = []
+        queue.submit(calls.append, "low", priority=command_queue.PRIORITY_LOW)
+        queue.submit(calls.append, "barrier", barrier=True)
+        queue.submit(calls.append, "high", priority=command_queue.PRIORITY_HIGH)
+        queue.submit(calls.append, "low2", priority=command_queue.PRIORITY_LOW)
+        gate.set()
+        queue.close()
+        assert calls == ["low", "barrier", "high", "low2"]
+
+    def test_no_supersede_across_barrier(self, queue, gate):
+        calls = []
+        first = queue.submit(calls.append, "first", key="foo")
+        queue.submit(calls.append, "barrier", barrier=True)
+        queue.submit(calls.append, "second", key="foo")
+        assert len(queue) == 3
+        gate.set()
+        queue.close()
+        assert first.done()
+        assert calls == ["first", "barrier", "second"]
+
+    def test_cancel(self, queue, gate):
+        calls = []
+        future = queue.submit(calls.append, "foo")
+        assert future.cancel()
+        gate.set()
+        queue.close()
+        assert calls == []
+
+    def test_closed(self, queue):
+        queue.close()
+        with pytest.raises(RuntimeError):
+            queue.submit(print)
+
+
+class TestQueuedMouse(object):
+    @pytest.fixture
+    def mouse(self):
+        queued_mouse = command_queue.QueuedMouse(
+            mouse.Mouse(
+                usbhid.FakeDevice(),
+                FAKE_PROFILE,
+                mouse_settings.FakeMouseSettings(0x1038, 0xBAAD, FAKE_PROFILE),
+            )
+        )
+        gate = threading.Event()
+        queued_mouse.call(lambda mouse_: gate.wait(), priority=-1)
+        queued_mouse.gate = gate
+        yield queued_mouse
+        gate.set()
+        queued_mouse.close()
+
+    def _read_reports(self, mouse):
+        mouse.mouse._hid_device.bytes.seek(0)
+        return mouse.mouse._hid_device.bytes.read()
+
+    def test_set(self, mouse):
+        future = mouse.set_effect("breath")
+        assert not future.done()
+        mouse.gate.set()
+        future.result()
+        assert self._read_reports(mouse) == b"\x02\x00\x07\x02"
+        assert mouse.mouse.mouse_settings.get("effect") == "breath"
+
+    def test_invalid_value(self, mouse):
+        with pytest.raises(ValueError):
+            mouse.set_effect("foo")
+
+    def test_setter_cached(self, mouse):
+        assert mouse.set_color is mouse.set_color
+
+    def test_unknown_setting(self, mouse):
+        with pytest.raises(AttributeError):
+            mouse.set_foo("bar")
+
+    def test_interactive_settings_first(self, mouse):
+        mouse.set_effect("breath")
+        color = mouse.set_color("red")
+        mouse.gate.set()
+        color.result()
+        assert self._read_reports(mouse) == (
+            b"\x02\x00\x05\x00\xff\x00\x00" b"\x02\x00\x07\x02"
+        )
+
+    def test_save_is_barrier(self, mouse):
+        mouse.set_effect("breath")
+        mouse.save()
+        color = mouse.set_color("red")
+        mouse.gate.set()
+        color.result()
+        assert self._read_reports(mouse) == (
+            b"\x02\x00\x07\x02" b"\x02\x00\x09" b"\x02\x00\x05\x00\xff\x00\x00"
+        )
+
+    def test_reset_is_barrier(self, mouse):
+        mouse.set_color("blue")
+        mouse.reset_settings(force=True)
+        color = mouse.set_color("red")
+        mouse.gate.set()
+        color.result()
+        assert self._read_reports(mouse).startswith(b"\x02\x00\x05\x00\x00\x00\xff")
+        assert mouse.mouse.mouse_settings.get("color") == "red"
+
+    def test_superseded_setting(self, mouse):
+        first = mouse.set_color("red")
+        second = mouse.set_color("blue")
+        mouse.gate.set()
+        second.result()
+        assert first.done()
+        assert self._read_reports(mouse) == b"\x02\x00\x05\x00\x00\x00\xff"
+
+    def test_call(self, mouse):
+        future = mouse.call(lambda mouse_, value: (mouse_.name, value), 42)
+        mouse.gate.set()
+        assert future.result() == ("Fake Mouse", 42)
+
+    def test_close_closes_mouse(self, mouse):
+        closed = []
+        mouse.mouse._hid_device.close = lambda: closed.append(True)
+        mouse.gate.set()
+        mouse.close()
+        assert closed == [True]
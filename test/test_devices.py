@@ -1,4 +1,15 @@
+import os
+import sys
+import json
+import pkgutil
+import importlib
+import subprocess
+
+import pytest
+
+from rivalcfg import usbhid
 from rivalcfg import devices
+from rivalcfg.devices import _index
 
 
 class TestListPluggedDevice(object):
@@ -14,3 +25,256 @@ class TestListPluggedDevice(object):
             ):
                 debug_device_found = True
         assert debug_device_found
+
+    def test_plugged_devices_single_scan(self, monkeypatch):
+        monkeypatch.delenv("RIVALCFG_PROFILE", raising=False)
+        scans = []
+
+        def _enumerate_devices(vendor_id):
+            scans.append(vendor_id)
+            return {
+                (0x1038, 0x1702, 0): b"/dev/hidraw1",
+                (0x1038, 0x1702, 1): b"/dev/hidraw2",
+                (0x1038, 0xBAAD, 0): b"/dev/hidraw3",
+            }
+
+        monkeypatch.setattr(usbhid, "enumerate_devices", _enumerate_devices)
+        devices_list = list(devices.list_plugged_devices())
+        assert scans == [0x1038]
+        assert devices_list == [
+            {
+                "vendor_id": 0x1038,
+                "product_id": 0x1702,
+                "name": "SteelSeries Rival 100",
+                "endpoint": 0,
+                "path": b"/dev/hidraw1",
+            }
+        ]
+
+
+class TestDevicesIndex(object):
+    def test_index_is_up_to_date(self):
+        # Run "python scripts/generate_devices_index.py" if this test fails
+        families = {}
+        models = {}
+        for module_info in pkgutil.iter_modules(devices.__path__):
+            module = importlib.import_module("rivalcfg.devices.%s" % module_info.name)
+            if not hasattr(module, "profile"):
+                continue
+            families[module_info.name] = module.profile["name"]
+            for model in module.profile["models"]:
+                models[(model["vendor_id"], model["product_id"])] = (
+                    module_info.name,
+                    model["name"],
+                    model["endpoint"],
+                )
+        assert _index.FAMILIES == families
+        assert _index.MODELS == models
+
+    def test_list_supported_devices(self):
+        supported_devices = devices.list_supported_devices()
+        assert len(supported_devices) == len(_index.MODELS)
+        assert {
+            "vendor_id": 0x1038,
+            "product_id": 0x1702,
+            "name": "SteelSeries Rival 100",
+            "endpoint": 0,
+            "family": "SteelSeries Rival 100 / SteelSeries Rival 105",
+            "module": "rival100",
+        } in supported_devices
+
+
+class TestProfiles(object):
+    def test_profiles_mapping(self):
+        assert (0x1038, 0x1702) in devices.PROFILES
+        assert (0x1038, 0xBAAD) not in devices.PROFILES
+        assert len(devices.PROFILES) == len(_index.MODELS)
+        assert list(devices.PROFILES) == list(_index.MODELS)
+        assert devices.PROFILES[(0x1038, 0x1702)]["name"] == "SteelSeries Rival 100"
+
+    def test_profiles_are_generated_once(self):
+        profile = devices.get_profile(vendor_id=0x1038, product_id=0x1702)
+        assert devices.get_profile(vendor_id=0x1038, product_id=0x1702) is profile
+
+    def test_unsupported_device(self):
+        with pytest.raises(devices.UnsupportedDevice):
+            devices.get_profile(vendor_id=0x1038, product_id=0xBAAD)
+        with pytest.raises(KeyError):
+            devices.PROFILES[(0x1038, 0xBAAD)]
+
+    def test_device_modules_are_imported_lazily(self):
+        code = (
+            "import sys\n"
+            "from rivalcfg import devices\n"
+            "devices.get_profile(vendor_id=0x1038, product_id=0x1702)\n"
+            "print(sorted(m for m in sys.modules if m.startswith('rivalcfg.devices.')))\n"
+        )
+        env = dict(os.environ, RIVALCFG_NO_PROFILES_CACHE="1")
+        output = subprocess.check_output([sys.executable, "-c", code], env=env)
+        assert output.decode().strip() == (
+            "['rivalcfg.devices._index', 'rivalcfg.devices.rival100']"
+        )
+
+    def test_device_module_attribute(self):
+        assert devices.rival100.profile["name"] == (
+            "SteelSeries Rival 100 / SteelSeries Rival 105"
+        )
+        with pytest.raises(AttributeError):
+            devices.foobar
+
+
+@pytest.fixture
+def profiles_cache(monkeypatch, tmp_path):
+    monkeypatch.delenv("RIVALCFG_NO_PROFILES_CACHE", raising=False)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.setattr(devices, "_PROFILES_CACHE_DIR", None)
+    return tmp_path
+
+
+class TestProfilesCache(object):
+    def test_profiles_cache_dir(self, profiles_cache):
+        cache_dir = devices.get_profiles_cache_dir()
+        assert os.path.dirname(cache_dir) == str(profiles_cache / "rivalcfg")
+        assert os.path.basename(cache_dir).startswith("profiles-")
+
+    def test_cached_profiles(self, profiles_cache):
+        profiles = devices._load_profiles("aerox3_wireless_wired")
+        assert devices._load_cached_profiles("aerox3_wireless_wired") == profiles
+
+    def test_all_profiles_can_be_cached(self):
+        for profile_name in devices.PROFILES:
+            profile = devices.PROFILES[profile_name]
+            encoded = json.dumps(devices._encode_cached_value(profile))
+            decoded = json.loads(encoded, object_hook=devices._decode_cached_value)
+            assert decoded == profile
+
+    def test_lambdas_not_cached(self):
+        with pytest.raises(TypeError):
+            devices._encode_cached_value({"level": lambda data: data[0]})
+
+    def test_only_device_functions_loaded(self, profiles_cache):
+        devices._load_profiles("aerox3")
+        cache_path = os.path.join(devices.get_profiles_cache_dir(), "aerox3.json")
+        with open(cache_path, "r") as file_:
+            cache = json.load(file_)
+        cache["profile"]["foo"] = {"!function": "os:system"}
+        with open(cache_path, "w") as file_:
+            json.dump(cache, file_)
+        assert devices._load_cached_profiles("aerox3") is None
+
+    def test_cache_of_other_user_ignored(self, profiles_cache, monkeypatch):
+        devices._load_profiles("aerox3")
+        monkeypatch.setattr(os, "getuid", lambda: os.stat(__file__).st_uid + 1)
+        assert devices._load_cached_profiles("aerox3") is None
+
+    def test_device_module_not_imported_on_cache_hit(self, profiles_cache):
+        code = (
+            "import sys\n"
+            "from rivalcfg import devices\n"
+            "devices.get_profile(vendor_id=0x1038, product_id=0x1836)\n"
+            "print('rivalcfg.devices.aerox3' in sys.modules)\n"
+        )
+        env = dict(os.environ, XDG_CACHE_HOME=str(profiles_cache))
+        outputs = [
+            subprocess.check_output([sys.executable, "-c", code], env=env)
+            for _ in range(2)
+        ]
+        assert [output.decode().strip() for output in outputs] == ["True", "False"]
+
+    def test_stale_cache(self, profiles_cache, monkeypatch):
+        devices._load_profiles("aerox3")
+        cache_path = os.path.join(devices.get_profiles_cache_dir(), "aerox3.json")
+        with open(cache_path, "r") as file_:
+            cache = json.load(file_)
+        cache["fingerprint"][-1][1] += 1
+        with open(cache_path, "w") as file_:
+            json.dump(cache, file_)
+        assert devices._load_cached_profiles("aerox3") is None
+
+    def test_corrupted_cache(self, profiles_cache):
+        devices._load_profiles("aerox3")
+        cache_path = os.path.join(devices.get_profiles_cache_dir(), "aerox3.json")
+        with open(cache_path, "w") as file_:
+            file_.write("{foobar")
+        assert devices._load_cached_profiles("aerox3") is None
+        assert (0x1038, 0x1836) in devices._load_profiles("aerox3")
+
+    def test_unwritable_cache(self, profiles_cache):
+        # The cache folder cannot be created, as a file has its name
+        (profiles_cache / "rivalcfg").write_text("")
+        assert (0x1038, 0x1836) in devices._load_profiles("aerox3")
+        assert devices._load_cached_profiles("aerox3") is None
+
+    def test_self_contained_module_not_cached(self, profiles_cache):
+        assert (0x1038, 0x1702) in devices._load_profiles("rival100")
+        assert devices._load_cached_profiles("rival100") is None
+
+    def test_cache_disabled(self, profiles_cache, monkeypatch):
+        monkeypatch.setenv("RIVALCFG_NO_PROFILES_CACHE", "1")
+        devices._load_profiles("aerox3")
+        assert not os.path.exists(str(profiles_cache / "rivalcfg"))
+
+    def test_previous_caches_removed(self, profiles_cache):
+        previous_cache_dir = profiles_cache / "rivalcfg" / "profiles-0123456789abcdef"
+        previous_cache_dir.mkdir(parents=True)
+        devices._load_profiles("aerox3")
+        assert os.listdir(str(profiles_cache / "rivalcfg")) == [
+            os.path.basename(devices.get_profiles_cache_dir())
+        ]
+
+
+class TestDiscoveryCache(object):
+    @pytest.fixture
+    def sysfs(self, tmp_path, monkeypatch):
+        device_path = tmp_path / "class" / "hidraw" / "hidraw0" / "device"
+        device_path.mkdir(parents=True)
+        (device_path / "uevent").write_text(
+            "HID_ID=0003:00001038:00001702\n"
+            "HID_NAME=SteelSeries Rival 100\n"
+            "HID_PHYS=usb-0000:00:14.0-2/input0\n"
+        )
+        monkeypatch.delenv("RIVALCFG_PROFILE", raising=False)
+        monkeypatch.delenv("RIVALCFG_HID_DISCOVERY", raising=False)
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+        monkeypatch.setattr(
+            usbhid, "SYSFS_HIDRAW_PATH", str(tmp_path / "class" / "hidraw")
+        )
+        return device_path
+
+    def test_first_plugged_device(self, sysfs):
+        device = devices.get_first_plugged_device()
+        assert device["product_id"] == 0x1702
+        assert device["path"] == b"/dev/hidraw0"
+        assert os.path.isfile(devices.get_discovery_cache_path())
+
+    def test_cached_device(self, sysfs, monkeypatch):
+        device = devices.get_first_plugged_device()
+
+        def _enumerate_interfaces(*args, **kwargs):
+            raise AssertionError("the bus should not be scanned")
+
+        monkeypatch.setattr(usbhid, "enumerate_interfaces", _enumerate_interfaces)
+        assert devices.get_first_plugged_device() == device
+
+    def test_unplugged_device(self, sysfs):
+        devices.get_first_plugged_device()
+        (sysfs / "uevent").unlink()
+        assert devices.get_first_plugged_device() is None
+
+    def test_replaced_device(self, sysfs):
+        devices.get_first_plugged_device()
+        (sysfs / "uevent").write_text(
+            "HID_ID=0003:00001038:00001710\n" "HID_PHYS=usb-0000:00:14.0-2/input0\n"
+        )
+        assert devices.get_first_plugged_device()["product_id"] == 0x1710
+
+    def test_corrupted_cache(self, sysfs):
+        devices.get_first_plugged_device()
+        with open(devices.get_discovery_cache_path(), "w") as file_:
+            file_.write("{")
+        assert devices.get_first_plugged_device()["product_id"] == 0x1702
+
+    def test_debug_profile(self, sysfs, monkeypatch):
+        monkeypatch.setenv("RIVALCFG_PROFILE", "1038:1710")
+        assert devices.get_first_plugged_device()["product_id"] == 0x1710
+        assert not os.path.exists(devices.get_discovery_cache_path())
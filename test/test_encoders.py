@@ -0,0 +1,231 @@
+import pytest
+
+from rivalcfg import encoders
+from rivalcfg import handlers
+from rivalcfg import helpers
+from rivalcfg import devices
+from rivalcfg import usbhid
+
+FAKE_PROFILE = {
+    "name": "Fake Mouse",
+    "vendor_id": 0x1038,
+    "product_id": 0xBAAD,
+    "endpoint": 2,
+    "settings": {
+        "setting1": {
+            "report_type": usbhid.HID_REPORT_TYPE_OUTPUT,
+            "command": [0xAA, 0xBB],
+            "value_type": None,
+        },
+        "setting2": {
+            "report_type": usbhid.HID_REPORT_TYPE_FEATURE,
+            "command": [0x11, 0x22],
+            "command_suffix": [0x33, 0x44],
+            "packet_length": 10,
+            "readback_length": 4,
+            "value_type": "choice",
+            "choices": {
+                "foo": 0x01,
+                42: 0x02,
+            },
+        },
+        "setting3": {
+            "report_type": usbhid.HID_REPORT_TYPE_OUTPUT,
+            "command": [0x20],
+            "value_type": "unknown_handler",
+        },
+    },
+}
+
+
+class TestSettingEncoder(object):
+    def test_setting_without_value(self):
+        encoder = encoders.SettingEncoder(FAKE_PROFILE, "setting1")
+        assert encoder.encode() == [0xAA, 0xBB]
+        assert encoder.handler_name is None
+        assert encoder.packet_length == 0
+        assert encoder.readback_length == 0
+
+    def test_setting_with_value(self):
+        encoder = encoders.SettingEncoder(FAKE_PROFILE, "setting2")
+        assert encoder.encode("foo") == [0x11, 0x22, 0x01, 0x33, 0x44]
+        assert encoder.encode(42) == [0x11, 0x22, 0x02, 0x33, 0x44]
+        assert encoder.report_type == usbhid.HID_REPORT_TYPE_FEATURE
+        assert encoder.packet_length == 10
+        assert encoder.readback_length == 4
+
+    def test_invalid_value(self):
+        encoder = encoders.SettingEncoder(FAKE_PROFILE, "setting2")
+        with pytest.raises(ValueError):
+            encoder.encode("bar")
+
+    def test_unknown_handler(self):
+        with pytest.raises(handlers.UnknownHandler) as excinfo:
+            encoders.SettingEncoder(FAKE_PROFILE, "setting3")
+        assert "'setting3' setting of the Fake Mouse" in str(excinfo.value)
+        assert excinfo.value.__suppress_context__
+
+
+class TestEncodeReport(object):
+    def test_report(self):
+        encoder = encoders.SettingEncoder(FAKE_PROFILE, "setting2")
+        report = encoder.encode_report(None, "foo")
+        assert bytes(report) == b"\x00\x11\x22\x01\x33\x44" + b"\x00" * 5
+
+    def test_report_without_value(self):
+        encoder = encoders.SettingEncoder(FAKE_PROFILE, "setting1")
+        assert bytes(encoder.encode_report(None)) == b"\x00\xaa\xbb"
+
+    def test_buffer_reused(self):
+        encoder = encoders.SettingEncoder(FAKE_PROFILE, "setting2")
+        report = encoder.encode_report(None, "foo")
+        report2 = encoder.encode_report(report.obj, 42)
+        assert report2.obj is report.obj
+        assert bytes(report2) == b"\x00\x11\x22\x02\x33\x44" + b"\x00" * 5
+
+    def test_buffer_too_small(self):
+        encoder = encoders.SettingEncoder(FAKE_PROFILE, "setting2")
+        buffer = bytearray(2)
+        report = encoder.encode_report(buffer, "foo")
+        assert report.obj is not buffer
+        assert len(buffer) == 2
+
+    def test_report_written_in_place(self):
+        profile = devices.get_profile(vendor_id=0x1038, product_id=0x1720)
+        encoder = encoders.SettingEncoder(profile, "logo_color")
+        report = encoder.encode_report(None, "red")
+        assert list(report) == [0x00] + encoder.encode("red")
+        report2 = encoder.encode_report(
+            report.obj,
+            "rgbgradient(duration=1000; colors=0%: red, 50%: blue, 75%: lime)",
+        )
+        assert report2.obj is report.obj
+        assert list(report2) == [0x00] + encoder.encode(
+            "rgbgradient(duration=1000; colors=0%: red, 50%: blue, 75%: lime)"
+        )
+
+
+class Test_get_encoder(object):
+    def test_encoder_is_reused(self):
+        encoder = encoders.get_encoder(FAKE_PROFILE, "setting2")
+        assert encoders.get_encoder(FAKE_PROFILE, "setting2") is encoder
+
+    def test_encoder_per_profile(self):
+        profile = dict(FAKE_PROFILE)
+        encoder = encoders.get_encoder(FAKE_PROFILE, "setting2")
+        assert encoders.get_encoder(profile, "setting2") is not encoder
+
+
+class TestDefaultValues(object):
+    @pytest.mark.parametrize(
+        "profile",
+        devices.PROFILES.values(),
+        ids=[profile["name"] for profile in devices.PROFILES.values()],
+    )
+    def test_same_as_handlers(self, profile):
+        for setting_name, setting_info in profile["settings"].items():
+            if setting_info.get("value_type") in (None, "none"):
+                continue
+            handler = getattr(handlers, setting_info["value_type"])
+            expected = helpers.merge_bytes(
+                setting_info["command"],
+                handler.process_value(setting_info, setting_info["default"]),
+                setting_info.get("command_suffix", []),
+            )
+            encoder = encoders.get_encoder(profile, setting_name)
+            assert encoder.encode(setting_info["default"]) == expected
+
+
+class TestEncodingCache(object):
+    def test_lru_eviction(self):
+        cache = encoders.EncodingCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert len(cache) == 2
+
+    def test_counters(self):
+        cache = encoders.EncodingCache()
+        cache.get("a")
+        cache.put("a", 1)
+        cache.get("a")
+        cache.get("a")
+        assert (cache.hits, cache.misses) == (2, 1)
+        cache.clear()
+        assert (cache.hits, cache.misses, len(cache)) == (0, 0, 0)
+
+    def test_disabled(self):
+        cache = encoders.EncodingCache(maxsize=0)
+        cache.put("a", 1)
+        assert cache.get("a") is None
+
+    def test_invalidate(self):
+        cache = encoders.EncodingCache()
+        profile, other_profile = {}, {}
+        cache.put((id(profile), "setting", "list", ()), 1)
+        cache.put((id(other_profile), "setting", "list", ()), 2)
+        cache.invalidate(profile)
+        assert cache.get((id(profile), "setting", "list", ())) is None
+        assert cache.get((id(other_profile), "setting", "list", ())) == 2
+
+
+class TestEncoderCache(object):
+    GRADIENT = "rgbgradient(duration=1000; colors=0%: red, 50%: blue, 75%: lime)"
+
+    @pytest.fixture
+    def profile(self):
+        profile = devices.get_profile(vendor_id=0x1038, product_id=0x1720)
+        encoders.invalidate(profile)
+        encoders.ENCODING_CACHE.clear()
+        yield profile
+        encoders.invalidate(profile)
+
+    @pytest.fixture
+    def write_value_calls(self, monkeypatch):
+        calls = []
+        write_value = handlers.rgbgradient.write_value
+
+        def _write_value(*args):
+            calls.append(args)
+            return write_value(*args)
+
+        monkeypatch.setattr(handlers.rgbgradient, "write_value", _write_value)
+        return calls
+
+    def test_report_cached(self, profile, write_value_calls):
+        encoder = encoders.get_encoder(profile, "logo_color")
+        report = bytes(encoder.encode_report(None, self.GRADIENT))
+        assert bytes(encoder.encode_report(None, self.GRADIENT)) == report
+        assert len(write_value_calls) == 1
+        assert encoders.ENCODING_CACHE.hits == 1
+        assert encoders.ENCODING_CACHE.misses == 1
+
+    def test_list_cached(self, profile):
+        encoder = encoders.get_encoder(profile, "logo_color")
+        data = encoder.encode((255, 0, 0))
+        assert encoder.encode([255, 0, 0]) == data
+        assert encoders.ENCODING_CACHE.hits == 1
+
+    def test_compiled_handlers_not_cached(self, profile):
+        encoder = encoders.SettingEncoder(FAKE_PROFILE, "setting2")
+        encoder.encode("foo")
+        encoder.encode("foo")
+        assert len(encoders.ENCODING_CACHE) == 0
+
+    def test_errors_not_cached(self, profile):
+        encoder = encoders.get_encoder(profile, "logo_color")
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                encoder.encode("not a color")
+        assert len(encoders.ENCODING_CACHE) == 0
+
+    def test_invalidate(self, profile):
+        encoder = encoders.get_encoder(profile, "logo_color")
+        encoder.encode("red")
+        encoders.invalidate(profile)
+        assert len(encoders.ENCODING_CACHE) == 0
+        assert encoders.get_encoder(profile, "logo_color") is not encoder
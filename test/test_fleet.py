@@ -0,0 +1,264 @@
+import os
+import json
+import time
+
+import pytest
+
+from rivalcfg import fleet
+from rivalcfg import usbhid
+
+#: Simulated interfaces: three Rival 100 on the hub 1-2, one on the hub 1-3,
+#: and a Rival 300 on the root hub of the bus 2.
+SIMULATED_INTERFACES = [
+    {
+        "path": b"1-2.1:1.0",
+        "vendor_id": 0x1038,
+        "product_id": 0x1702,
+        "interface_number": 0,
+    },
+    {
+        "path": b"1-2.1:1.1",
+        "vendor_id": 0x1038,
+        "product_id": 0x1702,
+        "interface_number": 1,
+    },
+    {
+        "path": b"1-2.2:1.0",
+        "vendor_id": 0x1038,
+        "product_id": 0x1702,
+        "interface_number": 0,
+    },
+    {
+        "path": b"1-2.3:1.0",
+        "vendor_id": 0x1038,
+        "product_id": 0x1702,
+        "interface_number": 0,
+    },
+    {
+        "path": b"1-2.3:1.0",
+        "vendor_id": 0x1038,
+        "product_id": 0x1702,
+        "interface_number": 0,
+    },
+    {
+        "path": b"1-3.1:1.0",
+        "vendor_id": 0x1038,
+        "product_id": 0x1702,
+        "interface_number": 0,
+    },
+    {
+        "path": b"2-1:1.0",
+        "vendor_id": 0x1038,
+        "product_id": 0x1710,
+        "interface_number": 0,
+    },
+    {
+        "path": b"2-4:1.0",
+        "vendor_id": 0x1038,
+        "product_id": 0xBAAD,
+        "interface_number": 0,
+    },
+]
+
+
+def _simulated_enumerate_interfaces(vendor_id=0, product_id=0):
+    return [
+        interface
+        for interface in SIMULATED_INTERFACES
+        if interface["vendor_id"] == vendor_id
+    ]
+
+
+def _recording_target(device, settings):
+    """Records the time the device was configured in the given directory."""
+    start = time.monotonic()
+    time.sleep(settings["duration"])
+    name = device["path"].decode().replace(":", "_")
+    with open(os.path.join(settings["directory"], name), "w") as file_:
+        json.dump([device["hub"], start, time.monotonic()], file_)
+
+
+def _flaky_target(device, settings):
+    """Fails the first time each device is configured."""
+    marker = os.path.join(settings["directory"], device["path"].decode())
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        raise IOError("device not ready")
+
+
+def _failing_target(device, settings):
+    raise IOError("device not ready")
+
+
+def _hanging_target(device, settings):
+    time.sleep(60)
+
+
+def _crashing_target(device, settings):
+    os._exit(3)
+
+
+@pytest.fixture
+def simulated_devices(monkeypatch):
+    monkeypatch.setattr(usbhid, "enumerate_interfaces", _simulated_enumerate_interfaces)
+    return fleet.discover_devices()
+
+
+def _max_concurrency(intervals):
+    events = sorted(
+        [(start, 1) for start, _ in intervals] + [(end, -1) for _, end in intervals]
+    )
+    current = maximum = 0
+    for _, delta in events:
+        current += delta
+        maximum = max(maximum, current)
+    return maximum
+
+
+class TestGetHub(object):
+    def test_hub(self):
+        assert fleet.get_hub("1-2.3.4") == "1-2.3"
+
+    def test_root_hub(self):
+        assert fleet.get_hub("3-1") == "3"
+
+    def test_unknown(self):
+        assert fleet.get_hub(None) is None
+
+
+class TestDiscoverDevices(object):
+    def test_lists_every_device(self, simulated_devices):
+        assert [device["path"] for device in simulated_devices] == [
+            b"1-2.1:1.0",
+            b"1-2.2:1.0",
+            b"1-2.3:1.0",
+            b"1-3.1:1.0",
+            b"2-1:1.0",
+        ]
+
+    def test_hubs(self, simulated_devices):
+        assert [device["hub"] for device in simulated_devices] == [
+            "1-2",
+            "1-2",
+            "1-2",
+            "1-3",
+            "2",
+        ]
+
+    def test_device_info(self, simulated_devices):
+        assert simulated_devices[4]["name"] == "SteelSeries Rival 300"
+        assert simulated_devices[4]["product_id"] == 0x1710
+
+
+class TestRunFleet(object):
+    def _settings(self, devices_, **settings):
+        return {
+            (device["vendor_id"], device["product_id"]): settings for device in devices_
+        }
+
+    def test_provision(self, simulated_devices, tmp_path):
+        results = fleet.run_fleet(
+            simulated_devices,
+            self._settings(simulated_devices, directory=str(tmp_path), duration=0),
+            target=_recording_target,
+        )
+        assert len(os.listdir(str(tmp_path))) == 5
+        assert [result["status"] for result in results] == ["ok"] * 5
+        assert [result["attempts"] for result in results] == [1] * 5
+        assert results[0]["path"] == "1-2.1:1.0"
+        json.dumps(results)
+
+    def test_concurrency_limits(self, simulated_devices, tmp_path):
+        fleet.run_fleet(
+            simulated_devices,
+            self._settings(simulated_devices, directory=str(tmp_path), duration=0.3),
+            jobs=3,
+            per_hub=1,
+            target=_recording_target,
+        )
+        records = []
+        for name in os.listdir(str(tmp_path)):
+            with open(os.path.join(str(tmp_path), name)) as file_:
+                records.append(json.load(file_))
+        assert _max_concurrency([(start, end) for _, start, end in records]) <= 3
+        assert (
+            _max_concurrency(
+                [(start, end) for hub, start, end in records if hub == "1-2"]
+            )
+            == 1
+        )
+
+    def test_retry(self, simulated_devices, tmp_path):
+        results = fleet.run_fleet(
+            simulated_devices,
+            self._settings(simulated_devices, directory=str(tmp_path)),
+            target=_flaky_target,
+        )
+        assert [result["status"] for result in results] == ["ok"] * 5
+        assert [result["attempts"] for result in results] == [2] * 5
+        assert results[0]["errors"] == ["OSError: device not ready"]
+
+    def test_error(self, simulated_devices):
+        results = fleet.run_fleet(
+            simulated_devices[:1],
+            self._settings(simulated_devices),
+            retries=1,
+            target=_failing_target,
+        )
+        assert results[0]["status"] == "error"
+        assert results[0]["attempts"] == 2
+        assert len(results[0]["errors"]) == 2
+
+    def test_timeout(self, simulated_devices):
+        start = time.monotonic()
+        results = fleet.run_fleet(
+            simulated_devices[:2],
+            self._settings(simulated_devices),
+            retries=0,
+            timeout=0.2,
+            target=_hanging_target,
+        )
+        assert time.monotonic() - start < 5
+        assert [result["status"] for result in results] == ["timeout"] * 2
+        assert results[0]["errors"] == ["Timed out after 0.2 s"]
+
+    def test_crash(self, simulated_devices):
+        results = fleet.run_fleet(
+            simulated_devices[:1],
+            self._settings(simulated_devices),
+            retries=0,
+            target=_crashing_target,
+        )
+        assert results[0]["status"] == "error"
+        assert results[0]["errors"] == ["The process exited with code 3"]
+
+    def test_invalid_limits(self):
+        with pytest.raises(ValueError):
+            fleet.run_fleet([], {}, jobs=0)
+
+
+class TestMain(object):
+    def test_provision(self, simulated_devices, monkeypatch, tmp_path, capsys):
+        monkeypatch.setenv("RIVALCFG_DRY", "1")
+        monkeypatch.setattr(fleet, "discover_devices", lambda: simulated_devices)
+        summary_path = str(tmp_path / "summary.json")
+        exit_code = fleet.main(
+            ["--summary", summary_path, "--", "--polling-rate", "500", "--no-save"]
+        )
+        assert exit_code == 0
+        results = json.loads(capsys.readouterr().out)
+        assert len(results) == 5
+        assert all(result["status"] == "ok" for result in results)
+        with open(summary_path) as file_:
+            assert json.load(file_) == results
+
+    def test_invalid_setting(self, simulated_devices, monkeypatch):
+        monkeypatch.setattr(fleet, "discover_devices", lambda: simulated_devices)
+        # The Rival 300 has no --color option
+        with pytest.raises(SystemExit):
+            fleet.main(["--", "--color", "red"])
+
+    def test_no_device(self, monkeypatch, capsys):
+        monkeypatch.setattr(fleet, "discover_devices", lambda: [])
+        assert fleet.main([]) == 1
+        assert "No supported device found" in capsys.readouterr().out
@@ -0,0 +1,82 @@
+import sys
+import subprocess
+import importlib.metadata
+
+import pytest
+
+from rivalcfg import handlers
+from rivalcfg.handlers import choice
+from rivalcfg.handlers import rgbcolor
+
+
+def _entry_point(name, value):
+    return importlib.metadata.EntryPoint(
+        name=name, value=value, group=handlers.ENTRY_POINTS_GROUP
+    )
+
+
+@pytest.fixture
+def plugins(monkeypatch):
+    entry_points = [
+        _entry_point("my_led_protocol", "rivalcfg.handlers.rgbcolor"),
+        # Built-in handlers cannot be overridden
+        _entry_point("choice", "rivalcfg.handlers.rgbcolor"),
+    ]
+
+    def _entry_points(group):
+        assert group == "rivalcfg.handlers"
+        return entry_points
+
+    monkeypatch.setattr(importlib.metadata, "entry_points", _entry_points)
+    monkeypatch.setattr(handlers, "_entry_points", None)
+    monkeypatch.setattr(handlers, "_plugin_handlers", {})
+
+
+class TestGetHandler(object):
+    def test_builtin_handler(self):
+        assert handlers.get_handler("choice") is choice
+
+    def test_buttons_handler(self):
+        handler = handlers.get_handler("buttons")
+        assert hasattr(handler, "process_value")
+        assert hasattr(handler, "add_cli_option")
+
+    def test_unknown_handler(self, plugins):
+        with pytest.raises(handlers.UnknownHandler):
+            handlers.get_handler("foobar")
+
+    def test_plugin_handler(self, plugins):
+        assert handlers.get_handler("my_led_protocol") is rgbcolor
+
+    def test_builtin_handlers_not_overridden(self, plugins):
+        assert handlers.get_handler("choice") is choice
+
+    def test_handlers_loaded_lazily(self):
+        code = (
+            "import sys\n"
+            "from rivalcfg import handlers\n"
+            "handlers.get_handler('choice')\n"
+            "print(sorted(m for m in sys.modules if m.startswith('rivalcfg.handlers.')))\n"
+            "print('importlib.metadata' in sys.modules)\n"
+        )
+        output = subprocess.check_output([sys.executable, "-c", code])
+        assert output.decode().split() == ["['rivalcfg.handlers.choice']", "False"]
+
+
+class TestListHandlers(object):
+    def test_list_handlers(self, plugins):
+        handlers_list = handlers.list_handlers()
+        assert handlers_list == sorted(handlers_list)
+        assert "buttons" in handlers_list
+        assert "my_led_protocol" in handlers_list
+        assert handlers_list.count("choice") == 1
+
+
+class TestModuleAttributes(object):
+    def test_handler_attribute(self):
+        assert handlers.rgbcolor is rgbcolor
+        assert hasattr(handlers.buttons, "process_value")
+
+    def test_unknown_attribute(self):
+        with pytest.raises(AttributeError):
+            handlers.foobar
@@ -0,0 +1,226 @@
+import os
+import time
+import threading
+import subprocess
+import sys
+
+import pytest
+
+from rivalcfg import mouse
+from rivalcfg import usbhid
+from rivalcfg import locking
+
+
+@pytest.fixture(autouse=True)
+def system_lock_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(locking, "SYSTEM_LOCK_DIR", str(tmp_path))
+
+
+@pytest.fixture
+def lock_path():
+    return locking.get_lock_path(0x1038, 0x1702, 0, b"/dev/hidraw3")
+
+
+def _make_lock_dir(lock_path, mode=0o1777):
+    os.makedirs(os.path.dirname(lock_path))
+    os.chmod(os.path.dirname(lock_path), mode)
+
+
+class TestGetLockPath(object):
+    def test_lock_path_from_device_path(self, tmp_path):
+        assert locking.get_lock_path(0x1038, 0x1702, 0, b"/dev/hidraw3") == str(
+            tmp_path / "rivalcfg" / "dev_hidraw3.lock"
+        )
+
+    def test_lock_path_from_usb_port(self, monkeypatch):
+        # The hidraw and the libusb paths of a same device give the same lock
+        monkeypatch.setattr(
+            usbhid,
+            "get_usb_port_path",
+            lambda path: "1-2.3" if path in (b"/dev/hidraw3", b"1-2.3:1.0") else None,
+        )
+        assert locking.get_lock_path(
+            0x1038, 0x1702, 0, b"/dev/hidraw3"
+        ) == locking.get_lock_path(0x1038, 0x1702, 0, b"1-2.3:1.0")
+
+    def test_lock_dir_is_shared(self, tmp_path, monkeypatch):
+        assert locking.get_lock_dir() == str(tmp_path / "rivalcfg")
+        monkeypatch.setattr(locking, "SYSTEM_LOCK_DIR", str(tmp_path / "nothing"))
+        assert "XDG_RUNTIME_DIR" not in locking.get_lock_dir()
+        assert str(os.getuid()) not in os.path.basename(locking.get_lock_dir())
+
+    def test_lock_path_without_device_path(self, tmp_path):
+        assert locking.get_lock_path(0x1038, 0x1702, 0) == str(
+            tmp_path / "rivalcfg" / "1038_1702_00.lock"
+        )
+
+
+class TestDeviceLock(object):
+    def test_lock_dir_can_be_written_by_all_users(self, lock_path):
+        with locking.DeviceLock(lock_path):
+            pass
+        assert os.stat(os.path.dirname(lock_path)).st_mode & 0o7777 == 0o1777
+        assert os.stat("%s.queue" % lock_path).st_mode & 0o777 == 0o777
+
+    def test_lock_file_symlink_not_followed(self, lock_path, tmp_path):
+        target = tmp_path / "secret"
+        target.write_text("secret")
+        target.chmod(0o600)
+        _make_lock_dir(lock_path)
+        os.symlink(str(target), lock_path)
+        with pytest.raises(locking.UnsafeLock):
+            locking.DeviceLock(lock_path).acquire(timeout=0.05)
+        assert target.read_text() == "secret"
+        assert target.stat().st_mode & 0o777 == 0o600
+
+    def test_lock_dir_symlink_refused(self, lock_path, tmp_path):
+        (tmp_path / "elsewhere").mkdir(mode=0o1777)
+        os.symlink(str(tmp_path / "elsewhere"), os.path.dirname(lock_path))
+        with pytest.raises(locking.UnsafeLock):
+            locking.DeviceLock(lock_path).acquire(timeout=0.05)
+        assert os.listdir(str(tmp_path / "elsewhere")) == []
+
+    def test_lock_dir_without_sticky_bit_refused(self, lock_path):
+        _make_lock_dir(lock_path, 0o777)
+        with pytest.raises(locking.UnsafeLock):
+            locking.DeviceLock(lock_path).acquire(timeout=0.05)
+
+    @pytest.mark.skipif(os.getuid() != 0, reason="requires root")
+    def test_lock_dir_of_another_user_refused(self, lock_path):
+        _make_lock_dir(lock_path)
+        os.chown(os.path.dirname(lock_path), 12345, 12345)
+        with pytest.raises(locking.UnsafeLock):
+            locking.DeviceLock(lock_path).acquire(timeout=0.05)
+
+    def test_queue_symlink_refused(self, lock_path, tmp_path):
+        (tmp_path / "elsewhere").mkdir()
+        (tmp_path / "elsewhere" / "file").write_text("foo")
+        _make_lock_dir(lock_path)
+        os.symlink(str(tmp_path / "elsewhere"), "%s.queue" % lock_path)
+        with pytest.raises(locking.UnsafeLock):
+            locking.DeviceLock(lock_path).acquire(timeout=0.05)
+        assert os.listdir(str(tmp_path / "elsewhere")) == ["file"]
+
+    @pytest.mark.skipif(os.getuid() == 0, reason="root can write any file")
+    def test_read_only_lock_file(self, lock_path):
+        lock = locking.DeviceLock(lock_path)
+        lock.acquire()
+        lock.release(time.monotonic())
+        os.chmod(lock_path, 0o444)
+        lock.acquire()
+        # The time cannot be written, but it can still be read
+        assert lock.last_command_time is not None
+        lock.release(time.monotonic())
+        lock.acquire()
+        assert lock.last_command_time is not None
+        lock.release()
+
+    def test_acquire_release(self, lock_path):
+        lock = locking.DeviceLock(lock_path)
+        assert not lock.is_locked
+        lock.acquire()
+        assert lock.is_locked
+        lock.release()
+        assert not lock.is_locked
+
+    def test_exclusive(self, lock_path):
+        with locking.DeviceLock(lock_path):
+            with pytest.raises(locking.LockTimeout):
+                locking.DeviceLock(lock_path).acquire(timeout=0.05)
+        with locking.DeviceLock(lock_path) as lock:
+            assert lock.is_locked
+
+    def test_fair_queueing(self, lock_path):
+        order = []
+        holder = locking.DeviceLock(lock_path)
+        holder.acquire()
+
+        def _waiter(name):
+            with locking.DeviceLock(lock_path, poll_interval=0.001):
+                order.append(name)
+                time.sleep(0.01)
+
+        threads = []
+        for name in ["a", "b", "c", "d"]:
+            thread = threading.Thread(target=_waiter, args=(name,))
+            thread.start()
+            threads.append(thread)
+            time.sleep(0.02)
+
+        holder.release()
+        for thread in threads:
+            thread.join()
+
+        assert order == ["a", "b", "c", "d"]
+
+    def test_ticket_of_dead_process(self, lock_path):
+        process = subprocess.Popen([sys.executable, "-c", "pass"])
+        process.wait()
+        _make_lock_dir(lock_path)
+        os.makedirs("%s.queue" % lock_path)
+        open(
+            os.path.join("%s.queue" % lock_path, "%020d-%d-x" % (0, process.pid)),
+            "w",
+        ).close()
+        lock = locking.DeviceLock(lock_path)
+        lock.acquire(timeout=1)
+        assert lock.is_locked
+        assert os.listdir("%s.queue" % lock_path) == []
+        lock.release()
+
+    def test_last_command_time(self, lock_path):
+        lock = locking.DeviceLock(lock_path)
+        lock.acquire()
+        assert lock.last_command_time is None
+        last_command_time = time.monotonic()
+        lock.release(last_command_time)
+        lock.acquire()
+        assert abs(lock.last_command_time - last_command_time) < 0.01
+        lock.release()
+
+
+class TestMouseLock(object):
+    @pytest.fixture(autouse=True)
+    def dry(self, monkeypatch):
+        monkeypatch.setenv("RIVALCFG_DRY", "1")
+
+    def test_get_mouse_with_lock(self):
+        rival100 = mouse.get_mouse(0x1038, 0x1702, lock=True)
+        with pytest.raises(locking.LockTimeout):
+            mouse.get_mouse(0x1038, 0x1702, lock=True, lock_timeout=0.05)
+        rival100.close()
+        mouse.get_mouse(0x1038, 0x1702, lock=True, lock_timeout=0.05).close()
+
+    def test_pacing_across_sessions(self, monkeypatch):
+        monkeypatch.delenv("RIVALCFG_DEBUG_NO_COMMAND_DELAY", raising=False)
+        rival100 = mouse.get_mouse(0x1038, 0x1702, lock=True)
+        rival100.command_delay = 0.1
+        rival100.set_color("red")
+        rival100.close()
+        rival100 = mouse.get_mouse(0x1038, 0x1702, lock=True)
+        start = time.monotonic()
+        rival100.set_color("red")
+        assert time.monotonic() - start >= 0.02
+        rival100.close()
+
+    def test_lock_released_if_open_fails(self, monkeypatch):
+        def _open_device(*args, **kwargs):
+            raise IOError("cannot open the device")
+
+        with monkeypatch.context() as patch:
+            patch.setattr(mouse.usbhid, "open_device", _open_device)
+            with pytest.raises(IOError):
+                mouse.get_mouse(0x1038, 0x1702, lock=True)
+        mouse.get_mouse(0x1038, 0x1702, lock=True, lock_timeout=0.05).close()
+
+    def test_lock_released_if_calibration_fails(self, monkeypatch):
+        def _apply_calibrated_delay(mouse_):
+            raise IOError("cannot read the firmware version")
+
+        with monkeypatch.context() as patch:
+            patch.setattr(
+                mouse.calibration, "apply_calibrated_delay", _apply_calibrated_delay
+            )
+            with pytest.raises(IOError):
+                mouse.get_mouse(0x1038, 0x1702, lock=True)
+        mouse.get_mouse(0x1038, 0x1702, lock=True, lock_timeout=0.05).close()
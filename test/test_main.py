@@ -1,5 +1,6 @@
 import pytest
 
+from rivalcfg import __main__
 from rivalcfg.__main__ import main
 
 
@@ -27,6 +28,11 @@ class TestMainCLI(object):
         assert pytest_wrapped_e.type == SystemExit
         assert pytest_wrapped_e.value.code == 0
 
+    def test_print_fleet_help(self):
+        with pytest.raises(SystemExit) as pytest_wrapped_e:
+            main(["fleet", "--help"])
+        assert pytest_wrapped_e.value.code == 0
+
     def test_no_save(self, monkeypatch):
         monkeypatch.setenv("RIVALCFG_DRY", "1")
         monkeypatch.setenv("RIVALCFG_PROFILE", "1038:1702")
@@ -34,3 +40,48 @@ class TestMainCLI(object):
         main(["-r"])
         # just expecting to have no error here... to boring to monkeypatch
         # the module to check if realy work...
+
+
+class TestTwoPhaseCLI(object):
+    @pytest.fixture
+    def opened(self, monkeypatch):
+        monkeypatch.setenv("RIVALCFG_DRY", "1")
+        monkeypatch.setenv("RIVALCFG_PROFILE", "1038:1702")
+        opened = []
+        open_device = __main__._open_device
+
+        def _open_device(device, **kwargs):
+            opened.append(device["product_id"])
+            return open_device(device, **kwargs)
+
+        monkeypatch.setattr(__main__, "_open_device", _open_device)
+        return opened
+
+    def test_help_does_not_open_the_device(self, opened, capsys):
+        with pytest.raises(SystemExit) as pytest_wrapped_e:
+            main(["--help"])
+        assert pytest_wrapped_e.value.code == 0
+        assert "--color" in capsys.readouterr().out
+        assert opened == []
+
+    def test_invalid_option_does_not_open_the_device(self, opened):
+        with pytest.raises(SystemExit) as pytest_wrapped_e:
+            main(["--color", "not-a-color"])
+        assert pytest_wrapped_e.value.code == 2
+        assert opened == []
+
+    def test_main_options_do_not_look_for_the_device(self, monkeypatch):
+        def _get_first_plugged_device():
+            raise AssertionError("the device should not be looked for")
+
+        monkeypatch.setattr(
+            __main__, "_get_first_plugged_device", _get_first_plugged_device
+        )
+        for option in ["--version", "--list", "--print-udev"]:
+            with pytest.raises(SystemExit) as pytest_wrapped_e:
+                main([option])
+            assert pytest_wrapped_e.value.code == 0
+
+    def test_command_opens_the_device(self, opened):
+        main(["--color", "red"])
+        assert opened == [0x1702]
@@ -1,6 +1,15 @@
+import gc
+import copy
+import time
+import weakref
+import queue
+import threading
+
 import pytest
 
 from rivalcfg import mouse
+from rivalcfg import encoders
+from rivalcfg import mouse as mouse_module
 from rivalcfg import usbhid
 from rivalcfg import mouse_settings
 
@@ -108,6 +117,50 @@ FAKE_PROFILE2 = {
 }
 
 
+class EchoDevice(usbhid.FakeDevice):
+    """A fake device that answers to each command by echoing it, after the
+    given latency.
+    """
+
+    def __init__(self, latency=0):
+        usbhid.FakeDevice.__init__(self)
+        self.latency = latency
+        self.last_command = b""
+
+    def write(self, data):
+        usbhid.FakeDevice.write(self, data)
+        self.last_command = bytes(data[1:])
+
+    def read(self, max_length, timeout_ms=0):
+        time.sleep(self.latency)
+        return list(self.last_command.ljust(max_length, b"\x00"))
+
+
+class LateEchoDevice(usbhid.FakeDevice):
+    """A fake device that answers to each command by echoing it after the
+    given latency, in a separated thread.
+    """
+
+    def __init__(self, latency=0):
+        usbhid.FakeDevice.__init__(self)
+        self.latency = latency
+        self.reports = queue.Queue()
+
+    def write(self, data):
+        usbhid.FakeDevice.write(self, data)
+        report = list(bytes(data[1:]))
+        timer = threading.Timer(self.latency, self.reports.put, [report])
+        timer.daemon = True
+        timer.start()
+
+    def read(self, max_length, timeout_ms=0):
+        try:
+            report = self.reports.get(timeout=timeout_ms / 1000)
+        except queue.Empty:
+            return []
+        return (report + [0x00] * max_length)[:max_length]
+
+
 class TestGetMouse(object):
     def test_get_mouse_returns_mouse_instance_with_desired_profil(self, monkeypatch):
         monkeypatch.setenv("RIVALCFG_DRY", "1")
@@ -121,6 +174,28 @@ class TestGetMouse(object):
         assert rival100.mouse_profile["vendor_id"] == 0x1038
         assert rival100.mouse_profile["product_id"] == 0x1702
 
+    def test_get_mouse_from_pool(self, monkeypatch):
+        monkeypatch.setenv("RIVALCFG_DRY", "1")
+        pool = usbhid.DevicePool()
+        rival100 = mouse.get_mouse(product_id=0x1702, pool=pool)
+        hid_device = rival100._hid_device
+        rival100.close()
+        rival100 = mouse.get_mouse(product_id=0x1702, pool=pool)
+        assert rival100._hid_device is hid_device
+        assert len(pool) == 1
+        pool.close()
+
+    def test_get_mouse_settings_per_device(self, monkeypatch):
+        monkeypatch.setenv("RIVALCFG_DRY", "1")
+        rival100 = mouse.get_mouse(product_id=0x1702, path=b"1-2.3:1.0")
+        assert rival100.mouse_settings._packet_digests_path.endswith(
+            "1038_1702_usb-1-2.3.digests.json"
+        )
+        rival100 = mouse.get_mouse(product_id=0x1702, pool=usbhid.DevicePool())
+        assert rival100.mouse_settings._packet_digests_path.endswith(
+            "1038_1702_00_0000_0000.digests.json"
+        )
+
     def test_get_mouse_raise_error_if_no_product_id(self):
         with pytest.raises(ValueError):
             mouse.get_mouse()
@@ -218,6 +293,41 @@ class TestMouse(object):
         assert len(data) == 6
         assert data == b"\x02\x00\x00\x00\x00\x00"
 
+    def test_command_delay(self, mouse):
+        mouse.command_delay = 0.02
+        assert mouse.command_delay == 0.02
+
+    def test_command_delay_unsafe_value(self, mouse):
+        with pytest.raises(ValueError):
+            mouse.command_delay = 0
+
+    def test_no_delay_after_last_command(self, mouse, monkeypatch):
+        monkeypatch.delenv("RIVALCFG_DEBUG_NO_COMMAND_DELAY", raising=False)
+        mouse.command_delay = 0.2
+        start = time.monotonic()
+        mouse._hid_write()
+        assert time.monotonic() - start < 0.1
+
+    def test_delay_between_commands(self, mouse, monkeypatch):
+        monkeypatch.delenv("RIVALCFG_DEBUG_NO_COMMAND_DELAY", raising=False)
+        mouse.command_delay = 0.05
+        start = time.monotonic()
+        mouse._hid_write()
+        mouse._hid_write()
+        mouse._hid_write()
+        elapsed = time.monotonic() - start
+        assert elapsed >= 0.1
+        assert elapsed < 0.3
+
+    def test_elapsed_time_counts_in_delay(self, mouse, monkeypatch):
+        monkeypatch.delenv("RIVALCFG_DEBUG_NO_COMMAND_DELAY", raising=False)
+        mouse.command_delay = 0.05
+        mouse._hid_write()
+        time.sleep(0.05)
+        start = time.monotonic()
+        mouse._hid_write()
+        assert time.monotonic() - start < 0.025
+
     # Virtual methods dependent to the loaded profile
 
     def test_set_setting1_is_available(self, mouse):
@@ -278,3 +388,452 @@ class TestMouse(object):
         assert response is None
         response = mouse.set_setting6()
         assert response is None
+
+
+class TestAckFlowControl(object):
+    @pytest.fixture
+    def mouse_factory(self, monkeypatch):
+        monkeypatch.delenv("RIVALCFG_DEBUG_NO_COMMAND_DELAY", raising=False)
+
+        def _mouse_factory(profile, latency=0.005):
+            return mouse.Mouse(
+                EchoDevice(latency),
+                profile,
+                mouse_settings.FakeMouseSettings(0x1038, 0xBAAD, profile),
+                command_delay=0.1,
+            )
+
+        return _mouse_factory
+
+    def test_without_ack(self, mouse_factory):
+        mouse_ = mouse_factory(FAKE_PROFILE)
+        start = time.monotonic()
+        for _ in range(3):
+            mouse_.set_setting_readback()
+        assert time.monotonic() - start >= 0.2
+
+    def test_with_ack(self, mouse_factory):
+        profile = dict(FAKE_PROFILE, ack={"command_echo_length": 2})
+        mouse_ = mouse_factory(profile)
+        start = time.monotonic()
+        for _ in range(3):
+            mouse_.set_setting_readback()
+        assert time.monotonic() - start < 0.1
+
+    def test_with_wrong_ack(self, mouse_factory):
+        profile = dict(FAKE_PROFILE, ack={"command_echo_length": 2})
+        mouse_ = mouse_factory(profile)
+        mouse_._hid_device.read = lambda max_length, timeout_ms=0: [0x42] * max_length
+        start = time.monotonic()
+        for _ in range(3):
+            mouse_.set_setting_readback()
+        assert time.monotonic() - start >= 0.2
+
+    def test_slow_ack(self, mouse_factory):
+        profile = dict(FAKE_PROFILE, ack={"command_echo_length": 2})
+        mouse_ = mouse_factory(profile, latency=0.03)
+        start = time.monotonic()
+        for _ in range(3):
+            mouse_.set_setting_readback()
+        elapsed = time.monotonic() - start
+        assert elapsed >= 0.09
+        assert elapsed < 0.2
+
+
+class TestReportReader(object):
+    @pytest.fixture
+    def mouse(self):
+        profile = dict(FAKE_PROFILE, ack={"command_echo_length": 2})
+        profile["settings"] = dict(
+            FAKE_PROFILE["settings"],
+            other_readback={
+                "label": "Other setting with readback",
+                "description": "A setting with no value",
+                "cli": ["-9", "--setting9"],
+                "report_type": usbhid.HID_REPORT_TYPE_OUTPUT,
+                "command": [0x21, 0x30],
+                "value_type": "none",
+                "readback_length": 42,
+            },
+        )
+        mouse_ = mouse.Mouse(
+            LateEchoDevice(latency=0.25),
+            profile,
+            mouse_settings.FakeMouseSettings(0x1038, 0xBAAD, profile),
+        )
+        mouse_.no_response_cooldown = 0
+        mouse_.start_report_reader()
+        yield mouse_
+        mouse_.close()
+
+    def test_late_response_not_paired_with_next_command(self, mouse):
+        # The response to the first command arrives after the timeout...
+        assert mouse.set_setting_readback() == []
+        # ... and before the response to the next command
+        mouse._hid_device.latency = 0.1
+        response = mouse.set_other_readback()
+        assert response[:2] == [0x21, 0x30]
+        assert len(response) == 42
+
+    def test_stop_report_reader(self, mouse):
+        mouse.stop_report_reader()
+        assert mouse._report_reader is None
+
+
+class TestResponseTimeout(object):
+    @pytest.fixture
+    def mouse(self):
+        profile = dict(
+            FAKE_PROFILE,
+            battery_level={
+                "report_type": usbhid.HID_REPORT_TYPE_OUTPUT,
+                "command": [0x42, 0x01],
+                "response_length": 3,
+                "level": lambda data: int(data[0]),
+            },
+        )
+        return mouse.Mouse(
+            LateEchoDevice(latency=1),
+            profile,
+            mouse_settings.FakeMouseSettings(0x1038, 0xBAAD, profile),
+        )
+
+    def test_default_timeout(self, mouse):
+        assert mouse.response_timeout_ms == mouse_module.DEFAULT_RESPONSE_TIMEOUT_MS
+
+    def test_profile_timeout(self, mouse):
+        mouse.mouse_profile["response_timeout_ms"] = 20
+        assert mouse.response_timeout_ms == 20
+
+    def test_session_timeout(self, mouse):
+        mouse.mouse_profile["response_timeout_ms"] = 20
+        mouse.response_timeout_ms = 10
+        assert mouse.response_timeout_ms == 10
+
+    def test_no_response_cooldown(self, mouse):
+        mouse.response_timeout_ms = 50
+        start = time.monotonic()
+        assert mouse.battery == {"is_charging": None, "level": None}
+        assert time.monotonic() - start >= 0.05
+        mouse._hid_device.bytes.seek(0)
+        mouse._hid_device.bytes.truncate()
+        start = time.monotonic()
+        assert mouse.battery == {"is_charging": None, "level": None}
+        assert mouse.set_setting_readback() == []
+        assert time.monotonic() - start < 0.02
+        # The battery request is not even sent
+        mouse._hid_device.bytes.seek(0)
+        assert b"\x42\x01" not in mouse._hid_device.bytes.read()
+
+    def test_no_response_cooldown_expires(self, mouse):
+        mouse.response_timeout_ms = 10
+        mouse.no_response_cooldown = 0.05
+        mouse.battery
+        time.sleep(0.05)
+        mouse._hid_device.latency = 0
+        assert mouse.battery["level"] == 0x42
+
+    def test_no_response_cooldown_shared(self, mouse, monkeypatch, tmp_path):
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+        profile = mouse.mouse_profile
+        mouse.mouse_settings = mouse_settings.MouseSettings(
+            0x1038, 0xBAAD, profile, device_id="usb-1-2"
+        )
+        mouse.response_timeout_ms = 50
+        mouse.battery
+        # Another process
+        mouse2 = mouse_module.Mouse(
+            LateEchoDevice(latency=1),
+            profile,
+            mouse_settings.MouseSettings(0x1038, 0xBAAD, profile, device_id="usb-1-2"),
+        )
+        start = time.monotonic()
+        assert mouse2.battery == {"is_charging": None, "level": None}
+        assert time.monotonic() - start < 0.02
+
+    def test_late_responses_discarded(self, mouse):
+        mouse._hid_device.latency = 0.02
+        mouse.mouse_settings.set_no_response_until(time.time() + 0.05)
+        # Skipped, but the device answers anyway
+        assert mouse.set_setting_readback() == []
+        time.sleep(0.1)
+        mouse._hid_device.latency = 0
+        # Not taken as the response to the battery request
+        assert mouse.battery["level"] == 0x42
+
+    def test_late_response_after_timeout_discarded(self, mouse):
+        mouse.response_timeout_ms = 10
+        mouse.no_response_cooldown = 0
+        mouse._hid_device.latency = 0.02
+        assert mouse.set_setting_readback() == []
+        time.sleep(0.05)
+        mouse._hid_device.latency = 0
+        assert mouse.battery["level"] == 0x42
+
+    def test_no_response_cooldown_disabled(self, mouse):
+        mouse.response_timeout_ms = 10
+        mouse.no_response_cooldown = 0
+        mouse.battery
+        mouse._hid_device.latency = 0
+        assert mouse.battery["level"] == 0x42
+
+
+class TestBatch(object):
+    @pytest.fixture
+    def mouse(self, monkeypatch):
+        return mouse.Mouse(
+            usbhid.FakeDevice(),
+            FAKE_PROFILE,
+            mouse_settings.FakeMouseSettings(0x1038, 0xBAAD, FAKE_PROFILE),
+        )
+
+    def _read_reports(self, mouse):
+        mouse._hid_device.bytes.seek(0)
+        return mouse._hid_device.bytes.read()
+
+    def test_nothing_sent_before_exit(self, mouse):
+        with mouse.batch():
+            assert mouse.set_setting2("foo") is None
+            assert self._read_reports(mouse) == b""
+        assert self._read_reports(mouse) == b"\x02\x00\xcc\x01"
+
+    def test_last_value_wins(self, mouse):
+        with mouse.batch():
+            mouse.set_setting2("foo")
+            mouse.set_setting2("bar")
+        assert self._read_reports(mouse) == b"\x02\x00\xcc\x02"
+        assert mouse.mouse_settings.get("setting2") == "bar"
+
+    def test_order_of_first_changes(self, mouse):
+        with mouse.batch():
+            mouse.set_setting2("foo")
+            mouse.set_setting1()
+            mouse.set_setting2("bar")
+        assert self._read_reports(mouse) == b"\x02\x00\xcc\x02\x02\x00\xaa\xbb"
+
+    def test_invalid_value_raises_immediately(self, mouse):
+        with pytest.raises(ValueError):
+            with mouse.batch():
+                mouse.set_setting1()
+                mouse.set_setting2("invalid")
+        assert self._read_reports(mouse) == b""
+
+    def test_exception_discards_changes(self, mouse):
+        with pytest.raises(RuntimeError):
+            with mouse.batch():
+                mouse.set_setting2("foo")
+                raise RuntimeError()
+        assert self._read_reports(mouse) == b""
+        mouse.set_setting1()
+        assert self._read_reports(mouse) == b"\x02\x00\xaa\xbb"
+
+    def test_save(self, mouse):
+        with mouse.batch(save=True):
+            mouse.set_setting2("foo")
+        assert self._read_reports(mouse) == b"\x02\x00\xcc\x01\x02\x00\x5a\x0e"
+
+    def test_save_inside_batch(self, mouse):
+        with mouse.batch():
+            mouse.save()
+            mouse.set_setting2("foo")
+            mouse.save()
+        assert self._read_reports(mouse) == b"\x02\x00\xcc\x01\x02\x00\x5a\x0e"
+
+    def test_nested_batch(self, mouse):
+        with mouse.batch():
+            with mouse.batch():
+                mouse.set_setting2("foo")
+            assert self._read_reports(mouse) == b""
+            mouse.set_setting2("bar")
+        assert self._read_reports(mouse) == b"\x02\x00\xcc\x02"
+
+
+class TestSkipUnchanged(object):
+    @pytest.fixture
+    def mouse(self, monkeypatch):
+        mouse_ = mouse.Mouse(
+            usbhid.FakeDevice(),
+            FAKE_PROFILE,
+            mouse_settings.FakeMouseSettings(0x1038, 0xBAAD, FAKE_PROFILE),
+        )
+        mouse_.skip_unchanged = True
+        return mouse_
+
+    def _read_reports(self, mouse):
+        mouse._hid_device.bytes.seek(0)
+        reports = mouse._hid_device.bytes.read()
+        mouse._hid_device.bytes.seek(0)
+        mouse._hid_device.bytes.truncate()
+        return reports
+
+    def test_unchanged_setting_is_skipped(self, mouse):
+        mouse.set_setting2("foo")
+        assert self._read_reports(mouse) == b"\x02\x00\xcc\x01"
+        mouse.set_setting2("foo")
+        assert self._read_reports(mouse) == b""
+
+    def test_changed_setting_is_sent(self, mouse):
+        mouse.set_setting2("foo")
+        self._read_reports(mouse)
+        mouse.set_setting2("bar")
+        assert self._read_reports(mouse) == b"\x02\x00\xcc\x02"
+        assert mouse.mouse_settings.get("setting2") == "bar"
+
+    def test_force(self, mouse):
+        mouse.set_setting2("foo")
+        self._read_reports(mouse)
+        mouse.set_setting2("foo", force=True)
+        assert self._read_reports(mouse) == b"\x02\x00\xcc\x01"
+
+    def test_disabled(self, mouse):
+        mouse.skip_unchanged = False
+        mouse.set_setting2("foo")
+        self._read_reports(mouse)
+        mouse.set_setting2("foo")
+        assert self._read_reports(mouse) == b"\x02\x00\xcc\x01"
+
+    def test_settings_without_value_are_always_sent(self, mouse):
+        mouse.set_setting1()
+        mouse.set_setting1()
+        assert self._read_reports(mouse) == b"\x02\x00\xaa\xbb" * 2
+
+    def test_reset_settings(self, mouse):
+        mouse.reset_settings()
+        self._read_reports(mouse)
+        mouse.reset_settings()
+        reports = self._read_reports(mouse)
+        assert b"\x02\x00\xcc\x02" not in reports  # setting2
+        assert b"\x02\x00\xaa\xbb" in reports  # setting1
+        mouse.reset_settings(force=True)
+        assert b"\x02\x00\xcc\x02" in self._read_reports(mouse)
+
+    def test_save_skipped_when_nothing_changed(self, mouse):
+        mouse.set_setting2("foo")
+        mouse.save()
+        self._read_reports(mouse)
+        mouse.set_setting2("foo")
+        mouse.save()
+        assert self._read_reports(mouse) == b""
+        mouse.save(force=True)
+        assert self._read_reports(mouse) == b"\x02\x00\x5a\x0e"
+
+    @pytest.mark.parametrize(
+        "setting", ["setting1", "setting_no_readback", "setting_readback"]
+    )
+    def test_save_after_setting_without_digest(self, mouse, setting):
+        mouse.set_setting2("foo")
+        mouse.save()
+        getattr(mouse, "set_%s" % setting)()
+        self._read_reports(mouse)
+        mouse.save()
+        assert self._read_reports(mouse) == b"\x02\x00\x5a\x0e"
+
+    def test_batch(self, mouse):
+        mouse.set_setting2("foo")
+        mouse.save()
+        self._read_reports(mouse)
+        with mouse.batch(save=True):
+            mouse.set_setting2("bar")
+            mouse.set_setting2("foo")
+        assert self._read_reports(mouse) == b""
+
+
+class TestMouseClass(object):
+    @pytest.fixture
+    def mouse(self):
+        return mouse.Mouse(
+            usbhid.FakeDevice(),
+            FAKE_PROFILE,
+            mouse_settings.FakeMouseSettings(0x1038, 0xBAAD, FAKE_PROFILE),
+        )
+
+    def test_instance_of_mouse(self, mouse):
+        assert isinstance(mouse, mouse_module.Mouse)
+        assert type(mouse) is not mouse_module.Mouse
+
+    def test_class_is_reused(self, mouse):
+        assert type(mouse) is mouse_module.get_mouse_class(FAKE_PROFILE)
+        mouse2 = mouse_module.Mouse(
+            usbhid.FakeDevice(),
+            FAKE_PROFILE,
+            mouse_settings.FakeMouseSettings(0x1038, 0xBAAD, FAKE_PROFILE),
+        )
+        assert type(mouse2) is type(mouse)
+
+    def test_class_per_profile(self, mouse):
+        assert mouse_module.get_mouse_class(FAKE_PROFILE2) is not type(mouse)
+
+    def test_invalidate(self):
+        profile = copy.deepcopy(FAKE_PROFILE)
+        mouse_class = mouse_module.get_mouse_class(profile)
+        class_ref = weakref.ref(mouse_class)
+        encoders.get_encoder(profile, "setting1")
+        encoders.invalidate(profile)
+        assert mouse_module.get_mouse_class(profile) is not mouse_class
+        encoders.invalidate(profile)
+        del profile, mouse_class
+        gc.collect()
+        assert class_ref() is None
+
+    def test_setting_methods_in_dir(self, mouse):
+        assert "set_setting1" in dir(mouse)
+        assert "set_setting_readback" in dir(mouse)
+
+    def test_setting_method_doc(self, mouse):
+        assert mouse.set_setting2.__doc__.startswith(
+            "A setting with a simple choice value."
+        )
+        assert "rivalcfg.handlers.choice" in mouse.set_setting2.__doc__
+
+    def test_setting_method_is_bound_once(self, mouse):
+        assert mouse.set_setting2.__func__ is type(mouse).set_setting2
+
+    def test_unexisting_setting(self, mouse):
+        assert not hasattr(mouse, "set_foobar")
+        assert not hasattr(mouse_module.get_mouse_class(FAKE_PROFILE2), "set_setting1")
+
+    def test_subclass(self):
+        class MyMouse(mouse_module.Mouse):
+            pass
+
+        mouse_ = MyMouse(
+            usbhid.FakeDevice(),
+            FAKE_PROFILE,
+            mouse_settings.FakeMouseSettings(0x1038, 0xBAAD, FAKE_PROFILE),
+        )
+        assert isinstance(mouse_, MyMouse)
+        assert hasattr(mouse_, "set_setting2")
+
+
+class TestReportBuffers(object):
+    @pytest.fixture
+    def mouse(self):
+        return mouse.Mouse(
+            usbhid.FakeDevice(),
+            FAKE_PROFILE,
+            mouse_settings.FakeMouseSettings(0x1038, 0xBAAD, FAKE_PROFILE),
+        )
+
+    def test_buffer_reused(self, mouse):
+        mouse.set_setting2("foo")
+        buffer = mouse._report_buffers["setting2"]
+        mouse.set_setting2("bar")
+        assert mouse._report_buffers["setting2"] is buffer
+        mouse._hid_device.bytes.seek(0)
+        assert mouse._hid_device.bytes.read() == b"\x02\x00\xcc\x01\x02\x00\xcc\x02"
+
+    def test_batch_copies_reports(self, mouse):
+        with mouse.batch():
+            mouse.set_setting5(42)
+            mouse.set_setting2("foo")
+        mouse._hid_device.bytes.seek(0)
+        assert mouse._hid_device.bytes.read() == (
+            b"\x02\x00\x11\x22\xaa\x33\x44\x02\x00\xcc\x01"
+        )
+
+    def test_hid_write_report_accepts_memoryview(self, mouse):
+        mouse._hid_write_report(
+            usbhid.HID_REPORT_TYPE_OUTPUT, memoryview(b"\x00\x01\x02")[:2]
+        )
+        mouse._hid_device.bytes.seek(0)
+        assert mouse._hid_device.bytes.read() == b"\x02\x00\x01"
@@ -1,3 +1,4 @@
+import os
 import json
 
 import pytest
@@ -97,3 +98,123 @@ class Test_MouseSettings(object):
         with open(mouse_settings.get_settings_path(0x1038, 0xBAAD), "r") as file_:
             saved_data = json.load(file_)
         assert "setting3" not in saved_data["default"]
+
+    def test_packet_digests_saved(self, monkeypatch, tmpdir):
+        monkeypatch.delenv("DEBUG_DRY", raising=False)
+        monkeypatch.setenv("XDG_CONFIG_HOME", str(tmpdir))
+        ms = mouse_settings.MouseSettings(
+            0x1038, 0xBAAD, FAKE_PROFILE, device_id="usb-1-2"
+        )
+        ms.set_packet_digest("setting1", "abcd")
+        ms2 = mouse_settings.MouseSettings(
+            0x1038, 0xBAAD, FAKE_PROFILE, device_id="usb-1-2"
+        )
+        assert ms2.get_packet_digest("setting1") is None
+        ms.save()
+        ms3 = mouse_settings.MouseSettings(
+            0x1038, 0xBAAD, FAKE_PROFILE, device_id="usb-1-2"
+        )
+        assert ms3.get_packet_digest("setting1") == "abcd"
+
+    def test_unsaved_packet_digest_forgotten(self, monkeypatch, tmpdir):
+        monkeypatch.delenv("DEBUG_DRY", raising=False)
+        monkeypatch.setenv("XDG_CONFIG_HOME", str(tmpdir))
+        ms = mouse_settings.MouseSettings(
+            0x1038, 0xBAAD, FAKE_PROFILE, device_id="usb-1-2"
+        )
+        ms.set_packet_digest("setting1", "abcd")
+        ms.save()
+        ms.set_packet_digest("setting1", "ef01")
+        assert ms.get_packet_digest("setting1") == "ef01"
+        ms2 = mouse_settings.MouseSettings(
+            0x1038, 0xBAAD, FAKE_PROFILE, device_id="usb-1-2"
+        )
+        assert ms2.get_packet_digest("setting1") is None
+
+    @pytest.mark.parametrize("content", ['{"setting1": "ab', "[]"])
+    def test_corrupted_packet_digests(self, monkeypatch, tmpdir, content):
+        monkeypatch.delenv("DEBUG_DRY", raising=False)
+        monkeypatch.setenv("XDG_CONFIG_HOME", str(tmpdir))
+        path = mouse_settings.get_packet_digests_path(0x1038, 0xBAAD, "usb-1-2")
+        os.makedirs(os.path.dirname(path))
+        with open(path, "w") as file_:
+            file_.write(content)
+        ms = mouse_settings.MouseSettings(
+            0x1038, 0xBAAD, FAKE_PROFILE, device_id="usb-1-2"
+        )
+        assert ms.get_packet_digest("setting1") is None
+        ms.set_packet_digest("setting1", "abcd")
+        ms.save()
+        ms2 = mouse_settings.MouseSettings(
+            0x1038, 0xBAAD, FAKE_PROFILE, device_id="usb-1-2"
+        )
+        assert ms2.get_packet_digest("setting1") == "abcd"
+
+    def test_packet_digests_per_device(self, monkeypatch, tmpdir):
+        monkeypatch.delenv("DEBUG_DRY", raising=False)
+        monkeypatch.setenv("XDG_CONFIG_HOME", str(tmpdir))
+        ms = mouse_settings.MouseSettings(
+            0x1038, 0xBAAD, FAKE_PROFILE, device_id="usb-1-2"
+        )
+        ms.set_packet_digest("setting1", "abcd")
+        ms.save()
+        ms2 = mouse_settings.MouseSettings(
+            0x1038, 0xBAAD, FAKE_PROFILE, device_id="usb-1-3"
+        )
+        assert ms2.get_packet_digest("setting1") is None
+
+    def test_packet_digests_of_unknown_device_not_saved(self, monkeypatch, tmpdir):
+        monkeypatch.delenv("DEBUG_DRY", raising=False)
+        monkeypatch.setenv("XDG_CONFIG_HOME", str(tmpdir))
+        ms = mouse_settings.MouseSettings(0x1038, 0xBAAD, FAKE_PROFILE)
+        ms.set_packet_digest("setting1", "abcd")
+        ms.save()
+        assert ms.get_packet_digest("setting1") == "abcd"
+        ms2 = mouse_settings.MouseSettings(0x1038, 0xBAAD, FAKE_PROFILE)
+        assert ms2.get_packet_digest("setting1") is None
+        assert not any(
+            name.endswith(".digests.json")
+            for name in os.listdir(os.path.join(str(tmpdir), "rivalcfg"))
+        )
+
+    def test_no_response_until(self, monkeypatch, tmpdir):
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmpdir))
+        ms = mouse_settings.MouseSettings(
+            0x1038, 0xBAAD, FAKE_PROFILE, device_id="usb-1-2"
+        )
+        assert ms.get_no_response_until() is None
+        ms.set_no_response_until(1234.5)
+        ms = mouse_settings.MouseSettings(
+            0x1038, 0xBAAD, FAKE_PROFILE, device_id="usb-1-2"
+        )
+        assert ms.get_no_response_until() == 1234.5
+        ms.set_no_response_until(None)
+        assert not tmpdir.join("rivalcfg", "1038_baad_usb-1-2.no_response").exists()
+
+    def test_no_response_until_corrupted(self, monkeypatch, tmpdir):
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmpdir))
+        tmpdir.mkdir("rivalcfg").join("1038_baad_usb-1-2.no_response").write("foo")
+        ms = mouse_settings.MouseSettings(
+            0x1038, 0xBAAD, FAKE_PROFILE, device_id="usb-1-2"
+        )
+        assert ms.get_no_response_until() is None
+
+    def test_no_response_until_per_device(self, monkeypatch, tmpdir):
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmpdir))
+        ms = mouse_settings.MouseSettings(
+            0x1038, 0xBAAD, FAKE_PROFILE, device_id="usb-1-2"
+        )
+        ms.set_no_response_until(1234.5)
+        ms2 = mouse_settings.MouseSettings(
+            0x1038, 0xBAAD, FAKE_PROFILE, device_id="usb-1-3"
+        )
+        assert ms2.get_no_response_until() is None
+
+    def test_no_response_until_of_unknown_device_not_saved(self, monkeypatch, tmpdir):
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmpdir))
+        ms = mouse_settings.MouseSettings(0x1038, 0xBAAD, FAKE_PROFILE)
+        ms.set_no_response_until(1234.5)
+        assert ms.get_no_response_until() == 1234.5
+        ms2 = mouse_settings.MouseSettings(0x1038, 0xBAAD, FAKE_PROFILE)
+        assert ms2.get_no_response_until() is None
+        assert not tmpdir.join("rivalcfg").exists()
@@ -0,0 +1,174 @@
+import time
+
+import pytest
+
+import rivalcfg
+from rivalcfg import mouse
+from rivalcfg import usbhid
+from rivalcfg import devices
+from rivalcfg import mouse_settings
+
+PLUGGED_DEVICES = [
+    {
+        "vendor_id": 0x1038,
+        "product_id": 0x1702,
+        "name": "SteelSeries Rival 100",
+        "endpoint": 0,
+        "path": None,
+    },
+    {
+        "vendor_id": 0x1038,
+        "product_id": 0x1710,
+        "name": "SteelSeries Rival 300",
+        "endpoint": 0,
+        "path": None,
+    },
+]
+
+
+class SlowDevice(usbhid.FakeDevice):
+    """A fake device that takes some time to handle each write."""
+
+    def __init__(self, latency):
+        usbhid.FakeDevice.__init__(self)
+        self.latency = latency
+
+    def write(self, data):
+        time.sleep(self.latency)
+        usbhid.FakeDevice.write(self, data)
+
+
+class FailingDevice(usbhid.FakeDevice):
+    """A fake device that fails on each write."""
+
+    def write(self, data):
+        raise OSError("write error")
+
+
+def _fake_mouse(product_id, hid_device):
+    profile = devices.get_profile(product_id=product_id)
+    return mouse.Mouse(
+        hid_device,
+        profile,
+        mouse_settings.FakeMouseSettings(0x1038, product_id, profile),
+    )
+
+
+@pytest.fixture
+def plugged_devices(monkeypatch):
+    monkeypatch.setenv("RIVALCFG_DRY", "1")
+    monkeypatch.delenv("RIVALCFG_PROFILE", raising=False)
+    monkeypatch.setattr(devices, "list_plugged_devices", lambda: iter(PLUGGED_DEVICES))
+    monkeypatch.setattr(
+        devices, "list_all_plugged_devices", lambda: iter(PLUGGED_DEVICES)
+    )
+
+
+@pytest.fixture
+def identical_devices(monkeypatch):
+    """Two Rival 100 plugged at the same time."""
+    monkeypatch.setenv("RIVALCFG_DRY", "1")
+    monkeypatch.delenv("RIVALCFG_PROFILE", raising=False)
+    monkeypatch.setattr(
+        usbhid,
+        "enumerate_interfaces",
+        lambda vendor_id=0, product_id=0: [
+            {
+                "vendor_id": 0x1038,
+                "product_id": 0x1702,
+                "interface_number": 0,
+                "path": path,
+            }
+            for path in (b"1-2:1.0", b"1-2:1.0", b"1-3:1.0")
+            if vendor_id == 0x1038
+        ],
+    )
+
+
+class TestGetFirstMouse(object):
+    def test_get_first_mouse(self, plugged_devices):
+        assert rivalcfg.get_first_mouse().product_id == 0x1702
+
+    def test_no_device(self, monkeypatch):
+        monkeypatch.setattr(devices, "list_plugged_devices", lambda: iter([]))
+        assert rivalcfg.get_first_mouse() is None
+
+    def test_no_device_profile(self, plugged_devices, monkeypatch):
+        monkeypatch.setenv("RIVALCFG_PROFILE", "0000:0000")
+        assert rivalcfg.get_first_mouse() is None
+
+
+class TestGetAllMice(object):
+    def test_get_all_mice(self, plugged_devices):
+        mice = rivalcfg.get_all_mice()
+        assert [mouse_.product_id for mouse_ in mice] == [0x1702, 0x1710]
+
+    def test_no_device_profile(self, plugged_devices, monkeypatch):
+        monkeypatch.setenv("RIVALCFG_PROFILE", "0000:0000")
+        assert rivalcfg.get_all_mice() == []
+
+    def test_identical_devices(self, identical_devices):
+        mice = rivalcfg.get_all_mice()
+        assert [mouse_.product_id for mouse_ in mice] == [0x1702, 0x1702]
+        for mouse_ in mice:
+            mouse_.close()
+
+
+class TestApplyToAll(object):
+    def test_apply_to_plugged_devices(self, plugged_devices):
+        results = rivalcfg.apply_to_all({"color": "red", "polling_rate": 500})
+        assert [result["product_id"] for result in results] == [0x1702, 0x1710]
+        # The Rival 300 has no "color" setting
+        assert results[0]["applied"] == ["color", "polling_rate"]
+        assert results[1]["applied"] == ["polling_rate"]
+        assert results[0]["error"] is None
+        assert results[1]["error"] is None
+
+    def test_apply_to_identical_devices(self, identical_devices):
+        results = rivalcfg.apply_to_all({"color": "red"})
+        assert [result["path"] for result in results] == [b"1-2:1.0", b"1-3:1.0"]
+        assert [result["applied"] for result in results] == [["color"], ["color"]]
+
+    def test_apply_to_given_mice(self):
+        mice = [
+            _fake_mouse(0x1702, usbhid.FakeDevice()),
+            _fake_mouse(0x1702, usbhid.FakeDevice()),
+        ]
+        rivalcfg.apply_to_all({"color": "red"}, save=False, mice=mice)
+        for mouse_ in mice:
+            mouse_._hid_device.bytes.seek(0)
+            assert mouse_._hid_device.bytes.read() == b"\x02\x00\x05\x00\xff\x00\x00"
+            assert mouse_.mouse_settings.get("color") == "red"
+
+    def test_save(self):
+        mouse_ = _fake_mouse(0x1702, usbhid.FakeDevice())
+        rivalcfg.apply_to_all({"color": "red"}, save=True, mice=[mouse_])
+        mouse_._hid_device.bytes.seek(0)
+        assert mouse_._hid_device.bytes.read().endswith(b"\x02\x00\x09\x00")
+
+    def test_errors_are_collected_per_device(self):
+        mice = [
+            _fake_mouse(0x1702, FailingDevice()),
+            _fake_mouse(0x1702, usbhid.FakeDevice()),
+        ]
+        results = rivalcfg.apply_to_all({"color": "red"}, mice=mice)
+        assert isinstance(results[0]["error"], OSError)
+        assert results[1]["error"] is None
+        assert results[1]["applied"] == ["color"]
+
+    def test_invalid_value(self):
+        results = rivalcfg.apply_to_all(
+            {"color": "not-a-color"},
+            mice=[_fake_mouse(0x1702, usbhid.FakeDevice())],
+        )
+        assert isinstance(results[0]["error"], ValueError)
+
+    def test_no_device(self, monkeypatch):
+        monkeypatch.setattr(devices, "list_all_plugged_devices", lambda: iter([]))
+        assert rivalcfg.apply_to_all({"color": "red"}) == []
+
+    def test_devices_are_configured_in_parallel(self):
+        mice = [_fake_mouse(0x1702, SlowDevice(0.1)) for _ in range(4)]
+        start = time.monotonic()
+        rivalcfg.apply_to_all({"color": "red"}, save=False, mice=mice)
+        assert time.monotonic() - start < 0.3
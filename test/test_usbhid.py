@@ -1,8 +1,209 @@
+import os
+import sys
+import time
+import queue
+import subprocess
+
+import hid
 import pytest
 
 from rivalcfg import usbhid
 
 
+class TestHidapiImport(object):
+    def test_hidapi_not_required(self):
+        # sys.modules["hid"] = None makes "import hid" raise ImportError
+        code = (
+            "import sys\n"
+            "sys.modules['hid'] = None\n"
+            "from rivalcfg import devices\n"
+            "from rivalcfg import cli\n"
+            "from rivalcfg import debug\n"
+            "devices.get_profile(vendor_id=0x1038, product_id=0x1702)\n"
+            "print(debug._get_hidapi_version())\n"
+        )
+        output = subprocess.check_output([sys.executable, "-c", code])
+        assert output.decode().strip() == "not installed"
+
+    def test_hidapi_imported_lazily(self):
+        code = (
+            "import sys\n" "import rivalcfg.__main__\n" "print('hid' in sys.modules)\n"
+        )
+        output = subprocess.check_output([sys.executable, "-c", code])
+        assert output.decode().strip() == "False"
+
+
+class TestEnumerateDevices(object):
+    def test_index_interfaces(self, monkeypatch):
+        monkeypatch.setenv("RIVALCFG_HID_DISCOVERY", "hidapi")
+        monkeypatch.setattr(
+            hid,
+            "enumerate",
+            lambda vendor_id=0, product_id=0: [
+                {
+                    "vendor_id": 0x1038,
+                    "product_id": 0x1702,
+                    "interface_number": 0,
+                    "path": b"/dev/hidraw1",
+                },
+                {
+                    "vendor_id": 0x1038,
+                    "product_id": 0x1702,
+                    "interface_number": 0,
+                    "path": b"/dev/hidraw2",
+                },
+                {
+                    "vendor_id": 0x1038,
+                    "product_id": 0x1702,
+                    "interface_number": 1,
+                    "path": b"/dev/hidraw3",
+                },
+            ],
+        )
+        assert usbhid.enumerate_devices(0x1038) == {
+            (0x1038, 0x1702, 0): b"/dev/hidraw1",
+            (0x1038, 0x1702, 1): b"/dev/hidraw3",
+        }
+
+
+class TestSysfsDiscovery(object):
+    @pytest.fixture
+    def sysfs(self, tmp_path, monkeypatch):
+        def _add_hidraw(name, hid_id, hid_phys, hid_name):
+            device_path = tmp_path / "class" / "hidraw" / name / "device"
+            device_path.mkdir(parents=True)
+            (device_path / "uevent").write_text(
+                "DRIVER=hid-generic\n"
+                "HID_ID=%s\n"
+                "HID_NAME=%s\n"
+                "HID_PHYS=%s\n"
+                "HID_UNIQ=\n"
+                "MODALIAS=hid:b0003g0001v00001038p00001702\n"
+                % (hid_id, hid_name, hid_phys)
+            )
+
+        _add_hidraw(
+            "hidraw0",
+            "0003:00001038:00001702",
+            "usb-0000:00:14.0-2/input0",
+            "SteelSeries Rival 100",
+        )
+        _add_hidraw(
+            "hidraw1",
+            "0003:00001038:00001702",
+            "usb-0000:00:14.0-2/input1",
+            "SteelSeries Rival 100",
+        )
+        _add_hidraw(
+            "hidraw2",
+            "0003:0000046D:0000C077",
+            "usb-0000:00:14.0-3/input0",
+            "Logitech Mouse",
+        )
+        _add_hidraw(
+            "hidraw3",
+            "0005:00001038:00001702",
+            "aa:bb:cc:dd:ee:ff",
+            "Bluetooth device",
+        )
+        (tmp_path / "class" / "hidraw" / "hidraw4" / "device").mkdir(parents=True)
+
+        monkeypatch.delenv("RIVALCFG_HID_DISCOVERY", raising=False)
+        monkeypatch.setattr(
+            usbhid, "SYSFS_HIDRAW_PATH", str(tmp_path / "class" / "hidraw")
+        )
+
+    def test_is_sysfs_available(self, sysfs, monkeypatch):
+        assert usbhid.is_sysfs_available()
+        monkeypatch.setenv("RIVALCFG_HID_DISCOVERY", "hidapi")
+        assert not usbhid.is_sysfs_available()
+
+    def test_sysfs_not_available(self, tmp_path, monkeypatch):
+        monkeypatch.delenv("RIVALCFG_HID_DISCOVERY", raising=False)
+        monkeypatch.setattr(usbhid, "SYSFS_HIDRAW_PATH", str(tmp_path / "nothing"))
+        assert not usbhid.is_sysfs_available()
+
+    def test_enumerate_interfaces(self, sysfs):
+        interfaces = usbhid.enumerate_interfaces(0x1038)
+        assert len(interfaces) == 2
+        assert interfaces[0]["path"] == b"/dev/hidraw0"
+        assert interfaces[0]["vendor_id"] == 0x1038
+        assert interfaces[0]["product_id"] == 0x1702
+        assert interfaces[0]["interface_number"] == 0
+        assert interfaces[0]["product_string"] == "SteelSeries Rival 100"
+        assert interfaces[1]["path"] == b"/dev/hidraw1"
+        assert interfaces[1]["interface_number"] == 1
+
+    def test_enumerate_interfaces_returns_hidapi_keys(self, sysfs):
+        interface = usbhid.enumerate_interfaces(0x1038)[0]
+        for key in [
+            "path",
+            "vendor_id",
+            "product_id",
+            "serial_number",
+            "release_number",
+            "manufacturer_string",
+            "product_string",
+            "usage_page",
+            "usage",
+            "interface_number",
+        ]:
+            assert key in interface
+
+    def test_enumerate_interfaces_filter_product_id(self, sysfs):
+        assert len(usbhid.enumerate_interfaces(0x1038, 0x1702)) == 2
+        assert len(usbhid.enumerate_interfaces(0x1038, 0xBAAD)) == 0
+        assert len(usbhid.enumerate_interfaces()) == 3
+
+    def test_get_sysfs_interface(self, sysfs):
+        interface = usbhid.get_sysfs_interface(b"/dev/hidraw1")
+        assert interface == usbhid.enumerate_interfaces(0x1038)[1]
+
+    def test_get_sysfs_interface_not_usb(self, sysfs):
+        assert usbhid.get_sysfs_interface(b"/dev/hidraw3") is None
+        assert usbhid.get_sysfs_interface(b"/dev/hidraw4") is None
+
+    def test_get_sysfs_interface_unknown_path(self, sysfs):
+        assert usbhid.get_sysfs_interface(b"/dev/hidraw9") is None
+        assert usbhid.get_sysfs_interface(b"1-2:1.0") is None
+        assert usbhid.get_sysfs_interface(None) is None
+
+    def test_enumerate_devices(self, sysfs):
+        assert usbhid.enumerate_devices(0x1038) == {
+            (0x1038, 0x1702, 0): b"/dev/hidraw0",
+            (0x1038, 0x1702, 1): b"/dev/hidraw1",
+        }
+
+
+class TestGetUsbPortPath(object):
+    def test_libusb_path(self):
+        assert usbhid.get_usb_port_path(b"1-2.3.1:1.0") == "1-2.3.1"
+        assert usbhid.get_usb_port_path(b"3-4:1.2") == "3-4"
+
+    def test_hidraw_path(self, tmp_path, monkeypatch):
+        hid_device_path = (
+            tmp_path
+            / "devices"
+            / "usb1"
+            / "1-2"
+            / "1-2.3"
+            / "1-2.3:1.0"
+            / "0003:1038:1702.0001"
+        )
+        hid_device_path.mkdir(parents=True)
+        hidraw_path = tmp_path / "class" / "hidraw" / "hidraw5"
+        hidraw_path.mkdir(parents=True)
+        (hidraw_path / "device").symlink_to(hid_device_path)
+        monkeypatch.setattr(
+            usbhid, "SYSFS_HIDRAW_PATH", str(tmp_path / "class" / "hidraw")
+        )
+        assert usbhid.get_usb_port_path(b"/dev/hidraw5") == "1-2.3"
+        assert usbhid.get_usb_port_path(b"/dev/hidraw6") is None
+
+    def test_unknown_path(self):
+        assert usbhid.get_usb_port_path(b"IOService:/AppleACPIPlatformExpert") is None
+
+
 class TestIsDevicePlugged(object):
     def test_a_not_plugged_device(self):
         assert not usbhid.is_device_plugged(0x1038, 0xBAAD)
@@ -18,9 +219,264 @@ class TestOpenDevice(object):
         with pytest.raises(usbhid.DeviceNotFound):
             usbhid.open_device(0x1038, 0xBAAD, 0x00)
 
+    def test_with_path_does_not_scan_the_bus(self, monkeypatch):
+        monkeypatch.setenv("RIVALCFG_DRY", "1")
+
+        def _enumerate(*args, **kwargs):
+            raise AssertionError("the bus should not be scanned")
+
+        monkeypatch.setattr(hid, "enumerate", _enumerate)
+        device = usbhid.open_device(0x1038, 0xBAAD, 0x00, path=b"/dev/hidraw1")
+        assert hasattr(device, "write")
+
     def test_in_dry_mode(self, monkeypatch):
         monkeypatch.setenv("RIVALCFG_DRY", "1")
         device = usbhid.open_device(0x1038, 0xBAAD, 0x00)
         assert hasattr(device, "write")
         assert hasattr(device, "close")
         assert hasattr(device, "send_feature_report")
+
+    def test_fake_transport(self, monkeypatch):
+        monkeypatch.delenv("RIVALCFG_DRY", raising=False)
+        device = usbhid.open_device(0x1038, 0xBAAD, 0x00, transport="fake")
+        assert isinstance(device, usbhid.FakeDevice)
+
+    def test_unknown_transport(self, monkeypatch):
+        with pytest.raises(ValueError):
+            usbhid.open_device(0x1038, 0xBAAD, 0x00, transport="foobar")
+
+
+class TestDevicePool(object):
+    @pytest.fixture
+    def pool(self, monkeypatch):
+        monkeypatch.setenv("RIVALCFG_DRY", "1")
+        pool = usbhid.DevicePool()
+        yield pool
+        pool.close()
+
+    def test_reuse_device(self, pool):
+        device = pool.open_device(0x1038, 0x1702, 0)
+        device.close()
+        assert pool.open_device(0x1038, 0x1702, 0) is device
+        assert len(pool) == 1
+
+    def test_different_keys(self, pool):
+        device1 = pool.open_device(0x1038, 0x1702, 0)
+        device2 = pool.open_device(0x1038, 0x1702, 0, path=b"00:0000:0001")
+        assert device1 is not device2
+        assert len(pool) == 2
+
+    def test_pooled_device_api(self, pool):
+        device = pool.open_device(0x1038, 0x1702, 0)
+        device.write(b"\x00\xaa")
+        device.send_feature_report(b"\x00\xbb")
+        assert device.read(4, timeout_ms=10) == [0, 0, 0, 0]
+        device.bytes.seek(0)
+        assert device.bytes.read() == b"\x02\x00\xaa\x03\x00\xbb"
+
+    def test_same_device_with_and_without_path(self, pool):
+        device = pool.open_device(0x1038, 0x1702, 0)
+        assert pool.open_device(0x1038, 0x1702, 0, path=b"00:0000:0000") is device
+        assert len(pool) == 1
+
+    def test_path_found_once_opened(self, pool):
+        device = pool.open_device(0x1038, 0x1702, 0, path=b"00:0000:0000")
+        assert pool.open_device(0x1038, 0x1702, 0) is device
+
+    def test_drop_on_io_error(self, pool):
+        device = pool.open_device(0x1038, 0x1702, 0, path=b"00:0000:0001")
+        device.close_device()  # Makes any further write fail
+        with pytest.raises(ValueError):
+            device.write(b"\x00\xaa")
+        assert device.failed
+        assert len(pool) == 0
+        assert pool.open_device(0x1038, 0x1702, 0) is not device
+
+    def test_reopen_on_io_error(self, pool):
+        device = pool.open_device(0x1038, 0x1702, 0)
+        device.close_device()  # Makes the next write fail
+        device.write(b"\x00\xaa")
+        assert not device.failed
+        device.bytes.seek(0)
+        assert device.bytes.read() == b"\x02\x00\xaa"
+        assert pool.open_device(0x1038, 0x1702, 0) is device
+
+    def test_drop_when_reopen_fails(self, pool, monkeypatch):
+        device = pool.open_device(0x1038, 0x1702, 0)
+        device.close_device()
+
+        def _find_device_path(*args):
+            raise usbhid.DeviceNotFound()
+
+        monkeypatch.setattr(usbhid, "_find_device_path", _find_device_path)
+        with pytest.raises(ValueError):
+            device.write(b"\x00\xaa")
+        assert device.failed
+        assert len(pool) == 0
+
+    def test_drop_unplugged_device(self, pool, tmp_path):
+        path = tmp_path / "hidraw0"
+        path.touch()
+        device = pool.open_device(0x1038, 0x1702, 0, path=str(path).encode())
+        path.unlink()
+        assert (
+            pool.open_device(0x1038, 0x1702, 0, path=str(path).encode()) is not device
+        )
+
+    def test_drop_reassigned_device_node(self, pool, tmp_path, monkeypatch):
+        uevent = tmp_path / "hidraw0" / "device" / "uevent"
+        uevent.parent.mkdir(parents=True)
+        uevent.write_text("HID_ID=0003:00001038:00001702\nHID_PHYS=usb-1-2/input0\n")
+        monkeypatch.delenv("RIVALCFG_HID_DISCOVERY", raising=False)
+        monkeypatch.setattr(usbhid, "SYSFS_HIDRAW_PATH", str(tmp_path))
+        device = pool.open_device(0x1038, 0x1702, 0, path=b"/dev/hidraw0")
+        assert pool.open_device(0x1038, 0x1702, 0, path=b"/dev/hidraw0") is device
+        # Unplugged, and the node is given to another device
+        uevent.write_text("HID_ID=0003:0000046D:0000C077\nHID_PHYS=usb-1-3/input0\n")
+        assert pool.open_device(0x1038, 0x1702, 0, path=b"/dev/hidraw0") is not device
+
+    def test_close(self, pool):
+        pool.open_device(0x1038, 0x1702, 0)
+        pool.close()
+        assert len(pool) == 0
+
+
+class QueuedReportsDevice(usbhid.FakeDevice):
+    """A fake device that returns the reports pushed into it."""
+
+    def __init__(self):
+        usbhid.FakeDevice.__init__(self)
+        self.reports = queue.Queue()
+
+    def read(self, max_length, timeout_ms=0):
+        try:
+            return self.reports.get(timeout=timeout_ms / 1000)[:max_length]
+        except queue.Empty:
+            return []
+
+
+class TestReportReader(object):
+    @pytest.fixture
+    def device(self):
+        return QueuedReportsDevice()
+
+    @pytest.fixture
+    def reader(self, device):
+        reader = usbhid.ReportReader(device, capacity=4, poll_timeout_ms=5)
+        reader.start()
+        yield reader
+        reader.stop()
+
+    def test_wait_for_report(self, device, reader):
+        device.reports.put([0x01, 0x02])
+        assert reader.wait_for_report(timeout_ms=500) == [0x01, 0x02]
+
+    def test_wait_for_report_timeout(self, reader):
+        start = time.monotonic()
+        assert reader.wait_for_report(timeout_ms=20) == []
+        assert time.monotonic() - start >= 0.02
+
+    def test_wait_for_report_predicate(self, device, reader):
+        device.reports.put([0x01])
+        device.reports.put([0x02])
+        assert reader.wait_for_report(lambda r: r[0] == 0x02, timeout_ms=500) == [0x02]
+        assert reader.wait_for_report(timeout_ms=500) == [0x01]
+
+    def test_wait_for_report_since(self, device, reader):
+        device.reports.put([0x01])
+        time.sleep(0.05)
+        since = time.monotonic()
+        device.reports.put([0x02])
+        assert reader.wait_for_report(since=since, timeout_ms=500) == [0x02]
+        assert reader.wait_for_report(timeout_ms=20) == []
+
+    def test_ring_buffer(self, device, reader):
+        for i in range(6):
+            device.reports.put([i])
+        time.sleep(0.1)
+        assert [reader.wait_for_report(timeout_ms=0)[0] for _ in range(4)] == [
+            2,
+            3,
+            4,
+            5,
+        ]
+
+    def test_stop_on_error(self, device, reader):
+        def _read(max_length, timeout_ms=0):
+            raise IOError("device unplugged")
+
+        device.read = _read
+        time.sleep(0.05)
+        assert not reader.is_running
+        assert isinstance(reader.error, IOError)
+        assert reader.wait_for_report(timeout_ms=500) == []
+
+
+class TestGetDefaultTransport(object):
+    def test_dry_mode(self, monkeypatch):
+        monkeypatch.setenv("RIVALCFG_DRY", "1")
+        assert usbhid.get_default_transport(b"/dev/hidraw0") == "fake"
+
+    def test_hidapi_path(self, monkeypatch):
+        monkeypatch.delenv("RIVALCFG_DRY", raising=False)
+        monkeypatch.delenv("RIVALCFG_HID_TRANSPORT", raising=False)
+        assert usbhid.get_default_transport(b"1-2:1.0") == "hidapi"
+
+    def test_hidraw_path(self, monkeypatch):
+        monkeypatch.delenv("RIVALCFG_DRY", raising=False)
+        monkeypatch.delenv("RIVALCFG_HID_TRANSPORT", raising=False)
+        assert usbhid.get_default_transport(b"/dev/hidraw0") == "hidraw"
+
+    def test_forced_transport(self, monkeypatch):
+        monkeypatch.delenv("RIVALCFG_DRY", raising=False)
+        monkeypatch.setenv("RIVALCFG_HID_TRANSPORT", "hidapi")
+        assert usbhid.get_default_transport(b"/dev/hidraw0") == "hidapi"
+
+
+class TestHidapiTransport(object):
+    def test_hidraw_backend_missing(self, monkeypatch):
+        # sys.modules["hidraw"] = None makes "import hidraw" raise ImportError
+        monkeypatch.setitem(sys.modules, "hidraw", None)
+        device = usbhid._new_hidapi_device(b"/dev/hidraw0")
+        assert isinstance(device, hid.device)
+
+
+class TestHidrawDevice(object):
+    @pytest.fixture
+    def device(self, tmp_path):
+        # A FIFO allows to read back what was written to the "device"
+        fifo_path = str(tmp_path / "hidraw0")
+        os.mkfifo(fifo_path)
+        device = usbhid.HidrawDevice()
+        device.open_path(fifo_path.encode())
+        yield device
+        device.close()
+
+    def test_write(self, device):
+        assert device.write(b"\x00\xaa\xbb") == 3
+        assert device.read(64, timeout_ms=100) == [0x00, 0xAA, 0xBB]
+
+    def test_read_timeout(self, device):
+        assert device.read(64, timeout_ms=10) == []
+
+    def test_read_nonblocking(self, device):
+        device.set_nonblocking(True)
+        assert device.read(64) == []
+
+    def test_send_feature_report(self, device, monkeypatch):
+        calls = []
+
+        class FakeFcntl(object):
+            @staticmethod
+            def ioctl(fd, request, buffer_):
+                calls.append((request, bytes(buffer_)))
+                return len(buffer_)
+
+        monkeypatch.setattr(usbhid, "fcntl", FakeFcntl)
+        assert device.send_feature_report(b"\x00\xaa\xbb") == 3
+        assert calls == [(0xC0034806, b"\x00\xaa\xbb")]
+
+    def test_closed_device(self, device):
+        device.close()
+        with pytest.raises(ValueError):
+            device.write(b"\x00")